@@ -1,38 +1,513 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Request
-from fastapi.responses import JSONResponse
-from typing import Any, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import Any, List, Optional
+from starlette.datastructures import UploadFile as StarletteUploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
 import json
-from app.flow_graph.langgraph import process_clinical_summary
+import tempfile
+from app.flow_graph.langgraph import PIPELINE_MODES, aprocess_clinical_summary, astream_clinical_summary
+from app.utils.registry import registry
+from app.utils.metrics import metrics, collect_timings
+from app.utils.cache import get_result_cache
+from app.utils.settings import get_settings
+from app.services.batch import aiter_items, aiter_ndjson, run_batch
+from app.services.jobs import get_job_store
+from app.services.ingest import ParsedSummary
+from app.services.policy_registry import get_policy_registry
+from app.utils.prompt_payload import PayloadTooLarge
+from app.serving import process_stats
+import asyncio
 
 router = APIRouter()
+# Routes served at the application root rather than under /api (e.g. Prometheus scraping).
+root_router = APIRouter()
+
+def _check_mode(mode: str) -> None:
+    if mode not in PIPELINE_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}'. Use one of: {', '.join(PIPELINE_MODES)}.")
+
+POLICY_ID_DESCRIPTION = "Policy to evaluate against (see /api/policies); repeat to evaluate against several at once."
+
+def _check_policies(policy_ids: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    The requested policy ids without duplicates; 400 for unknown ids or too many policies.
+    """
+    if not policy_ids:
+        return None
+    policy_ids = list(dict.fromkeys(policy_ids))
+    policies = get_policy_registry()
+    unknown = [policy_id for policy_id in policy_ids if policy_id not in policies]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown policy id(s): {', '.join(unknown)}. See /api/policies.")
+    limit = get_settings().max_policies_per_request
+    if len(policy_ids) > limit:
+        raise HTTPException(status_code=400, detail=f"At most {limit} policies can be evaluated per request.")
+    return policy_ids
+
+# The summary is read from the request by _read_summary rather than declared as a parameter, so
+# FastAPI does not buffer the whole body before the size limit is checked.
+SUMMARY_REQUEST_BODY = {
+    "requestBody": {
+        "content": {
+            "application/json": {"schema": {"type": "object", "description": "The clinical summary."}},
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "file": {"type": "string", "format": "binary", "description": "A JSON file containing the clinical summary."}
+                    },
+                }
+            },
+        },
+    }
+}
 
 @router.post(
     "/validate-summary",
     summary="Validate a clinical summary JSON file or object",
-    response_description="Validation result as a user-friendly message."
+    response_description="Validation result as a user-friendly message.",
+    openapi_extra=SUMMARY_REQUEST_BODY
 )
 async def validate_summary(
-    file: UploadFile = File(None, description="A JSON file containing the clinical summary."),
-    request: Request = None
+    request: Request,
+    use_cache: bool = Query(True, description="Set to false to bypass cached LLM results for this request."),
+    mode: str = Query("standard", description="Pipeline variant: " + ", ".join(PIPELINE_MODES) + "."),
+    timings: bool = Query(False, description="Attach a per-stage timing and token breakdown to the response."),
+    policy_id: Optional[List[str]] = Query(None, description=POLICY_ID_DESCRIPTION)
 ):
     """
     Validate a clinical summary for insurance using AI and schema checks.
     Returns a user-friendly message about the summary's validity and suggestions for improvement as JSON.
+    With several `policy_id`s the claim is evaluated against each policy concurrently: the
+    top-level outcome is the first policy's and `policies` lists every policy's outcome.
+    """
+    _check_mode(mode)
+    policy_ids = _check_policies(policy_id)
+    data = await _read_summary(request)
+
+    # Run the flow and get the full final state (all details)
+    try:
+        if not timings:
+            return JSONResponse(await aprocess_clinical_summary(data, use_cache=use_cache, mode=mode, policy_ids=policy_ids))
+        with collect_timings() as breakdown:
+            result = await aprocess_clinical_summary(data, use_cache=use_cache, mode=mode, policy_ids=policy_ids)
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return JSONResponse({**result, "timings": breakdown.as_dict()})
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post(
+    "/validate-summary/stream",
+    summary="Validate a clinical summary and stream progress as server-sent events",
+    response_description="text/event-stream of stage events, policy message tokens and the final result.",
+    openapi_extra=SUMMARY_REQUEST_BODY
+)
+async def validate_summary_stream(
+    request: Request,
+    use_cache: bool = Query(True, description="Set to false to bypass cached LLM results for this request."),
+    mode: str = Query("standard", description="Pipeline variant: " + ", ".join(PIPELINE_MODES) + "."),
+    policy_id: Optional[List[str]] = Query(None, description=POLICY_ID_DESCRIPTION)
+):
+    """
+    Streaming variant of /validate-summary. Emits a `guardrail`, `validation` and `policy` event as
+    each stage is decided, `token` events with pieces of the policy message while the LLM writes it,
+    and a final `result` event with the same payload /validate-summary returns.
+    """
+    _check_mode(mode)
+    policy_ids = _check_policies(policy_id)
+    data = await _read_summary(request)
+
+    async def events():
+        try:
+            async for event in astream_clinical_summary(data, use_cache=use_cache, mode=mode, policy_ids=policy_ids):
+                yield _sse(event["event"], event["data"])
+        except Exception as e:
+            yield _sse("error", {"error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _too_large(limit: int, what: str) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"{what} exceeds the limit of {limit} bytes.")
+
+def _check_content_length(request: Request, limit: int, what: str) -> None:
+    """
+    Reject a body whose declared size is over the limit before reading any of it.
+    """
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise _too_large(limit, what)
+
+# Room for the multipart boundary and part headers around an uploaded file of the maximum size.
+MULTIPART_OVERHEAD = 16 * 1024
+
+async def _limited(chunks, limit: int, what: str):
+    """
+    Pass byte chunks through, failing with 413 as soon as they add up to more than the limit.
     """
-    if file:
-        if not file.content_type or not file.content_type.endswith("json"):
-            raise HTTPException(status_code=400, detail="Uploaded file must be a JSON file.")
-        try:    
-            contents = await file.read()
-            data = json.loads(contents)
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > limit:
+            raise _too_large(limit, what)
+        yield chunk
+
+async def _read_upload(request: Request, limit: int) -> StarletteUploadFile:
+    """
+    The multipart upload under the key `file`, at most `limit` bytes. Unlike request.form(),
+    which spools the whole body before anything can be checked, the body is parsed as it
+    streams in and rejected with 413 once it passes the limit (a declared Content-Length over
+    it is rejected before reading); the parser closes its spooled files on the way out.
+    """
+    body_limit = limit + MULTIPART_OVERHEAD
+    _check_content_length(request, body_limit, "Request body")
+    parser = MultiPartParser(request.headers, _limited(request.stream(), body_limit, "Request body"), max_files=1, max_fields=16)
+    try:
+        form = await parser.parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    file = form.get("file")
+    if not isinstance(file, StarletteUploadFile):
+        await form.close()
+        raise HTTPException(status_code=400, detail="Multipart upload must contain a `file` field.")
+    if file.size is not None and file.size > limit:
+        await form.close()
+        raise _too_large(limit, "Uploaded file")
+    return file
+
+async def _upload_chunks(file: StarletteUploadFile, chunk_size: int = 64 * 1024):
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+async def _read_limited(chunks, limit: int, what: str) -> bytes:
+    """
+    Read a stream of byte chunks, failing with 413 as soon as it grows past the limit instead
+    of buffering it whole first.
+    """
+    body = bytearray()
+    async for chunk in _limited(chunks, limit, what):
+        body += chunk
+    return bytes(body)
+
+async def _read_summary(request: Request) -> ParsedSummary:
+    """
+    The summary from a multipart upload under the key `file` or the raw request body, decoded
+    once; 413 when it is over MEDICHECK_MAX_SUMMARY_BYTES and 400 when it is not valid JSON.
+    A raw body is read as it streams in and rejected as soon as it passes the limit.
+    """
+    limit = get_settings().max_summary_bytes
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        file = await _read_upload(request, limit)
+        try:
+            if not file.content_type or not file.content_type.endswith("json"):
+                raise HTTPException(status_code=400, detail="Uploaded file must be a JSON file.")
+            contents = await _read_limited(_upload_chunks(file), limit, "Uploaded file")
+        finally:
+            await file.close()
+        try:
+            return ParsedSummary.from_json(contents)
         except Exception:
             raise HTTPException(status_code=400, detail="Invalid JSON file.")
+    _check_content_length(request, limit, "Request body")
+    body = await _read_limited(request.stream(), limit, "Request body")
+    try:
+        return ParsedSummary.from_json(body)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Request body must be valid JSON.")
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/jsonlines")
+
+def _is_ndjson(content_type: Optional[str], filename: Optional[str] = None) -> bool:
+    if content_type and content_type.split(";")[0].strip() in NDJSON_MEDIA_TYPES:
+        return True
+    return bool(filename) and filename.lower().endswith((".ndjson", ".jsonl"))
+
+async def _file_chunks(fileobj, chunk_size: int = 64 * 1024):
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+async def _spool_body(request: Request, limit: int):
+    """
+    Copy the raw request body to a spooled temporary file (kept in memory up to 1 MB, then on disk),
+    failing with 413 once it grows past the limit.
+    The body has to be drained before the streaming response starts: Starlette listens for client
+    disconnects on the same receive channel while the response is streaming.
+    """
+    _check_content_length(request, limit, "Request body")
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            spool.close()
+            raise _too_large(limit, "Request body")
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+async def _read_batch_items(request: Request, allow_single: bool = False):
+    """
+    Decode a batch given as a JSON array or NDJSON, either as the raw request body or as a
+    multipart upload under the key `file`. Returns (index, summary) pairs and the temporary file
+    holding the input; NDJSON is decoded lazily, line by line, so the caller closes the file once
+    the items are consumed. With allow_single, a lone JSON object is accepted as a batch of one.
+    The whole input is limited to MEDICHECK_MAX_BATCH_BYTES (413) and each NDJSON line to
+    MEDICHECK_MAX_SUMMARY_BYTES (an error for that item only).
+    """
+    settings = get_settings()
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        upload = await _read_upload(request, settings.max_batch_bytes)
+        source = upload.file
+        ndjson = _is_ndjson(upload.content_type, upload.filename)
+        if not ndjson and not (upload.content_type or "").endswith("json"):
+            source.close()
+            raise HTTPException(status_code=400, detail="Uploaded file must be a JSON array or NDJSON file.")
     else:
+        source = await _spool_body(request, settings.max_batch_bytes)
+        ndjson = _is_ndjson(content_type)
+
+    if ndjson:
+        return aiter_ndjson(_file_chunks(source), max_line_bytes=settings.max_summary_bytes), source
+    try:
+        # A batch can be up to MEDICHECK_MAX_BATCH_BYTES; decode it off the event loop.
+        summaries = await asyncio.to_thread(json.load, source)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON.")
+    finally:
+        source.close()
+    if allow_single and isinstance(summaries, dict):
+        summaries = [summaries]
+    if not isinstance(summaries, list):
+        raise HTTPException(status_code=400, detail="Batch JSON must be an array of summaries.")
+    return list(enumerate(summaries)), source
+
+@router.post(
+    "/validate-batch",
+    summary="Validate many clinical summaries, streaming NDJSON results as they complete",
+    response_description="One NDJSON line per summary: {index, ok, result} or {index, ok: false, error}."
+)
+async def validate_batch(
+    request: Request,
+    concurrency: Optional[int] = Query(None, ge=1, description="Maximum summaries validated at once."),
+    use_cache: bool = Query(True, description="Set to false to bypass cached LLM results for this batch."),
+    mode: str = Query("standard", description="Pipeline variant: " + ", ".join(PIPELINE_MODES) + "."),
+    timings: bool = Query(False, description="Attach a per-stage timing and token breakdown to each result."),
+    policy_id: Optional[List[str]] = Query(None, description=POLICY_ID_DESCRIPTION)
+):
+    """
+    Validate a batch of clinical summaries given as a JSON array or NDJSON, either as the raw
+    request body or as a multipart upload under the key `file`.
+    NDJSON input is decoded line by line and results are streamed back as NDJSON in completion
+    order; use each line's `index` to match it to its input. A malformed or failing item only
+    produces an error line for that item.
+    """
+    _check_mode(mode)
+    policy_ids = _check_policies(policy_id)
+    settings = get_settings()
+    concurrency = min(concurrency or settings.batch_concurrency, settings.batch_max_concurrency)
+
+    items, source = await _read_batch_items(request)
+
+    async def results():
         try:
-            data = await request.json()
-        except Exception:
-            raise HTTPException(status_code=400, detail="Request body must be valid JSON.")
+            async for record in run_batch(
+                items, concurrency=concurrency, use_cache=use_cache, mode=mode, timings=timings, policy_ids=policy_ids
+            ):
+                yield json.dumps(record) + "\n"
+        finally:
+            # Spooled bodies and uploads over 1 MB live in temporary files on disk.
+            source.close()
 
-    # Run the flow and get the full final state (all details)
-    result = process_clinical_summary(data)
-    return JSONResponse(result) 
\ No newline at end of file
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@router.get(
+    "/policies",
+    summary="Registered payer policies",
+    response_description="Id, name and number of structured and judgement criteria of every policy."
+)
+async def list_policies():
+    """
+    The policies claims can be evaluated against with `policy_id`; the one named by `default` is
+    used when none is given.
+    """
+    policies = get_policy_registry()
+    return JSONResponse({"default": policies.default_id, "policies": policies.describe()})
+
+@router.post(
+    "/jobs",
+    status_code=202,
+    summary="Submit clinical summaries as a background validation job",
+    response_description="The job id and where to poll its status and fetch its results."
+)
+async def submit_job(
+    request: Request,
+    use_cache: bool = Query(True, description="Set to false to bypass cached LLM results for this job."),
+    mode: str = Query("standard", description="Pipeline variant: " + ", ".join(PIPELINE_MODES) + "."),
+    policy_id: Optional[List[str]] = Query(None, description=POLICY_ID_DESCRIPTION)
+):
+    """
+    Queue a single summary, a JSON array or NDJSON (raw body or multipart `file`) for validation
+    by the background workers and return immediately. Jobs are persisted, so they survive restarts.
+    """
+    _check_mode(mode)
+    policy_ids = _check_policies(policy_id)
+    items, source = await _read_batch_items(request, allow_single=True)
+    store = get_job_store()
+    job_id = None
+    try:
+        job_id = await asyncio.to_thread(store.create_job, use_cache, mode, policy_ids)
+        chunk = []
+        async for item in aiter_items(items):
+            chunk.append(item)
+            if len(chunk) >= 500:
+                await asyncio.to_thread(store.add_items, job_id, chunk)
+                chunk = []
+        if chunk:
+            await asyncio.to_thread(store.add_items, job_id, chunk)
+        await asyncio.to_thread(store.seal_job, job_id)
+    except BaseException:
+        # A job left in "submitting" would never be claimed or pruned.
+        if job_id is not None:
+            await asyncio.to_thread(store.delete_job, job_id)
+        raise
+    finally:
+        source.close()
+    status = await asyncio.to_thread(store.status, job_id)
+    return JSONResponse(
+        {
+            **status,
+            "status_url": f"{request.url.path}/{job_id}",
+            "events_url": f"{request.url.path}/{job_id}/events",
+            "results_url": f"{request.url.path}/{job_id}/results",
+        },
+        status_code=202
+    )
+
+async def _job_status_or_404(job_id: str):
+    status = await asyncio.to_thread(get_job_store().status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'.")
+    return status
+
+@router.get(
+    "/jobs/{job_id}",
+    summary="Status of a validation job",
+    response_description="Job state and item counts by status."
+)
+async def job_status(job_id: str):
+    """
+    Poll a job: status is queued, running or completed, with pending/running/done/failed counts.
+    """
+    return JSONResponse(await _job_status_or_404(job_id))
+
+@router.get(
+    "/jobs/{job_id}/events",
+    summary="Stream a job's status until it completes",
+    response_description="NDJSON status snapshots, one per change."
+)
+async def job_events(job_id: str, interval: float = Query(1.0, ge=0.1, le=60, description="Seconds between checks.")):
+    """
+    Stream the job status as NDJSON whenever it changes, ending once the job is completed.
+    """
+    status = await _job_status_or_404(job_id)
+
+    async def events():
+        current = status
+        last = None
+        while True:
+            if current != last:
+                yield json.dumps(current) + "\n"
+                last = current
+            if current["status"] == "completed":
+                return
+            await asyncio.sleep(interval)
+            current = await asyncio.to_thread(get_job_store().status, job_id)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.get(
+    "/jobs/{job_id}/results",
+    summary="Results of a validation job",
+    response_description="NDJSON lines {index, ok, result} or {index, ok: false, error}, in input order."
+)
+async def job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0, description="Skip items with a lower input index."),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of results to return.")
+):
+    """
+    Stream the finished items of a job in input order; call again later for items still in progress.
+    """
+    await _job_status_or_404(job_id)
+    store = get_job_store()
+
+    async def results():
+        async for record in store.aresults(job_id, offset=offset, limit=limit):
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@router.post(
+    "/admin/reload",
+    summary="Hot-reload the compiled validation flow, LLM clients and parsers",
+    response_description="The registry state after the reload."
+)
+async def reload_flow():
+    """
+    Rebuild every cached flow, LLM client and output parser, e.g. after rotating the GROQ API key.
+    Requests already in flight finish on the previous objects.
+    """
+    try:
+        # Reloading re-reads policies and rebuilds every flow; keep the event loop serving meanwhile.
+        await asyncio.to_thread(registry.reload)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return JSONResponse(registry.stats())
+
+
+@router.get(
+    "/stats",
+    summary="Process-local counters and registry state",
+    response_description="Counters such as guardrail decisions and LLM calls avoided."
+)
+async def stats():
+    """
+    Return the in-process counters (e.g. guardrail_llm_calls_avoided_total, cache hits/misses),
+    the result cache size, registry state and this worker process's cold start and memory.
+    """
+    cache = get_result_cache()
+    entries = None
+    if cache is not None:
+        entries = await asyncio.to_thread(len, cache.backend) if cache.backend.blocking else len(cache.backend)
+    return JSONResponse({
+        "counters": metrics.snapshot(),
+        "cache": {"backend": type(cache.backend).__name__, "entries": entries} if cache else None,
+        "registry": registry.stats(),
+        "process": process_stats(),
+    })
+
+
+@root_router.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    response_class=PlainTextResponse,
+    response_description="Counters and latency histograms in the Prometheus text exposition format."
+)
+async def prometheus_metrics():
+    """
+    Process-local counters and histograms (per-stage wall time, queue wait, LLM calls, tokens,
+    parser retries, cache hits) for Prometheus to scrape.
+    """
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
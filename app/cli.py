@@ -0,0 +1,248 @@
+"""
+Bulk validation from the command line, without going through the HTTP API:
+
+    medicheck-validate archive/ 'exports/2024-*.ndjson' --output results.ndjson --concurrency 16
+
+Each input is a directory (every *.json, *.ndjson and *.jsonl file below it), a glob pattern or a
+file. A .json file holds one summary; .ndjson/.jsonl files one summary per line. Inputs are read
+lazily and results are appended to --output (NDJSON, or CSV with --format csv) as each summary
+completes, with a throughput report on stderr.
+
+Every finished item is recorded in a checkpoint file (--checkpoint, by default next to the
+output), so rerunning the same command after an interruption skips what is already done.
+--retry-failed also reruns the items that failed; --restart starts over.
+"""
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+SUMMARY_SUFFIXES = (".json", ".ndjson", ".jsonl")
+CSV_FIELDS = (
+    "source", "ok", "error", "insurance_summary", "valid_summary", "policy_id", "approved",
+    "policy_path", "missing_fields", "rejection_reason", "message",
+)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    from app.utils.settings import get_settings
+    settings = get_settings()
+    parser = argparse.ArgumentParser(
+        prog="medicheck-validate", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("inputs", nargs="+", help="directories, glob patterns or summary files")
+    parser.add_argument("--output", "-o", default="-", help="results file (default: stdout)")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default=None, help="output format (default: from the --output suffix, else ndjson)")
+    parser.add_argument("--concurrency", "-c", type=int, default=settings.batch_concurrency, help="summaries validated at once (default: MEDICHECK_BATCH_CONCURRENCY)")
+    parser.add_argument("--mode", choices=("standard", "fused", "parallel"), default="standard", help="pipeline mode")
+    parser.add_argument("--policy-id", action="append", dest="policy_ids", help="policy to evaluate against (repeatable)")
+    parser.add_argument("--no-cache", action="store_true", help="bypass cached LLM results")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default: <output>.checkpoint; none when writing to stdout)")
+    parser.add_argument("--retry-failed", action="store_true", help="on resume, rerun items recorded as failed")
+    parser.add_argument("--restart", action="store_true", help="ignore and truncate an existing checkpoint and output")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="seconds between progress reports (0 disables them)")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.format is None:
+        args.format = "csv" if args.output.lower().endswith(".csv") else "ndjson"
+    if args.checkpoint is None and args.output != "-":
+        args.checkpoint = args.output + ".checkpoint"
+    return args
+
+
+def iter_files(inputs: List[str]) -> Iterator[str]:
+    """
+    The summary files named by the inputs, each once, directories walked in sorted order.
+    """
+    seen = set()
+    for spec in inputs:
+        if os.path.isdir(spec):
+            paths = _walk(spec)
+        elif os.path.exists(spec):
+            paths = iter([spec])
+        else:
+            paths = (path for path in sorted(glob.iglob(spec, recursive=True)) if os.path.isfile(path))
+        for path in paths:
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                yield path
+
+
+def _walk(directory: str) -> Iterator[str]:
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in sorted(names):
+            if name.lower().endswith(SUMMARY_SUFFIXES):
+                yield os.path.join(root, name)
+
+
+def iter_summaries(inputs: List[str], max_bytes: int) -> Iterator[Tuple[str, Any]]:
+    """
+    (source, summary) per summary, decoded lazily; the source names the file, plus the line
+    number for NDJSON, and identifies the item in the checkpoint. Undecodable summaries are
+    yielded as ItemError.
+    """
+    from app.services.batch import ItemError, decode_summary
+    for path in iter_files(inputs):
+        try:
+            if path.lower().endswith((".ndjson", ".jsonl")):
+                with open(path, "rb") as f:
+                    for number, line in enumerate(f, 1):
+                        if line.strip():
+                            yield f"{path}:{number}", decode_summary(line, max_bytes)
+            else:
+                with open(path, "rb") as f:
+                    yield path, decode_summary(f.read(max_bytes + 1), max_bytes)
+        except OSError as e:
+            yield path, ItemError(f"Cannot read file: {e}")
+
+
+class Checkpoint:
+    """
+    Append-only record of finished items ("ok\\t<source>" or "error\\t<source>"), flushed after
+    the item's result was written, so an interrupted run loses at most the items in flight.
+    """
+    def __init__(self, path: Optional[str], restart: bool):
+        self.path = path
+        self.status: Dict[str, str] = {}
+        self._file: Optional[TextIO] = None
+        if path is None:
+            return
+        if not restart and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    status, _, source = line.rstrip("\n").partition("\t")
+                    if source:
+                        self.status[source] = status
+        self._file = open(path, "w" if restart else "a", encoding="utf-8")
+
+    def done(self, source: str, retry_failed: bool) -> bool:
+        status = self.status.get(source)
+        return status == "ok" or (status is not None and not retry_failed)
+
+    def record(self, source: str, ok: bool) -> None:
+        if self._file is not None:
+            self._file.write(f"{'ok' if ok else 'error'}\t{source}\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+class ResultWriter:
+    """
+    Writes one line per finished item, flushed as it goes.
+    """
+    def __init__(self, path: str, fmt: str, restart: bool):
+        if path == "-":
+            self._file, self._close = sys.stdout, False
+        else:
+            self._file, self._close = open(path, "w" if restart else "a", encoding="utf-8", newline=""), True
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if not self._file.seekable() or self._file.tell() == 0:
+                self._csv.writeheader()
+
+    def write(self, source: str, record: Dict[str, Any]) -> None:
+        if self._csv is not None:
+            row = {"source": source, "ok": record["ok"], "error": record.get("error", "")}
+            for key, value in record.get("result", {}).items():
+                row[key] = "; ".join(map(str, value)) if isinstance(value, list) else value
+            self._csv.writerow(row)
+        else:
+            line = {"source": source, **{key: value for key, value in record.items() if key != "index"}}
+            self._file.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._close:
+            self._file.close()
+
+
+class Progress:
+    """
+    Throughput report on stderr: items done, failed and skipped (already in the checkpoint),
+    items per second overall and over the last interval.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.started = self._last_at = time.monotonic()
+        self._last_done = 0
+        self.done = self.failed = self.skipped = 0
+
+    def update(self, ok: bool) -> None:
+        self.done += 1
+        self.failed += not ok
+        now = time.monotonic()
+        if self.interval and now - self._last_at >= self.interval:
+            recent = (self.done - self._last_done) / (now - self._last_at)
+            self._report(f"{recent:.1f}/s now")
+            self._last_at, self._last_done = now, self.done
+
+    def _report(self, extra: str = "") -> None:
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        line = f"{self.done} done, {self.failed} failed, {self.skipped} skipped in {elapsed:.1f}s ({rate:.1f}/s"
+        print(line + (f", {extra})" if extra else ")"), file=sys.stderr, flush=True)
+
+    def finish(self) -> None:
+        self._report()
+
+
+async def run(args: argparse.Namespace) -> int:
+    # Imported here so --help starts without the flow and its LLM clients.
+    from app.services.batch import run_batch
+    from app.utils.settings import get_settings
+    checkpoint = Checkpoint(args.checkpoint, args.restart)
+    writer = ResultWriter(args.output, args.format, args.restart)
+    progress = Progress(args.progress_interval)
+    sources: Dict[int, str] = {}
+
+    def items() -> Iterator[Tuple[int, Any]]:
+        for index, (source, summary) in enumerate(iter_summaries(args.inputs, get_settings().max_summary_bytes)):
+            if checkpoint.done(source, args.retry_failed):
+                progress.skipped += 1
+                continue
+            sources[index] = source
+            yield index, summary
+
+    try:
+        async for record in run_batch(
+            items(), args.concurrency, use_cache=not args.no_cache, mode=args.mode, policy_ids=args.policy_ids
+        ):
+            source = sources.pop(record["index"])
+            writer.write(source, record)
+            checkpoint.record(source, record["ok"])
+            progress.update(record["ok"])
+    finally:
+        writer.close()
+        checkpoint.close()
+        progress.finish()
+    return 1 if progress.failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Entry point of `medicheck-validate`. Exits 1 when any summary failed, 130 when interrupted
+    (rerun the command to resume from the checkpoint).
+    """
+    args = parse_args(argv)
+    try:
+        sys.exit(asyncio.run(run(args)))
+    except KeyboardInterrupt:
+        if args.checkpoint:
+            print(f"Interrupted; rerun to resume from {args.checkpoint}.", file=sys.stderr)
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,19 @@
-import os
-from typing import Dict, Any, TypedDict, List
+import time
+from typing import Dict, Any, AsyncIterator, TypedDict, List, Optional, Sequence
 from typing_extensions import TypedDict
-import json
-from langgraph.graph import StateGraph, START, END
-from dotenv import load_dotenv
-from app.services.guardrail import check_is_insurance_summary
-from app.services.validator import validate_clinical_summary
-from app.services.policy import evaluate_policy
+from langchain_core.runnables import RunnableLambda
+from app.services.guardrail import check_is_insurance_summary, acheck_is_insurance_summary
+from app.services.validator import validate_clinical_summary, avalidate_clinical_summary
+from app.services.policy import evaluate_policies, aevaluate_policies, selected_policy_ids
+from app.services.fused import check_and_evaluate, acheck_and_evaluate
+from app.services.speculative import check_validate_evaluate, acheck_validate_evaluate
+from app.services.ingest import ParsedSummary, SummaryInput, ensure_parsed
+from app.utils.registry import registry
+from app.utils.metrics import metrics, record_timing
 
-load_dotenv()
+# Route names the routers return to finish the flow; mapped to langgraph's END when the graphs
+# are compiled, so langgraph itself is only imported by the flow builders.
+FLOW_END = "end"
 
 
 class AgentState(TypedDict):
@@ -16,29 +21,29 @@ class AgentState(TypedDict):
     Represents the state passed between nodes in the validation flow.
     """
     input_json: Dict[str, Any]
+    summary: ParsedSummary
+    use_cache: bool
+    policy_ids: List[str]
+    stream: bool
     is_insurance_summary: bool
+    guardrail_path: str
     is_valid: bool
     missing_fields: List[str]
     suggestions: List[str]
     policy_approved: bool
+    policy_path: str
     failed_criteria: List[str]
+    policies: List[Dict[str, Any]]
     final_response: str
 
-def guardrail_node(state: AgentState) -> AgentState:
-    """
-    Node: Checks if the input JSON is a valid insurance summary using the LLM guardrail.
-    """
-    result = check_is_insurance_summary(state["input_json"])
+def _apply_guardrail(state: AgentState, result: Dict[str, Any]) -> AgentState:
     state["is_insurance_summary"] = result.get("is_insurance_summary", False)
+    state["guardrail_path"] = result.get("decision_path", "llm")
     if state["is_insurance_summary"] == False:
         state["final_response"] = result.get("polite_message")
     return state
 
-def validation_node(state: AgentState) -> AgentState:
-    """
-    Node: Validates the clinical summary fields and provides LLM-generated suggestions if invalid.
-    """
-    result = validate_clinical_summary(state["input_json"])
+def _apply_validation(state: AgentState, result: Dict[str, Any]) -> AgentState:
     state["is_valid"] = result["is_valid"]
     state["missing_fields"] = result["missing_fields"]
     state["suggestions"] = result["suggestions"]
@@ -49,22 +54,148 @@ def validation_node(state: AgentState) -> AgentState:
             state["final_response"] = "Clinical summary is missing required fields."
     return state
 
-def policy_node(state: AgentState) -> AgentState:
+def _apply_policy(state: AgentState, results: List[Dict[str, Any]]) -> AgentState:
     """
-    Node: Evaluates the clinical summary against the insurance policy using the LLM.
+    One result per requested policy; the first (primary) policy decides the top-level outcome.
     """
-    result = evaluate_policy(state["input_json"])
+    state["policies"] = results
+    result = results[0]
     state["policy_approved"] = result["policy_approved"]
+    state["policy_path"] = result.get("decision_path", "llm")
     state["failed_criteria"] = result["failed_criteria"]
     state["final_response"] = result["policy_message"]
     return state
 
+def guardrail_node(state: AgentState) -> AgentState:
+    """
+    Node: Checks if the input JSON is a valid insurance summary using the LLM guardrail.
+    """
+    return _apply_guardrail(state, check_is_insurance_summary(state["summary"], use_cache=state["use_cache"]))
+
+async def aguardrail_node(state: AgentState) -> AgentState:
+    """
+    Async node: awaits the LLM guardrail.
+    """
+    return _apply_guardrail(state, await acheck_is_insurance_summary(state["summary"], use_cache=state["use_cache"]))
+
+def validation_node(state: AgentState) -> AgentState:
+    """
+    Node: Validates the clinical summary fields and provides LLM-generated suggestions if invalid.
+    """
+    return _apply_validation(state, validate_clinical_summary(state["summary"], use_cache=state["use_cache"]))
+
+async def avalidation_node(state: AgentState) -> AgentState:
+    """
+    Async node: validates locally and awaits the LLM suggestions if invalid.
+    """
+    return _apply_validation(state, await avalidate_clinical_summary(state["summary"], use_cache=state["use_cache"]))
+
+def policy_node(state: AgentState) -> AgentState:
+    """
+    Node: Evaluates the clinical summary against the requested insurance policies (local rules
+    first, then the LLM; several policies are evaluated concurrently).
+    """
+    return _apply_policy(state, evaluate_policies(state["summary"], state["policy_ids"], use_cache=state["use_cache"]))
+
+def _token_writer(stage: str):
+    """
+    Callback forwarding text generated for a policy to the graph's custom stream as token events.
+    """
+    from langgraph.config import get_stream_writer
+    writer = get_stream_writer()
+    return lambda policy_id, text: writer({"event": "token", "data": {"stage": stage, "policy_id": policy_id, "text": text}})
+
+async def apolicy_node(state: AgentState) -> AgentState:
+    """
+    Async node: awaits the LLM policy evaluation, streaming the policy message when the flow
+    is run by astream_clinical_summary.
+    """
+    on_token = _token_writer("policy") if state.get("stream") else None
+    return _apply_policy(state, await aevaluate_policies(
+        state["summary"], state["policy_ids"], use_cache=state["use_cache"], on_token=on_token
+    ))
+
+def schema_node(state: AgentState) -> AgentState:
+    """
+    Node (fused mode): local ClinicalSummary schema check only, no LLM.
+    """
+    state["is_valid"] = state["summary"].is_valid
+    return state
+
+def _apply_fused(state: AgentState, guardrail: Dict[str, Any], policies: Any) -> AgentState:
+    state = _apply_guardrail(state, guardrail)
+    if policies is not None:
+        state = _apply_policy(state, policies)
+    return state
+
+def fused_node(state: AgentState) -> AgentState:
+    """
+    Node (fused mode): guardrail and policy evaluation with a single combined LLM call where
+    the standard flow would make two.
+    """
+    return _apply_fused(state, *check_and_evaluate(state["summary"], state["use_cache"], state["policy_ids"]))
+
+async def afused_node(state: AgentState) -> AgentState:
+    """
+    Async node (fused mode).
+    """
+    return _apply_fused(state, *await acheck_and_evaluate(state["summary"], state["use_cache"], state["policy_ids"]))
+
+def _apply_parallel(state: AgentState, guardrail: Dict[str, Any], validation: Any, policies: Any) -> AgentState:
+    state = _apply_guardrail(state, guardrail)
+    if validation is not None:
+        state = _apply_validation(state, validation)
+    if policies is not None:
+        state = _apply_policy(state, policies)
+    return state
+
+def parallel_node(state: AgentState) -> AgentState:
+    """
+    Node (parallel mode): runs validation, and speculatively the policy evaluation, while the
+    guardrail LLM call is in flight; their results are dropped if the guardrail rejects (calls
+    already in flight still complete). Summaries the structural guardrail decides run in sequence.
+    """
+    return _apply_parallel(state, *check_validate_evaluate(state["summary"], state["use_cache"], state["policy_ids"]))
+
+async def aparallel_node(state: AgentState) -> AgentState:
+    """
+    Async node (parallel mode); speculative calls are cancelled when the guardrail rejects.
+    """
+    return _apply_parallel(state, *await acheck_validate_evaluate(state["summary"], state["use_cache"], state["policy_ids"]))
+
+def _record_node(name: str, start: float) -> None:
+    elapsed = time.perf_counter() - start
+    metrics.observe("graph_node_seconds", elapsed, node=name)
+    record_timing("nodes", name, wall_ms=elapsed * 1000)
+
+def _node(name: str, func, afunc=None) -> RunnableLambda:
+    """
+    Wrap a node's sync (and optional async) implementation so its wall time is recorded.
+    """
+    def timed(state: AgentState) -> AgentState:
+        start = time.perf_counter()
+        try:
+            return func(state)
+        finally:
+            _record_node(name, start)
+
+    async def atimed(state: AgentState) -> AgentState:
+        start = time.perf_counter()
+        try:
+            return await afunc(state)
+        finally:
+            _record_node(name, start)
+
+    if afunc is None:
+        return RunnableLambda(timed, name=name)
+    return RunnableLambda(timed, afunc=atimed, name=name)
+
 def guardrail_router(state: AgentState) -> str:
     """
     Router: Decides whether to proceed to validation or end if not an insurance summary.
     """
     if state["is_insurance_summary"] == False:
-        return END
+        return FLOW_END
     else:
         return "validation"
 
@@ -75,23 +206,27 @@ def validation_router(state: AgentState) -> str:
     if state["is_valid"] == True:
         return "policy"
     else:
-        return END
+        return FLOW_END
 
-def create_validation_flow() -> StateGraph:
+def create_validation_flow():
     """
-    Constructs the validation flow graph with guardrail, validation, and policy nodes.
+    Constructs and compiles the validation flow graph with guardrail, validation, and policy nodes.
+    Each node has a sync and an async implementation, so the compiled graph supports both
+    invoke and ainvoke. Prefer registry.get_flow() over calling this directly; compiling is
+    done once per process.
     """
+    from langgraph.graph import StateGraph, START, END
     workflow = StateGraph(AgentState)
-    workflow.add_node("guardrail", guardrail_node)
-    workflow.add_node("validation", validation_node)
-    workflow.add_node("policy", policy_node)
+    workflow.add_node("guardrail", _node("guardrail", guardrail_node, aguardrail_node))
+    workflow.add_node("validation", _node("validation", validation_node, avalidation_node))
+    workflow.add_node("policy", _node("policy", policy_node, apolicy_node))
 
     workflow.add_edge(START, "guardrail")
     workflow.add_conditional_edges(
         "guardrail",
         guardrail_router,
         {
-            END: END,
+            FLOW_END: END,
             "validation": "validation"
         }
     )
@@ -100,35 +235,224 @@ def create_validation_flow() -> StateGraph:
         validation_router,
         {
             "policy": "policy",
-            END: END
+            FLOW_END: END
         }
     )
     workflow.add_edge("policy", END)
     return workflow.compile()
 
-def process_clinical_summary(input_json: Dict[str, Any]) -> Dict[str, Any]:
+def schema_router(state: AgentState) -> str:
     """
-    Orchestrates the validation flow for a clinical summary JSON.
-    Returns the full final state with all details for frontend handling.
+    Router (fused mode): schema-valid summaries go to the fused node, the rest take the
+    standard guardrail -> validation path for suggestions.
+    """
+    if state["is_valid"] == True:
+        return "fused"
+    else:
+        return "guardrail"
+
+def create_fused_validation_flow():
     """
-    flow = create_validation_flow()
-    initial_state: AgentState = {
-        "input_json": input_json,
+    Constructs and compiles the fused-mode flow: after a local schema check passes, guardrail
+    and policy share one LLM round-trip; invalid summaries are handled as in the standard flow.
+    """
+    from langgraph.graph import StateGraph, START, END
+    workflow = StateGraph(AgentState)
+    workflow.add_node("schema", _node("schema", schema_node))
+    workflow.add_node("fused", _node("fused", fused_node, afused_node))
+    workflow.add_node("guardrail", _node("guardrail", guardrail_node, aguardrail_node))
+    workflow.add_node("validation", _node("validation", validation_node, avalidation_node))
+
+    workflow.add_edge(START, "schema")
+    workflow.add_conditional_edges(
+        "schema",
+        schema_router,
+        {
+            "fused": "fused",
+            "guardrail": "guardrail"
+        }
+    )
+    workflow.add_conditional_edges(
+        "guardrail",
+        guardrail_router,
+        {
+            FLOW_END: END,
+            "validation": "validation"
+        }
+    )
+    workflow.add_edge("validation", END)
+    workflow.add_edge("fused", END)
+    return workflow.compile()
+
+def create_parallel_validation_flow():
+    """
+    Constructs and compiles the parallel-mode flow: a single node that overlaps the guardrail,
+    validation and policy stages, so latency approaches the slowest stage instead of the sum.
+    """
+    from langgraph.graph import StateGraph, START, END
+    workflow = StateGraph(AgentState)
+    workflow.add_node("parallel", _node("parallel", parallel_node, aparallel_node))
+    workflow.add_edge(START, "parallel")
+    workflow.add_edge("parallel", END)
+    return workflow.compile()
+
+registry.register_flow("standard", create_validation_flow)
+registry.register_flow("fused", create_fused_validation_flow)
+registry.register_flow("parallel", create_parallel_validation_flow)
+
+PIPELINE_MODES = ("standard", "fused", "parallel")
+
+def _initial_state(
+    input_json: SummaryInput, use_cache: bool, policy_ids: Optional[Sequence[str]] = None, stream: bool = False
+) -> AgentState:
+    summary = ensure_parsed(input_json)
+    return {
+        "input_json": summary.data,
+        "summary": summary,
+        "use_cache": use_cache,
+        "policy_ids": selected_policy_ids(policy_ids),
+        "stream": stream,
         "is_insurance_summary": False,
+        "guardrail_path": "",
         "is_valid": False,
         "missing_fields": [],
         "suggestions": [],
         "policy_approved": False,
+        "policy_path": "",
         "failed_criteria": [],
+        "policies": [],
         "final_response": "",
     }
-    final_state = flow.invoke(initial_state)
-    return {
+
+def _policy_entry(result: Dict[str, Any]) -> Dict[str, Any]:
+    entry = {
+        "policy_id": result["policy_id"],
+        "approved": result["policy_approved"],
+        "policy_path": result.get("decision_path", "llm"),
+        "rejection_reason": result["failed_criteria"],
+        "message": result["policy_message"],
+    }
+    return _with_reuse(entry, result)
+
+def _with_reuse(data: Dict[str, Any], result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Report a decision reused from an equivalent earlier claim (app/services/decision_index.py).
+    """
+    if result and result.get("decision_reuse"):
+        data["decision_reuse"] = result["decision_reuse"]
+    return data
+
+def _primary_policy(state: AgentState) -> Optional[Dict[str, Any]]:
+    return state["policies"][0] if state["policies"] else None
+
+def _to_response(final_state: AgentState) -> Dict[str, Any]:
+    response = {
         "insurance_summary" : final_state["is_insurance_summary"] ,
+        "guardrail_path" : final_state["guardrail_path"] ,
         "valid_summary" : final_state["is_valid"] ,
         "missing_fields" : final_state["missing_fields"] ,
         "suggestions" : final_state["suggestions"] ,
+        "policy_id" : final_state["policy_ids"][0] ,
         "approved" : final_state["policy_approved"] ,
+        "policy_path" : final_state["policy_path"] ,
         "rejection_reason" : final_state["failed_criteria"] ,
         "message" : final_state["final_response"]
-    }
\ No newline at end of file
+    }
+    _with_reuse(response, _primary_policy(final_state))
+    # Evaluated against several policies: the top-level outcome is the first one's.
+    if len(final_state["policy_ids"]) > 1:
+        response["policies"] = [_policy_entry(result) for result in final_state["policies"]]
+    return response
+
+def process_clinical_summary(
+    input_json: SummaryInput, use_cache: bool = True, mode: str = "standard", policy_ids: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """
+    Orchestrates the validation flow for a clinical summary JSON (decoded, or a ParsedSummary;
+    ParsedSummary.from_json decodes raw bytes once and every stage shares that decoded value).
+    Set use_cache to False to bypass cached LLM stage results for this request; mode selects
+    the pipeline variant (one of PIPELINE_MODES); policy_ids selects the registered policies
+    to evaluate against (default: the default policy).
+    Returns the full final state with all details for frontend handling.
+    """
+    flow = registry.get_flow(mode)
+    with metrics.timer("flow_seconds", mode=mode):
+        final_state = flow.invoke(_initial_state(input_json, use_cache, policy_ids))
+    return _to_response(final_state)
+
+async def aprocess_clinical_summary(
+    input_json: SummaryInput, use_cache: bool = True, mode: str = "standard", policy_ids: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """
+    Async variant of process_clinical_summary for use inside the event loop.
+    """
+    flow = registry.get_flow(mode)
+    with metrics.timer("flow_seconds", mode=mode):
+        final_state = await flow.ainvoke(_initial_state(input_json, use_cache, policy_ids))
+    return _to_response(final_state)
+
+
+# Stage events each node's update is reported as by astream_clinical_summary; the fused and
+# parallel nodes settle several stages at once.
+NODE_EVENTS = {
+    "guardrail": ("guardrail",),
+    "validation": ("validation",),
+    "policy": ("policy",),
+    "fused": ("guardrail", "validation", "policy"),
+    "parallel": ("guardrail", "validation", "policy"),
+}
+
+def _stage_event(event: str, state: AgentState) -> Any:
+    if event == "guardrail":
+        return {
+            "insurance_summary": state["is_insurance_summary"],
+            "guardrail_path": state["guardrail_path"],
+            "message": "" if state["is_insurance_summary"] else state["final_response"],
+        }
+    if event == "validation" and state["is_insurance_summary"]:
+        return {
+            "valid_summary": state["is_valid"],
+            "missing_fields": state["missing_fields"],
+            "suggestions": state["suggestions"],
+        }
+    if event == "policy" and state["policy_path"]:
+        data = {
+            "policy_id": state["policy_ids"][0],
+            "approved": state["policy_approved"],
+            "policy_path": state["policy_path"],
+            "rejection_reason": state["failed_criteria"],
+            "message": state["final_response"],
+        }
+        _with_reuse(data, _primary_policy(state))
+        if len(state["policy_ids"]) > 1:
+            data["policies"] = [_policy_entry(result) for result in state["policies"]]
+        return data
+    return None
+
+async def astream_clinical_summary(
+    input_json: SummaryInput, use_cache: bool = True, mode: str = "standard", policy_ids: Optional[Sequence[str]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the validation flow and yield {"event", "data"} dicts as it progresses: one per stage
+    decided ("guardrail", "validation", "policy"), "token" events carrying pieces of the policy
+    messages (tagged with their policy_id) while the LLM generates them (standard mode), and a
+    final "result" event with the same payload process_clinical_summary returns.
+    """
+    flow = registry.get_flow(mode)
+    final_state = None
+    start = time.perf_counter()
+    async for stream_mode, chunk in flow.astream(
+        _initial_state(input_json, use_cache, policy_ids, stream=True), stream_mode=["updates", "custom", "values"]
+    ):
+        if stream_mode == "custom":
+            yield chunk
+        elif stream_mode == "values":
+            final_state = chunk
+        else:
+            for node, state in chunk.items():
+                for event in NODE_EVENTS.get(node, ()):
+                    data = _stage_event(event, state)
+                    if data is not None:
+                        yield {"event": event, "data": data}
+    metrics.observe("flow_seconds", time.perf_counter() - start, mode=mode)
+    yield {"event": "result", "data": _to_response(final_state)}
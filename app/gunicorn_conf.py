@@ -0,0 +1,44 @@
+"""
+Multi-process serving: gunicorn managing uvicorn workers, with the app preloaded in the master.
+
+    pip install gunicorn uvicorn-worker
+    gunicorn -c python:app.gunicorn_conf app.main:app
+
+MEDICHECK_SERVE_WORKERS (default: one per CPU), MEDICHECK_SERVE_BIND (0.0.0.0:8000) and
+MEDICHECK_SERVE_PRELOAD (true) configure it. With several workers, the result cache and the LLM
+rate budget default to the shared SQLite stores so workers do not each get their own.
+"""
+import os
+from app import serving
+from app.utils.settings import get_settings
+
+_settings = get_settings()
+
+workers = _settings.serve_workers or os.cpu_count() or 1
+bind = _settings.serve_bind
+preload_app = _settings.serve_preload
+try:
+    import uvicorn_worker  # noqa: F401
+    worker_class = "uvicorn_worker.UvicornWorker"
+except ImportError:
+    worker_class = "uvicorn.workers.UvicornWorker"
+# LLM calls can stream for a while; let workers finish them on reload/shutdown.
+graceful_timeout = 60
+timeout = 120
+
+if workers > 1:
+    os.environ.setdefault("MEDICHECK_CACHE_BACKEND", "sqlite")
+    os.environ.setdefault("MEDICHECK_LLM_RATE_LIMIT_BACKEND", "sqlite")
+    get_settings.cache_clear()
+
+
+def on_starting(server):
+    """
+    Master, after the preloaded app was imported: build and freeze the shared state once.
+    """
+    if server.cfg.preload_app:
+        serving.preload()
+
+
+def post_fork(server, worker):
+    serving.after_fork()
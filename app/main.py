@@ -1,6 +1,38 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api.endpoints import router as v1_router
+from app import serving
+from app.api.endpoints import router as v1_router, root_router
+from app.utils.registry import registry
+from app.utils.settings import get_settings
+from app.services.jobs import JobWorkerPool, get_job_store
 
-app = FastAPI(title="MediCheck: AI Insurance Validator for Clinical Summaries")
 
-app.include_router(v1_router, prefix="/api")
\ No newline at end of file
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build the compiled validation flow, LLM clients and parsers once before serving requests
+    (already done when the gunicorn master preloaded them), and run the job workers for the
+    lifetime of the app.
+    """
+    registry.warm_up()
+    settings = get_settings()
+    job_pool = None
+    if settings.job_workers > 0:
+        job_pool = JobWorkerPool(
+            get_job_store(),
+            workers=settings.job_workers,
+            max_attempts=settings.job_max_attempts,
+            lease_seconds=settings.job_lease_seconds,
+            retention_seconds=settings.job_retention_seconds,
+        )
+        job_pool.start()
+    serving.mark_ready()
+    yield
+    if job_pool is not None:
+        await job_pool.stop()
+
+
+app = FastAPI(title="MediCheck: AI Insurance Validator for Clinical Summaries", lifespan=lifespan)
+
+app.include_router(v1_router, prefix="/api")
+app.include_router(root_router)
@@ -1,64 +1,67 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
 
+# Field descriptions and examples document the schema and drive the local missing-field
+# suggestions in app/services/suggestion_templates.py.
+
 class Vitals(BaseModel):
-    blood_pressure: str
-    heart_rate: int
-    temperature: float
+    blood_pressure: str = Field(description="blood pressure as systolic/diastolic in mmHg", examples=["120/80"])
+    heart_rate: int = Field(description="heart rate in beats per minute", examples=[72])
+    temperature: float = Field(description="body temperature in degrees Celsius", examples=[36.8])
 
 class PatientDemographics(BaseModel):
-    full_name: str
-    age: int
-    gender: str
-    weight: float
-    insurance_id: str
-    alcohol_use: Optional[bool] = False
-    smoking: Optional[bool] = False
-    substance_addiction: Optional[bool] = False
+    full_name: str = Field(description="the patient's full name", examples=["Jane Doe"])
+    age: int = Field(description="the patient's age in years", examples=[45])
+    gender: str = Field(description="the patient's gender", examples=["Female"])
+    weight: float = Field(description="the patient's weight in kilograms", examples=[68.5])
+    insurance_id: str = Field(description="the patient's insurance member ID", examples=["INS123456"])
+    alcohol_use: Optional[bool] = Field(False, description="whether the patient uses alcohol", examples=[False])
+    smoking: Optional[bool] = Field(False, description="whether the patient smokes", examples=[False])
+    substance_addiction: Optional[bool] = Field(False, description="whether the patient has a substance addiction", examples=[False])
 
 class HPI(BaseModel):
-    chief_complaint: str
-    duration: str
-    onset: str
-    associated_symptoms: List[str]
-    documentation_date: Optional[str] = None
-    vitals: Optional[Vitals] = None
+    chief_complaint: str = Field(description="the main reason the patient sought care", examples=["Chest pain"])
+    duration: str = Field(description="how long the complaint has lasted", examples=["3 days"])
+    onset: str = Field(description="how the complaint started", examples=["Sudden"])
+    associated_symptoms: List[str] = Field(description="other symptoms that accompany the complaint", examples=[["Shortness of breath", "Sweating"]])
+    documentation_date: Optional[str] = Field(None, description="the date the history was documented (YYYY-MM-DD)", examples=["2024-05-01"])
+    vitals: Optional[Vitals] = Field(None, description="the vital signs recorded at admission")
 
 class PastMedicalHistory(BaseModel):
-    chronic_illnesses: List[str]
-    surgical_history: Optional[List[str]] = []
-    allergies: Optional[List[str]] = []
-    medication_history: Optional[List[str]] = []
+    chronic_illnesses: List[str] = Field(description="the patient's long-term conditions", examples=[["Hypertension"]])
+    surgical_history: Optional[List[str]] = Field([], description="previous surgeries", examples=[["Appendectomy (2015)"]])
+    allergies: Optional[List[str]] = Field([], description="known allergies", examples=[["Penicillin"]])
+    medication_history: Optional[List[str]] = Field([], description="current and past medications", examples=[["Lisinopril 10 mg daily"]])
 
 class ProcedureOrTreatment(BaseModel):
-    date: str
-    procedure_name: str
-    performing_physician: str
-    justification: str
-    referral_note_attached: Optional[bool] = False
+    date: str = Field(description="the date of the procedure (YYYY-MM-DD)", examples=["2024-05-02"])
+    procedure_name: str = Field(description="the name of the procedure or treatment", examples=["Coronary angiography"])
+    performing_physician: str = Field(description="the physician who performed it", examples=["Dr. John Smith"])
+    justification: str = Field(description="why the procedure was medically necessary", examples=["Suspected coronary artery disease"])
+    referral_note_attached: Optional[bool] = Field(False, description="whether a referral note is attached", examples=[True])
 
 class ImagingLabResult(BaseModel):
-    type: str  # e.g., X-Ray, CT, MRI, CBC
-    date: str
-    findings: str
-    interpretation: Optional[str] = None
+    type: str = Field(description="the kind of test, e.g. X-Ray, CT, MRI, CBC", examples=["CBC"])
+    date: str = Field(description="the date of the test (YYYY-MM-DD)", examples=["2024-05-01"])
+    findings: str = Field(description="what the test found", examples=["Hemoglobin 13.5 g/dL"])
+    interpretation: Optional[str] = Field(None, description="the clinical interpretation of the findings", examples=["Within normal limits"])
 
 class DiagnosisDischargeSummary(BaseModel):
-    final_diagnosis: str
-    icd_10_code: str    
-    treatment_summary: str
-    discharge_plan: str
+    final_diagnosis: str = Field(description="the final diagnosis", examples=["Unstable angina"])
+    icd_10_code: str = Field(description="the ICD-10 code of the final diagnosis", examples=["I20.0"])
+    treatment_summary: str = Field(description="a summary of the treatment given", examples=["Medical management and angiography"])
+    discharge_plan: str = Field(description="follow-up instructions at discharge", examples=["Cardiology follow-up in 2 weeks"])
 
 class PhysicianSignature(BaseModel):
-    attending_physician: str
-    date_of_report: str
-    digital_signature: str
+    attending_physician: str = Field(description="the attending physician's name", examples=["Dr. John Smith"])
+    date_of_report: str = Field(description="the date the report was signed (YYYY-MM-DD)", examples=["2024-05-05"])
+    digital_signature: str = Field(description="the physician's digital signature", examples=["/s/ John Smith"])
 
 class ClinicalSummary(BaseModel):
-    patient_demographics: PatientDemographics
-    hpi: HPI
-    past_medical_history: PastMedicalHistory
-    procedures_treatments: List[ProcedureOrTreatment]
-    imaging_lab_results: List[ImagingLabResult]
-    diagnosis_discharge_summary: DiagnosisDischargeSummary
-    physician_signature: PhysicianSignature 
\ No newline at end of file
+    patient_demographics: PatientDemographics = Field(description="who the patient is")
+    hpi: HPI = Field(description="the history of present illness")
+    past_medical_history: PastMedicalHistory = Field(description="the patient's medical history")
+    procedures_treatments: List[ProcedureOrTreatment] = Field(description="the procedures and treatments performed")
+    imaging_lab_results: List[ImagingLabResult] = Field(description="imaging and laboratory results")
+    diagnosis_discharge_summary: DiagnosisDischargeSummary = Field(description="the diagnosis and discharge summary")
+    physician_signature: PhysicianSignature = Field(description="the attending physician's sign-off")
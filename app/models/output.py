@@ -13,4 +13,12 @@ class PolicyEvalOutput(BaseModel):
 class ValidatorOutput(BaseModel):
     is_valid: bool
     missing_fields: list[str]
-    suggestions: list[str] 
\ No newline at end of file
+    suggestions: list[str] 
+
+class FusedGuardrailPolicyOutput(BaseModel):
+    is_insurance_summary: bool
+    reason: str
+    polite_message: str
+    policy_approved: bool
+    failed_criteria: list[str]
+    policy_message: str
@@ -0,0 +1,15 @@
+POLICY_JUDGEMENT_PROMPT = """
+You are an expert insurance policy evaluator. The patient's clinical summary below has already been checked against the mechanically checkable criteria of the insurance policy. Judge ONLY the criteria listed here:
+
+{criteria}
+
+Return your answer in the following JSON format:
+{{
+  "policy_approved": true/false,
+  "failed_criteria": ["..."],
+  "policy_message": "A clear message for the user about approval or denial and why. Use markdown format to give a better look to it."
+}}
+
+Patient Clinical Summary:
+{patient_json}
+"""
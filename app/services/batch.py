@@ -0,0 +1,120 @@
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Optional, Sequence, Tuple, Union
+from app.services.ingest import ParsedSummary
+from app.utils.llm import PRIORITY_BATCH, llm_priority
+from app.utils.metrics import collect_timings
+
+
+class ItemError(Exception):
+    """
+    Marks a batch item that could not be decoded; reported in place of its result.
+    """
+
+
+async def aiter_ndjson(chunks: AsyncIterable[bytes], max_line_bytes: Optional[int] = None) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Decode NDJSON from a stream of byte chunks, yielding (index, summary) per non-blank line.
+    Lines that are not valid JSON, or longer than max_line_bytes, yield an ItemError instead of
+    aborting the batch; an oversized line is skipped without being buffered whole.
+    """
+    buffer = b""
+    index = 0
+    oversized = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if oversized:
+                oversized = False
+                yield index, _line_too_large(max_line_bytes)
+                index += 1
+            elif line.strip():
+                yield index, decode_summary(line, max_line_bytes)
+                index += 1
+        if max_line_bytes is not None and len(buffer) > max_line_bytes:
+            oversized, buffer = True, b""
+    if oversized:
+        yield index, _line_too_large(max_line_bytes)
+    elif buffer.strip():
+        yield index, decode_summary(buffer, max_line_bytes)
+
+
+def _line_too_large(max_line_bytes: int) -> ItemError:
+    return ItemError(f"Summary exceeds the limit of {max_line_bytes} bytes.")
+
+
+def decode_summary(line: bytes, max_line_bytes: Optional[int] = None) -> Any:
+    """
+    One summary's raw JSON (an NDJSON line or a whole file) as a ParsedSummary, or an ItemError
+    when it is not valid JSON or longer than max_line_bytes.
+    """
+    if max_line_bytes is not None and len(line) > max_line_bytes:
+        return _line_too_large(max_line_bytes)
+    try:
+        return ParsedSummary.from_json(line)
+    except ValueError as e:
+        return ItemError(f"Invalid JSON: {e}")
+
+
+async def aiter_items(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    """
+    Iterate a sync or async iterable asynchronously.
+    """
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def _run_item(
+    index: int, item: Any, use_cache: bool, mode: str, priority: int, timings: bool, policy_ids: Optional[Sequence[str]]
+) -> Dict[str, Any]:
+    # Imported on first use so tools reading or writing batches start without langgraph.
+    from app.flow_graph.langgraph import aprocess_clinical_summary
+    if isinstance(item, ItemError):
+        return {"index": index, "ok": False, "error": str(item)}
+    try:
+        with llm_priority(priority), collect_timings() as breakdown:
+            result = await aprocess_clinical_summary(item, use_cache=use_cache, mode=mode, policy_ids=policy_ids)
+    except Exception as e:
+        return {"index": index, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    if timings:
+        result = {**result, "timings": breakdown.as_dict()}
+    return {"index": index, "ok": True, "result": result}
+
+
+async def run_batch(
+    items: Union[Iterable[Tuple[int, Any]], AsyncIterable[Tuple[int, Any]]],
+    concurrency: int,
+    use_cache: bool = True,
+    mode: str = "standard",
+    priority: int = PRIORITY_BATCH,
+    timings: bool = False,
+    policy_ids: Optional[Sequence[str]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the validation flow over (index, summary) pairs with at most `concurrency` in flight,
+    yielding one record per item as soon as it completes (so not in input order).
+    Items are pulled lazily, so arbitrarily long inputs are never buffered in full.
+    A failing item yields {"index", "ok": False, "error"} and does not affect the others.
+    LLM calls are scheduled at batch priority, behind interactive requests. With timings, each
+    result carries its per-stage timing breakdown; policy_ids selects the policies every item is
+    evaluated against.
+    """
+    pending = set()
+    try:
+        async for index, item in aiter_items(items):
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            pending.add(asyncio.ensure_future(_run_item(index, item, use_cache, mode, priority, timings, policy_ids)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,287 @@
+import hashlib
+import math
+import re
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from functools import cached_property, lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.services.ingest import ParsedSummary
+from app.services.policy_rules import _parse_date
+from app.utils.cache import ResultCache, canonical_json, get_result_cache
+from app.utils.metrics import metrics
+from app.utils.prompt_payload import STAGE_PROJECTIONS, project
+from app.utils.settings import get_settings
+
+# Who the claim is about and who signed it, never what is being judged.
+IDENTIFIER_FIELDS = (
+    "patient_demographics.full_name",
+    "patient_demographics.insurance_id",
+    "physician_signature",
+)
+# Leaves whose value is an identifier but whose presence can matter ("recommended by a
+# treating physician"): fingerprinted as present/absent.
+PRESENCE_FIELDS = frozenset({"performing_physician"})
+# Dates become day offsets before the report date, so claims documented on a different day
+# but with the same intervals share a fingerprint.
+DATE_FIELDS = frozenset({"date", "documentation_date"})
+REFERENCE_DATE = ("physician_signature", "date_of_report")
+# Narrative leaves the nearest-neighbour mode compares by similarity; every other leaf (numbers,
+# flags, codes, vitals, day offsets, list lengths) has to match exactly.
+FREE_TEXT_FIELDS = frozenset({
+    "chief_complaint", "duration", "onset", "associated_symptoms",
+    "chronic_illnesses", "surgical_history", "allergies", "medication_history",
+    "procedure_name", "justification", "findings", "interpretation",
+    "final_diagnosis", "treatment_summary", "discharge_plan",
+})
+
+DECISION_INDEX_MODES = ("off", "fingerprint", "similar")
+# Feature hashing dimension of the bag-of-words vectors (sparse, so only collisions depend on it).
+VECTOR_DIM = 1 << 18
+_TOKEN = re.compile(r"[0-9a-z]+(?:\.[0-9]+)?")
+
+
+def _normalise_text(value: str) -> str:
+    return " ".join(value.split()).casefold()
+
+
+def _reference_date(data: Any) -> Optional[date]:
+    """
+    The date offsets are counted from: the report date, else the latest date in the claim.
+    """
+    signature = data.get(REFERENCE_DATE[0]) if isinstance(data, dict) else None
+    reference = _parse_date(signature.get(REFERENCE_DATE[1])) if isinstance(signature, dict) else None
+    if reference is not None:
+        return reference
+    dates = [d for d in (_parse_date(v) for v in _date_values(data)) if d is not None]
+    return max(dates, default=None)
+
+
+def _date_values(value: Any, key: Optional[str] = None) -> List[Any]:
+    if isinstance(value, dict):
+        return [v for k, item in value.items() for v in _date_values(item, k)]
+    if isinstance(value, list):
+        return [v for item in value for v in _date_values(item, key)]
+    return [value] if key in DATE_FIELDS else []
+
+
+def _normalise(value: Any, key: Optional[str], reference: Optional[date]) -> Any:
+    if isinstance(value, dict):
+        return {k: _normalise(item, k, reference) for k, item in value.items()}
+    if isinstance(value, list):
+        items = [_normalise(item, key, reference) for item in value]
+        return sorted(items, key=canonical_json)
+    if key in PRESENCE_FIELDS:
+        return bool(value.strip()) if isinstance(value, str) else value is not None
+    if key in DATE_FIELDS:
+        parsed = _parse_date(value)
+        if parsed is not None and reference is not None:
+            return {"days_before_report": (reference - parsed).days}
+    if isinstance(value, str):
+        return _normalise_text(value)
+    return value
+
+
+def decision_fingerprint(data: Any, stage: str) -> Any:
+    """
+    The part of a claim a policy decision depends on: the stage's prompt projection without
+    identifiers, with dates as day offsets before the report date, text case and whitespace
+    folded and lists in canonical order. Claims with equal fingerprints get the same prompt up
+    to those details.
+    """
+    reference = _reference_date(data)
+    projection = STAGE_PROJECTIONS.get(stage, {})
+    projected = project(data, projection.get("include"), [*projection.get("exclude", ()), *IDENTIFIER_FIELDS])
+    return _normalise(projected, None, reference)
+
+
+def _split_text(value: Any, key: Optional[str], path: str, texts: List[Tuple[str, str]]) -> Any:
+    """
+    The fingerprint with its free-text leaves removed (the structured profile); the removed
+    texts are appended to `texts` as (field path, text).
+    """
+    if isinstance(value, dict):
+        return {k: _split_text(item, k, f"{path}.{k}" if path else k, texts) for k, item in value.items()}
+    if isinstance(value, list):
+        if key in FREE_TEXT_FIELDS and all(isinstance(item, str) for item in value):
+            texts.extend((path, item) for item in value)
+            return len(value)
+        return [_split_text(item, key, path, texts) for item in value]
+    if key in FREE_TEXT_FIELDS and isinstance(value, str):
+        texts.append((path, value))
+        return None
+    return value
+
+
+def text_vector(texts: Sequence[Tuple[str, str]]) -> Dict[int, float]:
+    """
+    L2-normalised hashed bag of words, one feature per (field path, token).
+    """
+    counts: Counter = Counter()
+    for path, text in texts:
+        for token in _TOKEN.findall(text.casefold()):
+            counts[zlib.crc32(f"{path}:{token}".encode("utf-8")) % VECTOR_DIM] += 1
+    norm = math.sqrt(sum(count * count for count in counts.values()))
+    return {feature: count / norm for feature, count in counts.items()} if norm else {}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(feature, 0.0) for feature, weight in a.items())
+
+
+@dataclass
+class DecisionQuery:
+    """
+    One claim's policy decision to look up or remember: the LLM stage deciding it, what else
+    shapes the answer (policy text, judged criteria) and the claim's fingerprint for that stage.
+    """
+    stage: Any
+    parts: Tuple[Any, ...]
+    fingerprint: Any
+    claim: str
+
+    @classmethod
+    def for_claim(cls, stage, parts: Sequence[Any], parsed: ParsedSummary) -> "DecisionQuery":
+        claim = hashlib.sha256(parsed.canonical.encode("utf-8")).hexdigest()
+        return cls(stage, tuple(parts), decision_fingerprint(parsed.data, stage.name), claim)
+
+    def key(self, cache: ResultCache) -> str:
+        return self.stage.cache_key(cache, ("decision", *self.parts, self.fingerprint))
+
+    @cached_property
+    def _profile_vector(self) -> Tuple[str, Dict[int, float]]:
+        texts: List[Tuple[str, str]] = []
+        profile = _split_text(self.fingerprint, None, "", texts)
+        return self.stage.cache_key(ResultCache, ("profile", *self.parts, profile)), text_vector(texts)
+
+    @property
+    def profile(self) -> str:
+        """
+        Hash of the structured part of the fingerprint; only claims with the same profile are
+        compared by text similarity.
+        """
+        return self._profile_vector[0]
+
+    @property
+    def vector(self) -> Dict[int, float]:
+        return self._profile_vector[1]
+
+
+def _reuse(result: Dict[str, Any], match: str, similarity: float) -> Dict[str, Any]:
+    metrics.inc("policy_decision_reuse_total", match=match)
+    return {
+        **result,
+        "decision_reuse": {
+            "match": match,
+            "similarity": round(similarity, 4),
+            "confidence": "high" if match == "fingerprint" else "medium",
+        },
+    }
+
+
+class DecisionIndex:
+    """
+    Past LLM policy decisions by decision fingerprint, so a claim that differs from an earlier
+    one only in identifiers, dates or formatting reuses its decision instead of calling the LLM.
+    Fingerprints are stored in the result cache (and shared the same way). In "similar" mode an
+    in-process index of text vectors also matches the most similar earlier claim with the same
+    structured profile, above min_similarity. Reused decisions carry a decision_reuse flag with
+    the match kind, similarity and confidence.
+    """
+    def __init__(self, cache: Optional[ResultCache], similar: bool, min_similarity: float, max_entries: int):
+        self.cache = cache
+        self.similar = similar
+        self.min_similarity = min_similarity
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, Dict[int, float], Dict[str, Any]]]" = OrderedDict()
+        self._profiles: Dict[str, Dict[str, None]] = {}
+
+    def lookup(self, query: DecisionQuery) -> Optional[Dict[str, Any]]:
+        """
+        The decision for an equivalent (or, in similar mode, a similar enough) earlier claim.
+        A decision made for this very claim is returned without a reuse flag.
+        """
+        entry = self.cache.get("policy_decision", query.key(self.cache)) if self.cache is not None else None
+        return self._match(query, entry)
+
+    async def alookup(self, query: DecisionQuery) -> Optional[Dict[str, Any]]:
+        """
+        lookup for async code, reading the result cache off the event loop.
+        """
+        entry = await self.cache.aget("policy_decision", query.key(self.cache)) if self.cache is not None else None
+        return self._match(query, entry)
+
+    def _match(self, query: DecisionQuery, entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if entry is not None:
+            if entry["claim"] == query.claim:
+                metrics.inc("policy_decision_reuse_total", match="identical")
+                return entry["result"]
+            return _reuse(entry["result"], "fingerprint", 1.0)
+        if self.similar and query.vector:
+            best = self._nearest(query)
+            if best is not None:
+                return _reuse(best[1], "similar", best[0])
+        metrics.inc("policy_decision_reuse_total", match="none")
+        return None
+
+    def _nearest(self, query: DecisionQuery) -> Optional[Tuple[float, Dict[str, Any]]]:
+        best = None
+        with self._lock:
+            for entry_key in self._profiles.get(query.profile, ()):
+                _, vector, result = self._entries[entry_key]
+                similarity = cosine(query.vector, vector)
+                if similarity >= self.min_similarity and (best is None or similarity > best[0]):
+                    best = (similarity, result)
+        return best
+
+    def remember(self, query: DecisionQuery, result: Dict[str, Any]) -> None:
+        if self.cache is not None:
+            self.cache.set("policy_decision", query.key(self.cache), {"claim": query.claim, "result": result})
+        if self.similar and query.vector:
+            self._add(query, result)
+
+    async def aremember(self, query: DecisionQuery, result: Dict[str, Any]) -> None:
+        if self.cache is not None:
+            await self.cache.aset("policy_decision", query.key(self.cache), {"claim": query.claim, "result": result})
+        if self.similar and query.vector:
+            self._add(query, result)
+
+    def _add(self, query: DecisionQuery, result: Dict[str, Any]) -> None:
+        entry_key = ResultCache.make_key("decision", query.profile, query.fingerprint)
+        with self._lock:
+            self._entries.pop(entry_key, None)
+            self._entries[entry_key] = (query.profile, query.vector, result)
+            self._profiles.setdefault(query.profile, {})[entry_key] = None
+            while len(self._entries) > self.max_entries:
+                evicted, (profile, _, _) = self._entries.popitem(last=False)
+                members = self._profiles[profile]
+                members.pop(evicted, None)
+                if not members:
+                    del self._profiles[profile]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@lru_cache(maxsize=1)
+def get_decision_index() -> Optional[DecisionIndex]:
+    """
+    The process-wide decision index configured by MEDICHECK_DECISION_INDEX (off, fingerprint,
+    similar), or None when off. registry.reload() clears this cache.
+    """
+    settings = get_settings()
+    if settings.decision_index not in DECISION_INDEX_MODES:
+        raise ValueError(f"Unknown MEDICHECK_DECISION_INDEX '{settings.decision_index}'")
+    if settings.decision_index == "off":
+        return None
+    return DecisionIndex(
+        get_result_cache(),
+        similar=settings.decision_index == "similar",
+        min_similarity=settings.decision_min_similarity,
+        max_entries=settings.decision_index_max_entries,
+    )
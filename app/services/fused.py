@@ -0,0 +1,112 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.models.output import FusedGuardrailPolicyOutput
+from app.prompts.fused_prompt import FUSED_GUARDRAIL_POLICY_PROMPT
+from app.services.ingest import ParsedSummary, SummaryInput, ensure_parsed
+from app.services.guardrail import structural_guardrail, llm_guardrail, allm_guardrail
+from app.services.llm_stage import LLMStage, run_stage, arun_stage
+from app.services.policy import PolicyPlan, plan_policy, resolve_policy, selected_policy_ids, evaluate_policies, aevaluate_policies
+from app.services.policy_rules import CompiledRule
+from app.utils.metrics import metrics
+from app.utils.prompt_payload import payload_budget
+
+FUSED_STAGE = LLMStage(name="guardrail_policy", output_model=FusedGuardrailPolicyOutput, template=FUSED_GUARDRAIL_POLICY_PROMPT)
+
+def _fused_fallback() -> Dict[str, Any]:
+    return {
+        "is_insurance_summary": False,
+        "reason": "LLM response could not be parsed as JSON.",
+        "polite_message": "Sorry, we could not determine if your document is a clinical summary for insurance. Please check your file and try again.",
+        "policy_approved": False,
+        "failed_criteria": [],
+        "policy_message": "",
+    }
+
+def _build_fused_prompt(parsed: ParsedSummary, criteria: List[CompiledRule], format_instructions: str) -> str:
+    criteria_text = "\n".join(f"- {rule.description}" for rule in criteria)
+    return FUSED_GUARDRAIL_POLICY_PROMPT.format(
+        criteria=criteria_text,
+        patient_json=parsed.payload("guardrail", payload_budget(FUSED_GUARDRAIL_POLICY_PROMPT, criteria_text, format_instructions))
+    ) + format_instructions
+
+def _split(result: Dict[str, Any], plan: PolicyPlan) -> Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]:
+    guardrail = {
+        "is_insurance_summary": result["is_insurance_summary"],
+        "reason": result["reason"],
+        "polite_message": result["polite_message"],
+        "decision_path": "llm_fused",
+    }
+    if not guardrail["is_insurance_summary"]:
+        return guardrail, None
+    return guardrail, [{
+        "policy_approved": result["policy_approved"],
+        "failed_criteria": result["failed_criteria"],
+        "policy_message": result["policy_message"],
+        "decision_path": "llm_fused",
+        "policy_id": plan.policy_id,
+    }]
+
+def _fusable(parsed: ParsedSummary, structural: Optional[Dict[str, Any]], policy_ids: Optional[Sequence[str]]) -> Optional[PolicyPlan]:
+    """
+    The policy plan when both stages would need the LLM, i.e. the guardrail could not decide
+    locally (`structural` is None) and the rules of the single requested policy leave judgemental
+    criteria; None when fusing would not save a round-trip.
+    """
+    policy_ids = selected_policy_ids(policy_ids)
+    if len(policy_ids) != 1 or structural is not None:
+        return None
+    plan = plan_policy(parsed, policy_id=policy_ids[0])
+    if plan.path != "llm_judgement":
+        return None
+    metrics.inc("guardrail_decisions_total", path="llm_fused")
+    metrics.inc("policy_decisions_total", path="llm_fused")
+    return plan
+
+def _fused_cache_parts(parsed: ParsedSummary, plan: PolicyPlan) -> Tuple[Any, ...]:
+    return (resolve_policy(policy_id=plan.policy_id).text, [rule.description for rule in plan.criteria], parsed.canonical)
+
+def check_and_evaluate(
+    data: SummaryInput, use_cache: bool = True, policy_ids: Optional[Sequence[str]] = None
+) -> Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]:
+    """
+    Guardrail and policy evaluation for a schema-valid summary with at most one LLM round-trip
+    where the standard flow would need two. Returns (guardrail result, one policy result per
+    policy id, or None when the guardrail rejects).
+    """
+    parsed = ensure_parsed(data)
+    # The structural verdict is computed (and counted in the metrics) once for both paths.
+    structural = structural_guardrail(parsed)
+    plan = _fusable(parsed, structural, policy_ids)
+    if plan is not None:
+        return _split(run_stage(
+            FUSED_STAGE,
+            lambda format_instructions: _build_fused_prompt(parsed, plan.criteria, format_instructions),
+            _fused_fallback,
+            cache_parts=_fused_cache_parts(parsed, plan),
+            use_cache=use_cache,
+        ), plan)
+    guardrail = structural if structural is not None else llm_guardrail(parsed, use_cache)
+    if not guardrail["is_insurance_summary"]:
+        return guardrail, None
+    return guardrail, evaluate_policies(parsed, policy_ids, use_cache=use_cache)
+
+async def acheck_and_evaluate(
+    data: SummaryInput, use_cache: bool = True, policy_ids: Optional[Sequence[str]] = None
+) -> Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]:
+    """
+    Async variant of check_and_evaluate.
+    """
+    parsed = ensure_parsed(data)
+    structural = structural_guardrail(parsed)
+    plan = _fusable(parsed, structural, policy_ids)
+    if plan is not None:
+        return _split(await arun_stage(
+            FUSED_STAGE,
+            lambda format_instructions: _build_fused_prompt(parsed, plan.criteria, format_instructions),
+            _fused_fallback,
+            cache_parts=_fused_cache_parts(parsed, plan),
+            use_cache=use_cache,
+        ), plan)
+    guardrail = structural if structural is not None else await allm_guardrail(parsed, use_cache)
+    if not guardrail["is_insurance_summary"]:
+        return guardrail, None
+    return guardrail, await aevaluate_policies(parsed, policy_ids, use_cache=use_cache)
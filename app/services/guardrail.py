@@ -1,27 +1,117 @@
-import json
-from app.utils.llm import GroqLLM
+from typing import Optional
 from app.prompts.guardrail_prompt import GUARDRAIL_PROMPT
 from app.models.output import GuardrailOutput
-from langchain.output_parsers import PydanticOutputParser, OutputFixingParser
-
-def check_is_insurance_summary(json_data: dict) -> dict:
-    """
-    Uses an LLM to determine if the provided JSON data represents a clinical summary intended for insurance approval.
-    Returns a dictionary with the result and a polite message if not valid.
-    """
-    llm = GroqLLM(model="llama3-70b-8192", temperature=0.2)
-    base_parser = PydanticOutputParser(pydantic_object=GuardrailOutput)
-    parser = OutputFixingParser.from_llm(parser=base_parser, llm=llm.llm)
-    prompt = GUARDRAIL_PROMPT.format(json_data=json.dumps(json_data, indent=2)) + "\n" + parser.get_format_instructions()
-    # Get the output from the LLM synchronously
-    response = llm.call(prompt)
-    try:
-        result = parser.parse(response)
-        return result.dict()
-    except Exception:
-        # If parsing fails, return a default polite message
+from app.models.clinical_summary import ClinicalSummary
+from app.services.guardrail_classifier import classify_structure, StructuralVerdict
+from app.utils.metrics import metrics
+from app.utils.prompt_payload import payload_budget
+from app.utils.settings import get_settings
+from app.services.ingest import ParsedSummary, SummaryInput, ensure_parsed
+from app.services.llm_stage import LLMStage, run_stage, arun_stage
+
+GUARDRAIL_STAGE = LLMStage(name="guardrail", output_model=GuardrailOutput, template=GUARDRAIL_PROMPT)
+
+def _guardrail_fallback() -> dict:
+    """
+    Default polite message returned when the LLM response cannot be parsed.
+    """
+    return {
+        "is_insurance_summary": False,
+        "reason": "LLM response could not be parsed as JSON.",
+        "polite_message": "Sorry, we could not determine if your document is a clinical summary for insurance. Please check your file and try again."
+    }
+
+def _structural_result(verdict: StructuralVerdict) -> dict:
+    """
+    Guardrail result for a payload the local classifier decided on its own.
+    """
+    if verdict.decision == "accept":
         return {
-            "is_insurance_summary": False,
-            "reason": "LLM response could not be parsed as JSON.",
-            "polite_message": "Sorry, we could not determine if your document is a clinical summary for insurance. Please check your file and try again."
-        } 
\ No newline at end of file
+            "is_insurance_summary": True,
+            "reason": verdict.reason,
+            "polite_message": "",
+            "decision_path": "structural_accept"
+        }
+    sections = "\n".join(f"- `{name}`" for name in ClinicalSummary.model_fields)
+    return {
+        "is_insurance_summary": False,
+        "reason": verdict.reason,
+        "polite_message": (
+            "This document does not look like a clinical summary for insurance approval. "
+            "A clinical summary should contain the following sections:\n" + sections
+        ),
+        "decision_path": "structural_reject"
+    }
+
+def structural_guardrail(json_data: SummaryInput) -> Optional[dict]:
+    """
+    Decide confident accept/reject cases locally; returns None when the LLM must decide.
+    """
+    if not get_settings().guardrail_fast_path:
+        return None
+    verdict = classify_structure(ensure_parsed(json_data).data)
+    if verdict.decision == "escalate":
+        return None
+    metrics.inc("guardrail_decisions_total", path=f"structural_{verdict.decision}")
+    metrics.inc("guardrail_llm_calls_avoided_total")
+    return _structural_result(verdict)
+
+def _build_guardrail_prompt(parsed: ParsedSummary, format_instructions: str) -> str:
+    payload = parsed.payload("guardrail", payload_budget(GUARDRAIL_PROMPT, format_instructions))
+    return GUARDRAIL_PROMPT.format(json_data=payload) + format_instructions
+
+def _llm_check(parsed: ParsedSummary, use_cache: bool) -> dict:
+    return run_stage(
+        GUARDRAIL_STAGE,
+        lambda format_instructions: _build_guardrail_prompt(parsed, format_instructions),
+        # If parsing fails, return a default polite message
+        _guardrail_fallback,
+        cache_parts=(parsed.canonical,),
+        use_cache=use_cache,
+    )
+
+async def _allm_check(parsed: ParsedSummary, use_cache: bool) -> dict:
+    return await arun_stage(
+        GUARDRAIL_STAGE,
+        lambda format_instructions: _build_guardrail_prompt(parsed, format_instructions),
+        _guardrail_fallback,
+        cache_parts=(parsed.canonical,),
+        use_cache=use_cache,
+    )
+
+def llm_guardrail(parsed: ParsedSummary, use_cache: bool = True) -> dict:
+    """
+    The LLM's guardrail verdict, for callers that already ran structural_guardrail and got None.
+    """
+    metrics.inc("guardrail_decisions_total", path="llm")
+    return {**_llm_check(parsed, use_cache), "decision_path": "llm"}
+
+async def allm_guardrail(parsed: ParsedSummary, use_cache: bool = True) -> dict:
+    """
+    Async variant of llm_guardrail.
+    """
+    metrics.inc("guardrail_decisions_total", path="llm")
+    return {**await _allm_check(parsed, use_cache), "decision_path": "llm"}
+
+def check_is_insurance_summary(json_data: SummaryInput, use_cache: bool = True) -> dict:
+    """
+    Determines if the provided JSON data represents a clinical summary intended for insurance approval.
+    Obvious cases are decided by the local structural classifier; ambiguous ones are sent to the LLM.
+    LLM answers are served from the result cache unless use_cache is False.
+    Returns a dictionary with the result, a polite message if not valid and the decision path taken.
+    """
+    parsed = ensure_parsed(json_data)
+    result = structural_guardrail(parsed)
+    if result is not None:
+        return result
+    return llm_guardrail(parsed, use_cache)
+
+async def acheck_is_insurance_summary(json_data: SummaryInput, use_cache: bool = True) -> dict:
+    """
+    Async variant of check_is_insurance_summary; awaits the LLM instead of blocking the event loop.
+    """
+    parsed = ensure_parsed(json_data)
+    result = structural_guardrail(parsed)
+    if result is not None:
+        return result
+    return await allm_guardrail(parsed, use_cache)
@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple, Type
+from pydantic import BaseModel
+from app.models.clinical_summary import ClinicalSummary
+from app.utils.annotations import unwrap_annotation
+
+# A payload is accepted locally when every top-level section is present with the right
+# container type and, on average, at least this share of each section's fields.
+ACCEPT_MIN_FIELD_OVERLAP = 0.5
+# A payload with no top-level section is rejected locally when it mentions at most this many
+# distinct field names used anywhere in ClinicalSummary (generic keys like "date" or "type").
+REJECT_MAX_KNOWN_FIELDS = 2
+# How deep nested keys are scanned when looking for known field names.
+MAX_SCAN_DEPTH = 4
+
+
+def _nested_model(annotation: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """
+    Resolve a field annotation to (nested model, is_list), unwrapping Optional[...] and List[...].
+    """
+    annotation, is_list = unwrap_annotation(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, is_list
+    return None, is_list
+
+
+def _collect_field_names(model: Type[BaseModel], names: Set[str]) -> None:
+    for name, field in model.model_fields.items():
+        names.add(name)
+        nested, _ = _nested_model(field.annotation)
+        if nested is not None:
+            _collect_field_names(nested, names)
+
+
+def _section_shapes() -> Dict[str, Tuple[Set[str], bool]]:
+    shapes = {}
+    for name, field in ClinicalSummary.model_fields.items():
+        nested, is_list = _nested_model(field.annotation)
+        shapes[name] = (set(nested.model_fields) if nested is not None else set(), is_list)
+    return shapes
+
+
+# Derived once from the Pydantic model so the classifier follows schema changes automatically.
+SECTION_SHAPES = _section_shapes()
+KNOWN_FIELDS: Set[str] = set()
+_collect_field_names(ClinicalSummary, KNOWN_FIELDS)
+
+
+@dataclass(frozen=True)
+class StructuralVerdict:
+    """
+    Outcome of the local classifier: decision is "accept", "reject" or "escalate" (ask the LLM).
+    """
+    decision: str
+    score: float
+    reason: str
+
+
+def _scan_keys(value: Any, found: Set[str], depth: int = 0) -> None:
+    if depth > MAX_SCAN_DEPTH:
+        return
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(key, str) and key in KNOWN_FIELDS:
+                found.add(key)
+            _scan_keys(item, found, depth + 1)
+    elif isinstance(value, list):
+        for item in value[:5]:
+            _scan_keys(item, found, depth + 1)
+
+
+def _section_overlap(value: Any, expected_fields: Set[str], is_list: bool) -> Optional[float]:
+    """
+    Share of the section's expected fields present, or None if the container type is wrong.
+    """
+    if is_list:
+        if not isinstance(value, list):
+            return None
+        items = [item for item in value if isinstance(item, dict)]
+        if len(items) != len(value):
+            return None
+        if not items:
+            return 1.0
+        keys = set().union(*(item.keys() for item in items))
+    else:
+        if not isinstance(value, dict):
+            return None
+        keys = set(value.keys())
+    if not expected_fields:
+        return 1.0
+    return len(keys & expected_fields) / len(expected_fields)
+
+
+def classify_structure(json_data: Any) -> StructuralVerdict:
+    """
+    Score the payload's shape against ClinicalSummary and decide confident cases locally.
+    Only payloads that are neither clearly a clinical summary nor clearly unrelated are escalated.
+    """
+    if not isinstance(json_data, dict) or not json_data:
+        return StructuralVerdict("reject", 0.0, "The payload is not a JSON object with any content.")
+
+    present = [name for name in SECTION_SHAPES if name in json_data]
+    section_score = len(present) / len(SECTION_SHAPES)
+
+    if len(present) == len(SECTION_SHAPES):
+        overlaps = [_section_overlap(json_data[name], *SECTION_SHAPES[name]) for name in present]
+        if all(o is not None for o in overlaps):
+            field_score = sum(overlaps) / len(overlaps)
+            if field_score >= ACCEPT_MIN_FIELD_OVERLAP:
+                return StructuralVerdict(
+                    "accept",
+                    (section_score + field_score) / 2,
+                    "The document contains every clinical summary section with the expected structure."
+                )
+
+    if not present:
+        found: Set[str] = set()
+        _scan_keys(json_data, found)
+        if len(found) <= REJECT_MAX_KNOWN_FIELDS:
+            return StructuralVerdict(
+                "reject",
+                len(found) / len(KNOWN_FIELDS),
+                "The document has none of the clinical summary sections."
+            )
+
+    return StructuralVerdict("escalate", section_score, "The document structure is ambiguous.")
@@ -0,0 +1,103 @@
+import json
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Tuple, Union
+from pydantic import ValidationError
+from app.models.clinical_summary import ClinicalSummary
+from app.utils.cache import canonical_json
+from app.utils.prompt_payload import build_payload
+
+
+class ParsedSummary:
+    """
+    A claim decoded once per request and shared by every stage: the JSON value, its
+    ClinicalSummary validation (the model, or every error found in one pass), its canonical
+    serialisation for cache keys and its per-stage prompt payloads, each computed on first use.
+    The schema is checked against the decoded value: the stages need it anyway, and validating
+    it is cheaper than parsing the raw bytes a second time with model_validate_json.
+    """
+    def __init__(self, data: Any, raw: Optional[Union[str, bytes]] = None):
+        self.data = data
+        self.raw = raw
+        self._payloads: Dict[Tuple[str, Optional[int]], str] = {}
+
+    @classmethod
+    def from_json(cls, raw: Union[str, bytes]) -> "ParsedSummary":
+        """
+        Decode raw JSON; raises ValueError when it is not valid JSON.
+        """
+        return cls(json.loads(raw), raw)
+
+    @cached_property
+    def _validation(self) -> Tuple[Optional[ClinicalSummary], Optional[ValidationError]]:
+        try:
+            return ClinicalSummary.model_validate(self.data), None
+        except ValidationError as e:
+            return None, e
+
+    @property
+    def summary(self) -> Optional[ClinicalSummary]:
+        """
+        The validated model, or None when the claim does not match the schema.
+        """
+        return self._validation[0]
+
+    @property
+    def is_valid(self) -> bool:
+        return self._validation[1] is None
+
+    @cached_property
+    def errors(self) -> List[Dict[str, Any]]:
+        """
+        Every schema error (pydantic's error dicts); empty for a valid claim.
+        """
+        error = self._validation[1]
+        return error.errors() if error is not None else []
+
+    @cached_property
+    def missing_fields(self) -> List[str]:
+        """
+        Dotted locations of every field reported by the schema errors.
+        """
+        return [".".join(str(x) for x in err["loc"]) for err in self.errors]
+
+    @cached_property
+    def canonical(self) -> str:
+        """
+        canonical_json of the claim, as hashed into result cache keys.
+        """
+        return canonical_json(self.data)
+
+    def payload(self, stage: str, max_tokens: Optional[int] = None) -> str:
+        """
+        build_payload for a stage that projects the claim alone (guardrail, policy,
+        policy_judgement), built once per token budget and reused, e.g. across policies.
+        """
+        key = (stage, max_tokens)
+        payload = self._payloads.get(key)
+        if payload is None:
+            payload = self._payloads[key] = build_payload(self.data, stage, max_tokens=max_tokens)
+        return payload
+
+    def to_json(self) -> str:
+        """
+        The claim as JSON text: the raw input when there was one, without re-serialising.
+        """
+        if isinstance(self.raw, str):
+            return self.raw
+        if isinstance(self.raw, bytes):
+            try:
+                return self.raw.decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        return json.dumps(self.data)
+
+
+# What the services accept: an already decoded claim or its ParsedSummary.
+SummaryInput = Union[ParsedSummary, Any]
+
+
+def ensure_parsed(data: SummaryInput) -> ParsedSummary:
+    """
+    The ParsedSummary for data, wrapping a plain decoded claim on first use.
+    """
+    return data if isinstance(data, ParsedSummary) else ParsedSummary(data)
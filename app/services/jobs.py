@@ -0,0 +1,494 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from app.services.batch import ItemError
+from app.services.ingest import ParsedSummary
+from app.utils.llm import PRIORITY_BATCH, is_transient_error, llm_priority
+from app.utils.metrics import metrics
+from app.utils.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """
+    Persistent queue of validation jobs in a SQLite file. Each job holds its summaries as items;
+    every claim of an item gets its own lease token, which the worker renews while it runs the
+    flow and must still hold to record the result, so an item is never completed twice. Items
+    whose lease expired (their worker died or stalled) become claimable again, until they reach
+    the maximum number of attempts; nothing is lost across restarts. Completed jobs are pruned
+    after the retention period.
+    """
+    _SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            use_cache INTEGER NOT NULL,
+            mode TEXT NOT NULL DEFAULT 'standard',
+            policy_ids TEXT,
+            total INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            finished_at REAL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS job_items (
+            job_id TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            payload TEXT,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at REAL NOT NULL,
+            lease_owner TEXT,
+            lease_expires REAL,
+            result TEXT,
+            error TEXT,
+            PRIMARY KEY (job_id, idx)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS job_items_claim ON job_items (status, available_at)",
+        "CREATE INDEX IF NOT EXISTS job_items_lease ON job_items (status, lease_expires)",
+        "CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, finished_at)",
+    )
+    # Columns added to the jobs table after its first release, created on stores that predate them.
+    _JOB_COLUMNS = {
+        "mode": "TEXT NOT NULL DEFAULT 'standard'",
+        "policy_ids": "TEXT",
+    }
+    # Claimable items in claim order; each query walks one index and stops at the first item
+    # of a job that is open for work.
+    _EXPIRED_LEASE = """
+        SELECT i.job_id, i.idx, i.payload, i.attempts, j.use_cache, j.mode, j.policy_ids FROM job_items i
+        JOIN jobs j ON j.id = i.job_id
+        WHERE i.status = 'running' AND i.lease_expires <= ? AND j.status IN ('queued', 'running')
+        ORDER BY i.lease_expires
+        LIMIT 1
+    """
+    _DUE_PENDING = """
+        SELECT i.job_id, i.idx, i.payload, i.attempts, j.use_cache, j.mode, j.policy_ids FROM job_items i
+        JOIN jobs j ON j.id = i.job_id
+        WHERE i.status = 'pending' AND i.available_at <= ? AND j.status IN ('queued', 'running')
+        ORDER BY i.available_at, i.rowid
+        LIMIT 1
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        for statement in self._SCHEMA:
+            conn.execute(statement)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for name, definition in self._JOB_COLUMNS.items():
+            if name not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create_job(self, use_cache: bool = True, mode: str = "standard", policy_ids: Optional[Sequence[str]] = None) -> str:
+        """
+        Open a new job in the "submitting" state; its items are not claimable until seal_job.
+        Every item runs with the job's use_cache, pipeline mode and policy_ids.
+        """
+        job_id = uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO jobs (id, status, use_cache, mode, policy_ids, created_at) VALUES (?, 'submitting', ?, ?, ?, ?)",
+            (job_id, int(use_cache), mode, json.dumps(list(policy_ids)) if policy_ids else None, time.time())
+        )
+        return job_id
+
+    def add_items(self, job_id: str, items: Iterable[Tuple[int, Any]]) -> int:
+        """
+        Append (index, summary) pairs to a job. Undecodable items are stored as already failed.
+        """
+        now = time.time()
+        rows = []
+        for index, item in items:
+            if isinstance(item, ItemError):
+                rows.append((job_id, index, None, "failed", now, str(item)))
+            else:
+                payload = item.to_json() if isinstance(item, ParsedSummary) else json.dumps(item)
+                rows.append((job_id, index, payload, "pending", now, None))
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO job_items (job_id, idx, payload, status, available_at, error) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("UPDATE jobs SET total = total + ? WHERE id = ?", (len(rows), job_id))
+        return len(rows)
+
+    def delete_job(self, job_id: str) -> None:
+        """
+        Remove a job and its items, e.g. one whose submission failed.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def seal_job(self, job_id: str) -> None:
+        """
+        Mark submission complete so workers may start on the job's items.
+        """
+        self._connect().execute("UPDATE jobs SET status = 'queued' WHERE id = ?", (job_id,))
+        self._finish_if_done(job_id)
+
+    def claim(self, worker_id: str, lease_seconds: float, max_attempts: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Atomically lease the next runnable item: one whose lease expired, else the oldest due
+        pending item. The returned item carries its lease token. An expired item that already
+        used max_attempts is failed instead of being claimed again.
+        """
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if max_attempts is not None:
+                self._fail_exhausted(conn, now, max_attempts)
+            row = conn.execute(self._EXPIRED_LEASE, (now,)).fetchone() or conn.execute(self._DUE_PENDING, (now,)).fetchone()
+            if row is None:
+                return None
+            lease = f"{worker_id}:{uuid.uuid4().hex}"
+            conn.execute(
+                """
+                UPDATE job_items SET status = 'running', attempts = attempts + 1,
+                       lease_owner = ?, lease_expires = ?
+                WHERE job_id = ? AND idx = ?
+                """,
+                (lease, now + lease_seconds, row["job_id"], row["idx"])
+            )
+            conn.execute("UPDATE jobs SET status = 'running' WHERE id = ? AND status = 'queued'", (row["job_id"],))
+        return {
+            "job_id": row["job_id"],
+            "index": row["idx"],
+            "summary": ParsedSummary.from_json(row["payload"]),
+            "attempt": row["attempts"] + 1,
+            "use_cache": bool(row["use_cache"]),
+            "mode": row["mode"],
+            "policy_ids": json.loads(row["policy_ids"]) if row["policy_ids"] else None,
+            "lease": lease,
+        }
+
+    def _fail_exhausted(self, conn: sqlite3.Connection, now: float, max_attempts: int) -> None:
+        """
+        Fail items whose lease expired on their last attempt (e.g. they crash every worker
+        that runs them) rather than retrying them forever.
+        """
+        jobs = [
+            row["job_id"] for row in conn.execute(
+                "SELECT DISTINCT job_id FROM job_items WHERE status = 'running' AND lease_expires <= ? AND attempts >= ?",
+                (now, max_attempts)
+            )
+        ]
+        if not jobs:
+            return
+        conn.execute(
+            """
+            UPDATE job_items SET status = 'failed', error = ?, lease_owner = NULL, lease_expires = NULL
+            WHERE status = 'running' AND lease_expires <= ? AND attempts >= ?
+            """,
+            (f"Lease expired on attempt {max_attempts} of {max_attempts}; the worker was lost.", now, max_attempts)
+        )
+        for job_id in jobs:
+            self._finish_if_done(job_id, conn)
+
+    def renew(self, job_id: str, index: int, lease: str, lease_seconds: float) -> bool:
+        """
+        Extend a lease (the worker's heartbeat); False if it was lost to another claim.
+        """
+        cursor = self._connect().execute(
+            "UPDATE job_items SET lease_expires = ? WHERE job_id = ? AND idx = ? AND status = 'running' AND lease_owner = ?",
+            (time.time() + lease_seconds, job_id, index, lease)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, index: int, lease: str, result: Dict[str, Any]) -> bool:
+        """
+        Record a result; ignored (returns False) if the lease is no longer held.
+        """
+        cursor = self._connect().execute(
+            """
+            UPDATE job_items SET status = 'done', result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL
+            WHERE job_id = ? AND idx = ? AND status = 'running' AND lease_owner = ?
+            """,
+            (json.dumps(result), job_id, index, lease)
+        )
+        self._finish_if_done(job_id)
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, index: int, lease: str, error: str, retry_at: Optional[float] = None) -> bool:
+        """
+        Record a failure: back to pending until retry_at when given, otherwise permanently failed.
+        Ignored (returns False) if the lease is no longer held.
+        """
+        status = "pending" if retry_at is not None else "failed"
+        cursor = self._connect().execute(
+            """
+            UPDATE job_items SET status = ?, error = ?, available_at = COALESCE(?, available_at),
+                   lease_owner = NULL, lease_expires = NULL
+            WHERE job_id = ? AND idx = ? AND status = 'running' AND lease_owner = ?
+            """,
+            (status, error, retry_at, job_id, index, lease)
+        )
+        self._finish_if_done(job_id)
+        return cursor.rowcount == 1
+
+    def release(self, worker_id: str) -> int:
+        """
+        Hand back every item leased by worker_id (graceful shutdown) without counting the attempt.
+        """
+        cursor = self._connect().execute(
+            """
+            UPDATE job_items SET status = 'pending', attempts = attempts - 1, lease_owner = NULL, lease_expires = NULL
+            WHERE status = 'running' AND lease_owner LIKE ?
+            """,
+            (f"{worker_id}:%",)
+        )
+        return cursor.rowcount
+
+    def prune(self, older_than: float) -> int:
+        """
+        Delete jobs completed before older_than (a timestamp) with their items; returns how many.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            jobs = [
+                row["id"] for row in conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'completed' AND finished_at <= ?", (older_than,)
+                )
+            ]
+            for job_id in jobs:
+                conn.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(jobs)
+
+    def _finish_if_done(self, job_id: str, conn: Optional[sqlite3.Connection] = None) -> None:
+        (conn or self._connect()).execute(
+            """
+            UPDATE jobs SET status = 'completed', finished_at = ?
+            WHERE id = ? AND status IN ('queued', 'running') AND NOT EXISTS (
+                SELECT 1 FROM job_items WHERE job_id = ? AND status IN ('pending', 'running')
+            )
+            """,
+            (time.time(), job_id, job_id)
+        )
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Job state with per-status item counts, or None for an unknown job id.
+        """
+        conn = self._connect()
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        counts = {"pending": 0, "running": 0, "done": 0, "failed": 0}
+        for row in conn.execute(
+            "SELECT status, COUNT(*) AS n FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+        ):
+            counts[row["status"]] = row["n"]
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "mode": job["mode"],
+            "policy_ids": json.loads(job["policy_ids"]) if job["policy_ids"] else None,
+            "total": job["total"],
+            **counts,
+            "created_at": job["created_at"],
+            "finished_at": job["finished_at"],
+        }
+
+    def results_page(self, job_id: str, offset: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Up to limit finished items from input index offset on, as {index, ok, result} or
+        {index, ok: False, error}. The rows are fetched at once, so the calling thread's
+        connection is not used after the call returns.
+        """
+        rows = self._connect().execute(
+            """
+            SELECT idx, status, result, error FROM job_items
+            WHERE job_id = ? AND status IN ('done', 'failed') AND idx >= ?
+            ORDER BY idx LIMIT ?
+            """,
+            (job_id, offset, limit)
+        ).fetchall()
+        return [
+            {"index": row["idx"], "ok": True, "result": json.loads(row["result"])} if row["status"] == "done"
+            else {"index": row["idx"], "ok": False, "error": row["error"]}
+            for row in rows
+        ]
+
+    def results(self, job_id: str, offset: int = 0, limit: Optional[int] = None, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Finished items in input order, read page by page with results_page; no cursor is held
+        between pages, so the iterator may be advanced from different threads.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            page = self.results_page(job_id, offset, size)
+            yield from page
+            if len(page) < size:
+                return
+            offset = page[-1]["index"] + 1
+            if remaining is not None:
+                remaining -= len(page)
+
+    async def aresults(self, job_id: str, offset: int = 0, limit: Optional[int] = None, page_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async variant of results: each page is read in a worker thread, off the event loop.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            page = await asyncio.to_thread(self.results_page, job_id, offset, size)
+            for record in page:
+                yield record
+            if len(page) < size:
+                return
+            offset = page[-1]["index"] + 1
+            if remaining is not None:
+                remaining -= len(page)
+
+
+@lru_cache(maxsize=1)
+def get_job_store() -> JobStore:
+    """
+    The process-wide job store at MEDICHECK_JOBS_DB_PATH.
+    """
+    return JobStore(get_settings().jobs_db_path)
+
+
+class JobWorkerPool:
+    """
+    Asyncio workers that drain the job store through the async validation flow. Transient LLM
+    failures (rate limits, timeouts, 5xx) are retried with jittered exponential backoff up to
+    max_attempts; any other exception fails the item immediately. Each worker renews the lease
+    of the item it runs every third of lease_seconds, and when idle prunes jobs completed more
+    than retention_seconds ago (0 keeps them).
+    """
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int,
+        max_attempts: int,
+        lease_seconds: float,
+        poll_interval: float = 0.5,
+        retention_seconds: float = 0,
+        prune_interval: float = 3600,
+    ):
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.prune_interval = prune_interval
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._tasks: List[asyncio.Task] = []
+        self._pruned_at = 0.0
+
+    def start(self) -> None:
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._run()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        released = await asyncio.to_thread(self.store.release, self.worker_id)
+        if released:
+            logger.info("Released %d leased job items on shutdown", released)
+
+    def _retry_delay(self, attempt: int) -> float:
+        return min(60.0, 2.0 ** attempt) * random.uniform(0.5, 1.5)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                item = await asyncio.to_thread(self.store.claim, self.worker_id, self.lease_seconds, self.max_attempts)
+                if item is None:
+                    await self._prune()
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                await self._process(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Store errors (e.g. a locked database) must not kill the worker; the lease
+                # on any item being processed expires and it is picked up again.
+                logger.exception("Job worker error")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _prune(self) -> None:
+        now = time.time()
+        if not self.retention_seconds or now - self._pruned_at < self.prune_interval:
+            return
+        self._pruned_at = now
+        pruned = await asyncio.to_thread(self.store.prune, now - self.retention_seconds)
+        if pruned:
+            logger.info("Pruned %d completed jobs", pruned)
+
+    async def _heartbeat(self, item: Dict[str, Any]) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                held = await asyncio.to_thread(self.store.renew, item["job_id"], item["index"], item["lease"], self.lease_seconds)
+            except Exception:
+                logger.exception("Could not renew the lease of job %s item %s", item["job_id"], item["index"])
+                continue
+            if not held:
+                logger.warning("Lost the lease of job %s item %s", item["job_id"], item["index"])
+                return
+
+    async def _process(self, item: Dict[str, Any]) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(item))
+        try:
+            outcome, recorded = await self._run_item(item)
+        finally:
+            heartbeat.cancel()
+        metrics.inc("job_items_total", outcome=outcome if recorded else "lease_lost")
+
+    async def _run_item(self, item: Dict[str, Any]) -> Tuple[str, bool]:
+        """
+        Run the flow for one item and record the outcome under its lease; returns the outcome
+        and whether it was recorded (False when the lease was lost meanwhile).
+        """
+        from app.flow_graph.langgraph import aprocess_clinical_summary
+        job_id, index, lease = item["job_id"], item["index"], item["lease"]
+        try:
+            with llm_priority(PRIORITY_BATCH):
+                result = await aprocess_clinical_summary(
+                    item["summary"], use_cache=item["use_cache"], mode=item["mode"], policy_ids=item["policy_ids"]
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if is_transient_error(e) and item["attempt"] < self.max_attempts:
+                retry_at = time.time() + self._retry_delay(item["attempt"])
+                return "retried", await asyncio.to_thread(self.store.fail, job_id, index, lease, error, retry_at)
+            return "failed", await asyncio.to_thread(self.store.fail, job_id, index, lease, error)
+        return "done", await asyncio.to_thread(self.store.complete, job_id, index, lease, result)
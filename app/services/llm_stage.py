@@ -0,0 +1,239 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Type
+from langchain_core.utils.json import parse_partial_json
+from pydantic import BaseModel, ValidationError
+from app.utils.cache import get_result_cache
+from app.utils.json_repair import repair_json
+from app.utils.metrics import metrics, record_timing, stage_scope
+from app.utils.registry import registry
+from app.utils.settings import get_settings
+
+
+@dataclass(frozen=True)
+class LLMStage:
+    """
+    One structured LLM call of the pipeline: the output model it parses into, the prompt
+    template and the model settings. `stream_field` names the free-text output field whose
+    tokens can be streamed to the client. Declaring a stage registers its parser for warm-up.
+    """
+    name: str
+    output_model: Type[BaseModel]
+    template: str
+    model: str = "llama3-70b-8192"
+    temperature: float = 0.2
+    stream_field: Optional[str] = None
+
+    def __post_init__(self):
+        registry.register_parser(self.output_model, model=self.model, temperature=self.temperature)
+
+    def clients(self):
+        """
+        The shared (llm, base parser, fixing parser) clients for this stage.
+        """
+        llm = registry.get_llm(model=self.model, temperature=self.temperature)
+        base_parser, parser = registry.get_parsers(self.output_model, model=self.model, temperature=self.temperature)
+        return llm, base_parser, parser
+
+    def format_instructions(self, base_parser) -> str:
+        """
+        Text appended to the prompt describing the answer format. Every template already shows
+        the JSON shape, so the parser's long schema instructions are only added when the
+        provider's structured output is off.
+        """
+        if get_settings().structured_output == "off":
+            return "\n" + base_parser.get_format_instructions()
+        return ""
+
+    def cache_key(self, cache, cache_parts: Sequence[Any]) -> str:
+        return cache.make_key(self.name, self.template, self.model, self.temperature, *cache_parts)
+
+
+def _lookup(stage: LLMStage, cache_parts: Optional[Sequence[Any]], use_cache: bool):
+    """
+    Returns (cache, key, cached result). The cache is skipped for reads when use_cache is
+    False but still refreshed with the new result.
+    """
+    cache = get_result_cache() if cache_parts is not None else None
+    if cache is None:
+        return None, None, None
+    key = stage.cache_key(cache, cache_parts)
+    cached = cache.get(stage.name, key) if use_cache else None
+    record_timing("llm_stages", stage.name, cache_hits=int(cached is not None))
+    return cache, key, cached
+
+
+async def _alookup(stage: LLMStage, cache_parts: Optional[Sequence[Any]], use_cache: bool):
+    """
+    _lookup for async stages, reading the cache off the event loop.
+    """
+    cache = get_result_cache() if cache_parts is not None else None
+    if cache is None:
+        return None, None, None
+    key = stage.cache_key(cache, cache_parts)
+    cached = await cache.aget(stage.name, key) if use_cache else None
+    record_timing("llm_stages", stage.name, cache_hits=int(cached is not None))
+    return cache, key, cached
+
+
+@contextmanager
+def _instrumented(stage: LLMStage):
+    """
+    Time the stage and attribute the LLM calls made inside it to the stage.
+    """
+    start = time.perf_counter()
+    with stage_scope(stage.name):
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe("llm_stage_seconds", elapsed, stage=stage.name)
+            record_timing("llm_stages", stage.name, wall_ms=elapsed * 1000)
+
+
+def _parse_locally(stage: LLMStage, text: str) -> Tuple[Optional[BaseModel], str]:
+    """
+    Parse the completion without any LLM call: as-is, then after lenient JSON repair.
+    """
+    try:
+        return stage.output_model.model_validate_json(text), "direct"
+    except ValidationError:
+        pass
+    data = repair_json(text)
+    if data is not None:
+        try:
+            return stage.output_model.model_validate(data), "repaired"
+        except ValidationError:
+            pass
+    return None, "fallback"
+
+
+def _record_parse(stage: LLMStage, outcome: str) -> None:
+    """
+    How the completion was parsed: direct, repaired (locally), fixing_parser (the
+    OutputFixingParser, usually another LLM call) or fallback.
+    """
+    metrics.inc("llm_output_parse_total", stage=stage.name, outcome=outcome)
+    if outcome != "direct":
+        record_timing("llm_stages", stage.name, **{f"parse_{outcome}": 1})
+
+
+def _parse(stage: LLMStage, text: str, parser) -> Optional[BaseModel]:
+    parsed, outcome = _parse_locally(stage, text)
+    if parsed is None and get_settings().llm_output_fixing:
+        try:
+            parsed, outcome = parser.parse(text), "fixing_parser"
+        except Exception:
+            pass
+    _record_parse(stage, outcome)
+    return parsed
+
+
+async def _aparse(stage: LLMStage, text: str, parser) -> Optional[BaseModel]:
+    parsed, outcome = _parse_locally(stage, text)
+    if parsed is None and get_settings().llm_output_fixing:
+        try:
+            parsed, outcome = await parser.aparse(text), "fixing_parser"
+        except Exception:
+            pass
+    _record_parse(stage, outcome)
+    return parsed
+
+
+def run_stage(
+    stage: LLMStage,
+    build_prompt: Callable[[str], str],
+    fallback: Callable[[], Dict[str, Any]],
+    cache_parts: Optional[Sequence[Any]] = None,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Run a stage synchronously: serve from the result cache when possible, otherwise call the
+    LLM in structured output mode, parse into the stage's output model and cache the parsed
+    result. build_prompt receives the format instructions to append. Completions that are not
+    valid JSON are repaired locally first; only if that fails does the fixing parser get them.
+    Unparseable responses return fallback() and are never cached.
+    """
+    with _instrumented(stage):
+        cache, key, cached = _lookup(stage, cache_parts, use_cache)
+        if cached is not None:
+            return cached
+        llm, base_parser, parser = stage.clients()
+        response = llm.call(build_prompt(stage.format_instructions(base_parser)), stage.output_model)
+        parsed = _parse(stage, response, parser)
+        if parsed is None:
+            return fallback()
+        result = parsed.model_dump()
+        if cache is not None:
+            cache.set(stage.name, key, result)
+        return result
+
+
+def partial_field(text: str, field: str) -> Optional[str]:
+    """
+    The value decoded so far of a string field in a partially received JSON object, or None
+    while the field has not started.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    try:
+        value = parse_partial_json(text[start:])
+    except ValueError:
+        return None
+    if not isinstance(value, dict) or not isinstance(value.get(field), str):
+        return None
+    return value[field]
+
+
+async def _astream_response(stage: LLMStage, llm, prompt: str, on_token: Callable[[str], None]) -> str:
+    """
+    Stream the raw completion, passing each newly decoded piece of stage.stream_field to on_token.
+    Returns the full completion text for parsing; it was generated without structured output,
+    so _aparse repairs it locally when the model strayed from the JSON shape of the prompt.
+    """
+    text = ""
+    emitted = ""
+    async for chunk in llm.astream(prompt):
+        text += chunk
+        value = partial_field(text, stage.stream_field)
+        if value is not None and len(value) > len(emitted) and value.startswith(emitted):
+            on_token(value[len(emitted):])
+            emitted = value
+    return text
+
+
+async def arun_stage(
+    stage: LLMStage,
+    build_prompt: Callable[[str], str],
+    fallback: Callable[[], Dict[str, Any]],
+    cache_parts: Optional[Sequence[Any]] = None,
+    use_cache: bool = True,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Async variant of run_stage; awaits the LLM and the fixing parser. With on_token, stages
+    that declare a stream_field stream the completion and report that field as it is generated
+    (a cached result is reported in one piece).
+    """
+    stream = on_token is not None and stage.stream_field is not None
+    with _instrumented(stage):
+        cache, key, cached = await _alookup(stage, cache_parts, use_cache)
+        if cached is not None:
+            if stream and cached.get(stage.stream_field):
+                on_token(cached[stage.stream_field])
+            return cached
+        llm, base_parser, parser = stage.clients()
+        prompt = build_prompt(stage.format_instructions(base_parser))
+        if stream:
+            response = await _astream_response(stage, llm, prompt, on_token)
+        else:
+            response = await llm.acall(prompt, stage.output_model)
+        parsed = await _aparse(stage, response, parser)
+        if parsed is None:
+            return fallback()
+        result = parsed.model_dump()
+        if cache is not None:
+            await cache.aset(stage.name, key, result)
+        return result
@@ -1,34 +1,266 @@
-from typing import Dict, Any, Optional
-from app.utils.llm import GroqLLM
-import json
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
 from app.prompts.policy_eval_prompt import POLICY_EVAL_PROMPT
-from policy_data.default_policy import INSURANCE_POLICY
+from app.prompts.policy_judgement_prompt import POLICY_JUDGEMENT_PROMPT
 from app.models.output import PolicyEvalOutput
-from langchain.output_parsers import PydanticOutputParser, OutputFixingParser
+from app.services.decision_index import DecisionQuery, get_decision_index
+from app.services.ingest import ParsedSummary, SummaryInput, ensure_parsed
+from app.services.policy_registry import CompiledPolicy, get_policy_registry
+from app.services.policy_rules import CompiledRule, evaluate_rules
+from app.utils.metrics import metrics
+from app.utils.prompt_payload import payload_budget
+from app.services.llm_stage import LLMStage, run_stage, arun_stage
 
-def evaluate_policy(data: Dict[str, Any], policy: Optional[str] = None) -> Dict[str, Any]:
+POLICY_STAGE = LLMStage(name="policy", output_model=PolicyEvalOutput, template=POLICY_EVAL_PROMPT, stream_field="policy_message")
+POLICY_JUDGEMENT_STAGE = LLMStage(name="policy_judgement", output_model=PolicyEvalOutput, template=POLICY_JUDGEMENT_PROMPT, stream_field="policy_message")
+
+UNPARSEABLE_CRITERION = "LLM response could not be parsed as JSON."
+
+def _policy_fallback() -> Dict[str, Any]:
     """
-    Uses an LLM to evaluate if the provided clinical summary data meets the insurance policy criteria.
+    Default denial returned when the LLM response cannot be parsed.
+    """
+    return {
+        "policy_approved": False,
+        "failed_criteria": [UNPARSEABLE_CRITERION],
+        "policy_message": "Sorry, we could not determine insurance eligibility. Please check your data and policy."
+    }
+
+def _rules_denial(failed: List[CompiledRule]) -> Dict[str, Any]:
+    """
+    Denial built locally from the failed mechanical criteria, without any LLM call.
+    """
+    criteria = "\n".join(f"- {rule.description}" for rule in failed)
+    return {
+        "policy_approved": False,
+        "failed_criteria": [rule.description for rule in failed],
+        "policy_message": (
+            "### ❌ Insurance claim not approved\n"
+            "The clinical summary does not meet the following policy criteria:\n" + criteria
+        ),
+        "decision_path": "rules_denied"
+    }
+
+def _rules_approval() -> Dict[str, Any]:
+    return {
+        "policy_approved": True,
+        "failed_criteria": [],
+        "policy_message": "### ✅ Insurance claim approved\nThe clinical summary meets every policy criterion.",
+        "decision_path": "rules_approved"
+    }
+
+def _build_policy_prompt(parsed: ParsedSummary, policy: CompiledPolicy, format_instructions: str) -> str:
+    payload = parsed.payload("policy", payload_budget(*policy.eval_prompt, format_instructions))
+    return policy.policy_prompt(payload) + format_instructions
+
+def _build_judgement_prompt(parsed: ParsedSummary, policy: CompiledPolicy, criteria: List[CompiledRule], format_instructions: str) -> str:
+    payload = parsed.payload("policy_judgement", payload_budget(*policy.judgement_template(criteria), format_instructions))
+    return policy.judgement_prompt(criteria, payload) + format_instructions
+
+@dataclass
+class PolicyPlan:
+    """
+    How a claim will be evaluated against `policy_id`: `result` is set when the local rules
+    settle it; otherwise build_prompt(format_instructions) builds the prompt for the LLM
+    `stage`, `cache_parts` identify its inputs for the result cache, `decision_parts` what
+    besides the claim shapes the decision (for the decision index) and `criteria` lists the
+    rules left to the LLM (judgement path only).
+    """
+    path: str
+    policy_id: str
+    result: Optional[Dict[str, Any]] = None
+    stage: Optional[LLMStage] = None
+    build_prompt: Optional[Callable[[str], str]] = None
+    cache_parts: Tuple[Any, ...] = ()
+    decision_parts: Tuple[Any, ...] = ()
+    parsed: Optional[ParsedSummary] = None
+    criteria: List[CompiledRule] = field(default_factory=list)
+
+def resolve_policy(policy: Optional[str] = None, policy_id: Optional[str] = None) -> CompiledPolicy:
+    """
+    The compiled policy to evaluate against: a registered one by id (the default policy when
+    neither is given), or one built from a custom policy text.
+    """
+    policies = get_policy_registry()
+    if policy is not None:
+        return policies.for_text(policy)
+    return policies.get(policy_id)
+
+def _llm_plan(parsed: ParsedSummary, policy: CompiledPolicy) -> PolicyPlan:
+    return PolicyPlan(
+        path="llm",
+        policy_id=policy.id,
+        stage=POLICY_STAGE,
+        build_prompt=lambda format_instructions: _build_policy_prompt(parsed, policy, format_instructions),
+        cache_parts=(policy.text, parsed.canonical),
+        decision_parts=(policy.text,),
+        parsed=parsed,
+    )
+
+def plan_policy(data: SummaryInput, policy: Optional[str] = None, policy_id: Optional[str] = None) -> PolicyPlan:
+    """
+    Run the policy's compiled rules and decide how the rest of the evaluation happens.
+    Policies without structured criteria (e.g. custom policy texts) go to the LLM whole.
+    """
+    parsed = ensure_parsed(data)
+    compiled = resolve_policy(policy, policy_id)
+    if not compiled.rules or parsed.summary is None:
+        return _llm_plan(parsed, compiled)
+    evaluation = evaluate_rules(compiled.rules, parsed.summary)
+    if evaluation.failed:
+        return PolicyPlan(path="rules_denied", policy_id=compiled.id, result=_rules_denial(evaluation.failed))
+    if not evaluation.undetermined:
+        return PolicyPlan(path="rules_approved", policy_id=compiled.id, result=_rules_approval())
+    criteria = evaluation.undetermined
+    return PolicyPlan(
+        path="llm_judgement",
+        policy_id=compiled.id,
+        stage=POLICY_JUDGEMENT_STAGE,
+        build_prompt=lambda format_instructions: _build_judgement_prompt(parsed, compiled, criteria, format_instructions),
+        cache_parts=(compiled.text, [rule.description for rule in criteria], parsed.canonical),
+        decision_parts=(compiled.text, [rule.description for rule in criteria]),
+        parsed=parsed,
+        criteria=criteria,
+    )
+
+def _record(plan: PolicyPlan) -> None:
+    metrics.inc("policy_decisions_total", path=plan.path)
+    if plan.result is not None:
+        metrics.inc("policy_llm_calls_avoided_total")
+
+def _finish(plan: PolicyPlan, result: Dict[str, Any]) -> Dict[str, Any]:
+    return {**result, "decision_path": plan.path, "policy_id": plan.policy_id}
+
+def _decision_query(plan: PolicyPlan) -> Optional[DecisionQuery]:
+    """
+    The plan's lookup in the decision index, or None when the index is off.
+    """
+    if get_decision_index() is None:
+        return None
+    return DecisionQuery.for_claim(plan.stage, plan.decision_parts, plan.parsed)
+
+def _reused_decision(query: Optional[DecisionQuery], use_cache: bool) -> Optional[Dict[str, Any]]:
+    if query is None or not use_cache:
+        return None
+    result = get_decision_index().lookup(query)
+    if result is not None:
+        metrics.inc("policy_llm_calls_avoided_total")
+    return result
+
+async def _areused_decision(query: Optional[DecisionQuery], use_cache: bool) -> Optional[Dict[str, Any]]:
+    if query is None or not use_cache:
+        return None
+    result = await get_decision_index().alookup(query)
+    if result is not None:
+        metrics.inc("policy_llm_calls_avoided_total")
+    return result
+
+def _rememberable(query: Optional[DecisionQuery], result: Dict[str, Any]) -> bool:
+    return query is not None and result["failed_criteria"] != [UNPARSEABLE_CRITERION]
+
+def _remember_decision(query: Optional[DecisionQuery], result: Dict[str, Any]) -> None:
+    if _rememberable(query, result):
+        get_decision_index().remember(query, result)
+
+async def _aremember_decision(query: Optional[DecisionQuery], result: Dict[str, Any]) -> None:
+    if _rememberable(query, result):
+        await get_decision_index().aremember(query, result)
+
+def run_policy_plan(plan: PolicyPlan, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Complete a plan: its rule result, a decision reused from an equivalent earlier claim, or
+    the LLM evaluation (a default denial if unparseable).
+    """
+    _record(plan)
+    if plan.result is not None:
+        return _finish(plan, plan.result)
+    query = _decision_query(plan)
+    result = _reused_decision(query, use_cache)
+    if result is None:
+        result = run_stage(plan.stage, plan.build_prompt, _policy_fallback, cache_parts=plan.cache_parts, use_cache=use_cache)
+        _remember_decision(query, result)
+    return _finish(plan, result)
+
+async def arun_policy_plan(plan: PolicyPlan, use_cache: bool = True, on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    Async variant of run_policy_plan; with on_token the policy message is streamed (a reused
+    decision's message in one piece).
+    """
+    _record(plan)
+    if plan.result is not None:
+        return _finish(plan, plan.result)
+    query = _decision_query(plan)
+    result = await _areused_decision(query, use_cache)
+    if result is not None:
+        if on_token is not None and result.get("policy_message"):
+            on_token(result["policy_message"])
+        return _finish(plan, result)
+    result = await arun_stage(
+        plan.stage, plan.build_prompt, _policy_fallback, cache_parts=plan.cache_parts, use_cache=use_cache, on_token=on_token
+    )
+    await _aremember_decision(query, result)
+    return _finish(plan, result)
+
+def evaluate_policy(data: SummaryInput, policy: Optional[str] = None, use_cache: bool = True, policy_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Evaluates if the provided clinical summary data meets an insurance policy: the registered
+    policy `policy_id` (default MEDICHECK_DEFAULT_POLICY) or a custom `policy` text.
+    Mechanically checkable criteria are decided by the local rule engine, denials
+    short-circuit without an LLM call, and only judgemental criteria are sent to the LLM.
     Returns a dictionary with the evaluation result and a user-friendly message.
     """
-    if policy is None:
-        policy = INSURANCE_POLICY
-    llm = GroqLLM(model="llama3-70b-8192", temperature=0.2)
-    base_parser = PydanticOutputParser(pydantic_object=PolicyEvalOutput)
-    parser = OutputFixingParser.from_llm(parser=base_parser, llm=llm.llm)
-    prompt = POLICY_EVAL_PROMPT.format(
-        policy=policy,
-        patient_json=json.dumps(data, indent=2)
-    ) + "\n" + parser.get_format_instructions()
-    # Get the output from the LLM synchronously
-    response = llm.call(prompt)
-    try:
-        result = parser.parse(response)
-        return result.dict()
-    except Exception:
-        # If parsing fails, return a default message
-        return {
-            "policy_approved": False,
-            "failed_criteria": ["LLM response could not be parsed as JSON."],
-            "policy_message": "Sorry, we could not determine insurance eligibility. Please check your data and policy."
-        } 
\ No newline at end of file
+    return run_policy_plan(plan_policy(data, policy, policy_id), use_cache=use_cache)
+
+async def aevaluate_policy(
+    data: SummaryInput,
+    policy: Optional[str] = None,
+    use_cache: bool = True,
+    on_token: Optional[Callable[[str], None]] = None,
+    policy_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Async variant of evaluate_policy; awaits the LLM instead of blocking the event loop.
+    With on_token, the LLM's policy message is passed on piece by piece as it is generated.
+    """
+    return await arun_policy_plan(plan_policy(data, policy, policy_id), use_cache=use_cache, on_token=on_token)
+
+def selected_policy_ids(policy_ids: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    The policy ids a request asked for, or just the default policy.
+    """
+    return list(policy_ids) if policy_ids else [get_policy_registry().default_id]
+
+def evaluate_policies(data: SummaryInput, policy_ids: Optional[Sequence[str]] = None, use_cache: bool = True) -> List[Dict[str, Any]]:
+    """
+    Evaluate one claim against several registered policies (default: the default policy),
+    returning one result per policy in the order given. Policies the local rules settle cost
+    nothing; the LLM evaluations run concurrently in threads.
+    """
+    parsed = ensure_parsed(data)
+    plans = [plan_policy(parsed, policy_id=policy_id) for policy_id in selected_policy_ids(policy_ids)]
+    pending = [plan for plan in plans if plan.result is None]
+    if len(pending) <= 1:
+        return [run_policy_plan(plan, use_cache) for plan in plans]
+    with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="policy") as executor:
+        futures = [executor.submit(contextvars.copy_context().run, run_policy_plan, plan, use_cache) for plan in plans]
+        return [future.result() for future in futures]
+
+async def aevaluate_policies(
+    data: SummaryInput,
+    policy_ids: Optional[Sequence[str]] = None,
+    use_cache: bool = True,
+    on_token: Optional[Callable[[str, str], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Async variant of evaluate_policies; the LLM evaluations are awaited concurrently. on_token
+    receives (policy_id, text) for the policy messages being streamed.
+    """
+    parsed = ensure_parsed(data)
+    plans = [plan_policy(parsed, policy_id=policy_id) for policy_id in selected_policy_ids(policy_ids)]
+    return list(await asyncio.gather(*(
+        arun_policy_plan(plan, use_cache, on_token=partial(on_token, plan.policy_id) if on_token else None) for plan in plans
+    )))
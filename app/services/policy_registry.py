@@ -0,0 +1,161 @@
+import json
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.prompts.policy_eval_prompt import POLICY_EVAL_PROMPT
+from app.prompts.policy_judgement_prompt import POLICY_JUDGEMENT_PROMPT
+from app.services.policy_rules import CompiledRule, compile_rules
+from app.utils.settings import get_settings
+from policy_data import default_policy
+from policy_data.default_policy import INSURANCE_POLICY, POLICY_CRITERIA
+
+DEFAULT_POLICY_ID = "default"
+# Payer policies shipped with the app; MEDICHECK_POLICY_DIR points elsewhere.
+BUNDLED_POLICY_DIR = Path(default_policy.__file__).parent / "policies"
+
+_PATIENT_JSON = "\x00patient_json\x00"
+
+
+def _split_template(template: str, **values: str) -> Tuple[str, str]:
+    """
+    Fill every placeholder of a prompt template except {patient_json}; returns the prompt
+    text before and after the patient JSON.
+    """
+    prefix, suffix = template.format(patient_json=_PATIENT_JSON, **values).split(_PATIENT_JSON)
+    return prefix, suffix
+
+
+@dataclass
+class CompiledPolicy:
+    """
+    A payer policy ready to evaluate: its text, its compiled rules and the prompt text around
+    the patient JSON, built once and reused for every claim. Policies without structured
+    criteria are evaluated by the LLM from their text alone.
+    """
+    id: str
+    name: str
+    text: str
+    rules: Tuple[CompiledRule, ...] = ()
+    eval_prompt: Tuple[str, str] = ("", "")
+    _judgement_prompts: Dict[Tuple[str, ...], Tuple[str, str]] = field(default_factory=dict, repr=False)
+
+    def policy_prompt(self, patient_json: str) -> str:
+        """
+        The full-policy evaluation prompt for one claim.
+        """
+        prefix, suffix = self.eval_prompt
+        return prefix + patient_json + suffix
+
+    def judgement_template(self, criteria: Sequence[CompiledRule]) -> Tuple[str, str]:
+        """
+        The judgement prompt text before and after the patient JSON for `criteria`, built once
+        per distinct set of criteria.
+        """
+        key = tuple(rule.id for rule in criteria)
+        parts = self._judgement_prompts.get(key)
+        if parts is None:
+            parts = _split_template(POLICY_JUDGEMENT_PROMPT, criteria="\n".join(f"- {rule.description}" for rule in criteria))
+            self._judgement_prompts[key] = parts
+        return parts
+
+    def judgement_prompt(self, criteria: Sequence[CompiledRule], patient_json: str) -> str:
+        """
+        The prompt judging only `criteria` for one claim.
+        """
+        prefix, suffix = self.judgement_template(criteria)
+        return prefix + patient_json + suffix
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "criteria": len(self.rules),
+            "judgement_criteria": sum(1 for rule in self.rules if rule.is_judgement),
+        }
+
+
+def compile_policy(policy_id: str, text: str, criteria: Sequence[Dict[str, Any]] = (), name: Optional[str] = None) -> CompiledPolicy:
+    """
+    Compile a policy's criteria and prompt prefix; raises ValueError on malformed criteria.
+    """
+    policy = CompiledPolicy(id=policy_id, name=name or policy_id, text=text, rules=compile_rules(criteria))
+    policy.eval_prompt = _split_template(POLICY_EVAL_PROMPT, policy=text)
+    # Judgement rules always go to the LLM, so their prompt is needed for nearly every claim.
+    judgement = [rule for rule in policy.rules if rule.is_judgement]
+    if judgement:
+        policy.judgement_template(judgement)
+    return policy
+
+
+def load_policy_file(path: Path) -> CompiledPolicy:
+    """
+    Load one policy document: a JSON object with "text" (a string or a list of lines), optional
+    "criteria" in the rule engine's declarative form, and optional "id" (defaults to the file
+    name) and "name".
+    """
+    try:
+        document = json.loads(path.read_text(encoding="utf-8"))
+        text = document["text"]
+        if isinstance(text, list):
+            text = "\n".join(text)
+        return compile_policy(
+            document.get("id", path.stem), text, document.get("criteria", []), name=document.get("name")
+        )
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid policy document {path}: {e}") from e
+
+
+class PolicyRegistry:
+    """
+    The payer policies requests can be evaluated against, by id.
+    """
+    def __init__(self, policies: Sequence[CompiledPolicy], default_id: str = DEFAULT_POLICY_ID):
+        self._policies: Dict[str, CompiledPolicy] = {}
+        for policy in policies:
+            if policy.id in self._policies:
+                raise ValueError(f"Duplicate policy id '{policy.id}'")
+            self._policies[policy.id] = policy
+        if default_id not in self._policies:
+            raise ValueError(f"Default policy '{default_id}' is not registered")
+        self.default_id = default_id
+        self._by_text = {policy.text: policy for policy in policies}
+
+    def __contains__(self, policy_id: str) -> bool:
+        return policy_id in self._policies
+
+    def ids(self) -> List[str]:
+        return list(self._policies)
+
+    def get(self, policy_id: Optional[str] = None) -> CompiledPolicy:
+        """
+        The policy registered under policy_id (the default policy when None); KeyError if unknown.
+        """
+        policy_id = policy_id or self.default_id
+        try:
+            return self._policies[policy_id]
+        except KeyError:
+            raise KeyError(f"Unknown policy '{policy_id}'") from None
+
+    def for_text(self, text: str) -> CompiledPolicy:
+        """
+        The registered policy with exactly this text, else an ad-hoc text-only policy.
+        """
+        return self._by_text.get(text) or compile_policy("custom", text)
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [policy.describe() for policy in self._policies.values()]
+
+
+@lru_cache(maxsize=1)
+def get_policy_registry() -> PolicyRegistry:
+    """
+    Load and compile every policy once: the built-in default policy plus each *.json document
+    in MEDICHECK_POLICY_DIR (default policy_data/policies). registry.reload() clears this cache.
+    """
+    settings = get_settings()
+    directory = Path(settings.policy_dir) if settings.policy_dir else BUNDLED_POLICY_DIR
+    policies = [compile_policy(DEFAULT_POLICY_ID, INSURANCE_POLICY, POLICY_CRITERIA, name="Default inpatient policy")]
+    if directory.is_dir():
+        policies.extend(load_policy_file(path) for path in sorted(directory.glob("*.json")))
+    return PolicyRegistry(policies, default_id=settings.default_policy)
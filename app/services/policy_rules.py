@@ -0,0 +1,163 @@
+import operator
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from pydantic import BaseModel
+from app.models.clinical_summary import ClinicalSummary
+
+# A compiled check returns True (criterion met), False (not met) or None (cannot be decided
+# locally, e.g. an unparseable date), in which case the criterion is handed to the LLM.
+Check = Callable[[ClinicalSummary], Optional[bool]]
+
+
+# What a failed check means: the claim is denied, or the criterion goes to the LLM (for
+# shortcuts whose failure does not settle the policy's wording, e.g. "recent").
+ON_FAIL_ACTIONS = ("deny", "judgement")
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """
+    A policy criterion ready to evaluate. Judgement rules have no check and always go to the LLM;
+    rules with deny_on_fail=False pass locally but are handed to the LLM when their check fails.
+    """
+    id: str
+    description: str
+    check: Optional[Check] = None
+    deny_on_fail: bool = True
+
+    @property
+    def is_judgement(self) -> bool:
+        return self.check is None
+
+
+@dataclass
+class RuleEvaluation:
+    """
+    Result of running the compiled rules over one clinical summary.
+    """
+    passed: List[CompiledRule] = field(default_factory=list)
+    failed: List[CompiledRule] = field(default_factory=list)
+    undetermined: List[CompiledRule] = field(default_factory=list)
+
+
+def _compile_path(path: str) -> Callable[[BaseModel], List[Any]]:
+    """
+    Compile a dotted field path (with "[*]" fanning out over list items) into a getter
+    returning every value it addresses.
+    """
+    steps: List[Tuple[str, bool]] = []
+    for part in path.split("."):
+        fan_out = part.endswith("[*]")
+        steps.append((part[:-3] if fan_out else part, fan_out))
+
+    def getter(model: BaseModel) -> List[Any]:
+        values = [model]
+        for name, fan_out in steps:
+            next_values = []
+            for value in values:
+                value = getattr(value, name, None) if value is not None else None
+                if fan_out:
+                    next_values.extend(value or [])
+                else:
+                    next_values.append(value)
+            values = next_values
+        return values
+
+    return getter
+
+
+def _first(values: List[Any]) -> Any:
+    return values[0] if values else None
+
+
+def _is_present(value: Any) -> bool:
+    if value is None:
+        return False
+    if isinstance(value, (str, list, dict)):
+        return bool(value.strip() if isinstance(value, str) else value)
+    return True
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value.strip()[:10])
+    except ValueError:
+        return None
+
+
+def _compare(op: Callable[[Any, Any], bool], threshold: Any) -> Callable[[List[Any]], Optional[bool]]:
+    def check(values: List[Any]) -> Optional[bool]:
+        value = _first(values)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return None
+        return op(value, threshold)
+    return check
+
+
+def _within_days(days: int, reference: Callable[[BaseModel], List[Any]]) -> Callable[[List[Any], BaseModel], Optional[bool]]:
+    def check(values: List[Any], summary: BaseModel) -> Optional[bool]:
+        reference_date = _parse_date(_first(reference(summary)))
+        dates = [_parse_date(v) for v in values]
+        if reference_date is None or not dates or any(d is None for d in dates):
+            return None
+        return any(0 <= (reference_date - d).days <= days for d in dates)
+    return check
+
+
+_VALUE_OPS: Dict[str, Callable[[Dict[str, Any]], Callable[[List[Any]], Optional[bool]]]] = {
+    "gt": lambda c: _compare(operator.gt, c["value"]),
+    "lt": lambda c: _compare(operator.lt, c["value"]),
+    "is_false": lambda c: lambda values: not any(v is True for v in values),
+    "present": lambda c: lambda values: _is_present(_first(values)),
+    "all_present": lambda c: lambda values: bool(values) and all(_is_present(v) for v in values),
+    "any_true": lambda c: lambda values: any(v is True for v in values),
+}
+
+
+def compile_rule(criterion: Dict[str, Any]) -> CompiledRule:
+    """
+    Compile one declarative criterion (see policy_data/default_policy.POLICY_CRITERIA).
+    """
+    if criterion.get("judgement"):
+        return CompiledRule(id=criterion["id"], description=criterion["description"])
+    getter = _compile_path(criterion["field"])
+    op = criterion["op"]
+    on_fail = criterion.get("on_fail", "deny")
+    if on_fail not in ON_FAIL_ACTIONS:
+        raise ValueError(f"Unknown on_fail '{on_fail}' in policy criterion '{criterion['id']}'")
+    if op == "within_days":
+        within = _within_days(criterion["value"], _compile_path(criterion["reference"]))
+        check: Check = lambda summary: within(getter(summary), summary)
+    elif op in _VALUE_OPS:
+        value_check = _VALUE_OPS[op](criterion)
+        check = lambda summary: value_check(getter(summary))
+    else:
+        raise ValueError(f"Unknown operator '{op}' in policy criterion '{criterion['id']}'")
+    return CompiledRule(id=criterion["id"], description=criterion["description"], check=check, deny_on_fail=on_fail == "deny")
+
+
+def compile_rules(criteria: Iterable[Dict[str, Any]]) -> Tuple[CompiledRule, ...]:
+    """
+    Compile a list of declarative criteria into rules; raises ValueError on malformed entries.
+    """
+    return tuple(compile_rule(criterion) for criterion in criteria)
+
+
+def evaluate_rules(rules: Iterable[CompiledRule], summary: ClinicalSummary) -> RuleEvaluation:
+    """
+    Run every rule over the summary, sorting them into passed, failed and undetermined. A rule
+    that fails but does not deny on failure is undetermined.
+    """
+    evaluation = RuleEvaluation()
+    for rule in rules:
+        outcome = None if rule.is_judgement else rule.check(summary)
+        if outcome is True:
+            evaluation.passed.append(rule)
+        elif outcome is False and rule.deny_on_fail:
+            evaluation.failed.append(rule)
+        else:
+            evaluation.undetermined.append(rule)
+    return evaluation
@@ -0,0 +1,117 @@
+import asyncio
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.services.ingest import ParsedSummary, SummaryInput, ensure_parsed
+from app.services.guardrail import structural_guardrail, llm_guardrail, allm_guardrail
+from app.services.validator import validate_clinical_summary, avalidate_clinical_summary
+from app.services.policy import evaluate_policies, aevaluate_policies
+from app.utils.metrics import metrics
+from app.utils.settings import get_settings
+
+Results = Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[List[Dict[str, Any]]]]
+
+def _speculate_policy(parsed: ParsedSummary) -> bool:
+    """
+    Start the policy evaluation before the guardrail answers only when it can be used: the
+    summary passes the schema (so validation needs no LLM) and speculation is enabled.
+    """
+    return get_settings().speculative_policy and parsed.is_valid
+
+def _record_discarded(stage: str, done: bool) -> None:
+    metrics.inc("speculative_tasks_total", stage=stage, outcome="discarded" if done else "cancelled")
+
+def _record_skipped(parsed: ParsedSummary) -> None:
+    """
+    Count the stages not speculated on because the structural guardrail accepted the summary
+    locally: with no guardrail LLM call to overlap, the stages run in sequence as in standard mode.
+    """
+    metrics.inc("speculative_tasks_total", stage="validation", outcome="skipped")
+    if _speculate_policy(parsed):
+        metrics.inc("speculative_tasks_total", stage="policy", outcome="skipped")
+
+def check_validate_evaluate(data: SummaryInput, use_cache: bool = True, policy_ids: Optional[Sequence[str]] = None) -> Results:
+    """
+    Guardrail, validation and (speculatively) policy evaluation run concurrently in threads when
+    the guardrail needs the LLM. Returns (guardrail result, validation result or None, one policy
+    result per policy id or None). When the structural guardrail decides locally there is nothing
+    to overlap and the stages run in sequence, as in standard mode.
+
+    Work made pointless by a guardrail rejection is cancelled if not yet started; threads cannot
+    be interrupted, so an LLM call already in flight runs to completion (and uses its budget)
+    before its result is discarded. acheck_validate_evaluate cancels such calls mid-request.
+    """
+    parsed = ensure_parsed(data)
+    guardrail = structural_guardrail(parsed)
+    if guardrail is not None:
+        if not guardrail["is_insurance_summary"]:
+            return guardrail, None, None
+        _record_skipped(parsed)
+        validation = validate_clinical_summary(parsed, use_cache)
+        if not validation["is_valid"]:
+            return guardrail, validation, None
+        return guardrail, validation, evaluate_policies(parsed, policy_ids, use_cache=use_cache)
+    executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="speculative")
+    futures: Dict[str, Future] = {}
+    try:
+        def submit(stage: str, fn, *args) -> None:
+            futures[stage] = executor.submit(contextvars.copy_context().run, fn, *args)
+
+        submit("validation", validate_clinical_summary, parsed, use_cache)
+        if _speculate_policy(parsed):
+            submit("policy", evaluate_policies, parsed, policy_ids, use_cache)
+        guardrail = llm_guardrail(parsed, use_cache)
+        if not guardrail["is_insurance_summary"]:
+            for stage, future in futures.items():
+                _record_discarded(stage, not future.cancel())
+            return guardrail, None, None
+        validation = futures["validation"].result()
+        if not validation["is_valid"]:
+            return guardrail, validation, None
+        if "policy" in futures:
+            metrics.inc("speculative_tasks_total", stage="policy", outcome="used")
+            return guardrail, validation, futures["policy"].result()
+        return guardrail, validation, evaluate_policies(parsed, policy_ids, use_cache=use_cache)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def acheck_validate_evaluate(data: SummaryInput, use_cache: bool = True, policy_ids: Optional[Sequence[str]] = None) -> Results:
+    """
+    Async variant of check_validate_evaluate; speculative stages are tasks on the event loop and
+    are cancelled mid-call when the guardrail rejects.
+    """
+    parsed = ensure_parsed(data)
+    guardrail = structural_guardrail(parsed)
+    if guardrail is not None:
+        if not guardrail["is_insurance_summary"]:
+            return guardrail, None, None
+        _record_skipped(parsed)
+        validation = await avalidate_clinical_summary(parsed, use_cache=use_cache)
+        if not validation["is_valid"]:
+            return guardrail, validation, None
+        return guardrail, validation, await aevaluate_policies(parsed, policy_ids, use_cache=use_cache)
+    tasks: Dict[str, asyncio.Task] = {
+        "validation": asyncio.ensure_future(avalidate_clinical_summary(parsed, use_cache=use_cache))
+    }
+    if _speculate_policy(parsed):
+        tasks["policy"] = asyncio.ensure_future(aevaluate_policies(parsed, policy_ids, use_cache=use_cache))
+    try:
+        guardrail = await allm_guardrail(parsed, use_cache)
+        if not guardrail["is_insurance_summary"]:
+            for stage, task in tasks.items():
+                _record_discarded(stage, task.done())
+            return guardrail, None, None
+        validation = await tasks["validation"]
+        if not validation["is_valid"]:
+            return guardrail, validation, None
+        if "policy" in tasks:
+            metrics.inc("speculative_tasks_total", stage="policy", outcome="used")
+            return guardrail, validation, await tasks["policy"]
+        return guardrail, validation, await aevaluate_policies(parsed, policy_ids, use_cache=use_cache)
+    finally:
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # Retrieve errors of discarded tasks so they are not logged as unhandled.
+                task.exception()
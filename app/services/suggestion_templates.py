@@ -0,0 +1,78 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+from app.models.clinical_summary import ClinicalSummary
+from app.utils.annotations import unwrap_annotation
+
+# Plain-language names for the scalar types used in ClinicalSummary.
+TYPE_NAMES = {
+    str: "text",
+    int: "a whole number",
+    float: "a number",
+    bool: "true or false",
+}
+
+
+def _describe_type(annotation: Any) -> str:
+    inner, is_list = unwrap_annotation(annotation)
+    if isinstance(inner, type) and issubclass(inner, BaseModel):
+        name = "an object with " + ", ".join(f"`{field}`" for field in inner.model_fields)
+        return f"a list of entries, each {name}" if is_list else name
+    name = TYPE_NAMES.get(inner, "a value")
+    return f"a list of {name if name != 'text' else 'text values'}" if is_list else name
+
+
+def _field_info(loc: Tuple[Any, ...]) -> Optional[FieldInfo]:
+    """
+    The FieldInfo a validation error location points at, skipping list indices.
+    """
+    model: Optional[Type[BaseModel]] = ClinicalSummary
+    info = None
+    for part in loc:
+        if isinstance(part, int):
+            continue
+        if model is None or part not in model.model_fields:
+            return None
+        info = model.model_fields[part]
+        inner, _ = unwrap_annotation(info.annotation)
+        model = inner if isinstance(inner, type) and issubclass(inner, BaseModel) else None
+    return info
+
+
+def _preview(value: Any, limit: int = 60) -> str:
+    text = json.dumps(value, default=str)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _location(loc: Tuple[Any, ...]) -> str:
+    path = ""
+    for part in loc:
+        path += f"[{part}]" if isinstance(part, int) else (f".{part}" if path else str(part))
+    return path
+
+
+def _suggestion(error: Dict[str, Any]) -> str:
+    loc = tuple(error["loc"])
+    if not loc:
+        return "The clinical summary must be a JSON object with the sections " + ", ".join(
+            f"`{name}`" for name in ClinicalSummary.model_fields
+        ) + "."
+    info = _field_info(loc)
+    if info is None:
+        return f"Please correct `{_location(loc)}`: {error['msg']}."
+    expected = _describe_type(info.annotation)
+    about = f" ({info.description})" if info.description else ""
+    example = f", e.g. {json.dumps(info.examples[0])}" if info.examples else ""
+    if error["type"] == "missing":
+        return f"Please add `{_location(loc)}`{about}. It should be {expected}{example}."
+    return f"Please correct `{_location(loc)}`{about}: it should be {expected}{example}, but got {_preview(error.get('input'))}."
+
+
+def template_suggestions(errors: List[Dict[str, Any]]) -> List[str]:
+    """
+    One user-facing suggestion per validation error (pydantic's error dicts, as returned by
+    ValidationError.errors()), phrased from the descriptions and examples declared on the
+    ClinicalSummary fields; no LLM involved.
+    """
+    return [_suggestion(err) for err in errors]
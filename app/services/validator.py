@@ -1,40 +1,82 @@
 from typing import List, Dict, Any
-from pydantic import ValidationError
-from app.models.clinical_summary import ClinicalSummary
-from app.utils.llm import GroqLLM
 from app.prompts.validator_suggestion_prompt import VALIDATOR_SUGGESTION_PROMPT
-from langchain.output_parsers import PydanticOutputParser, OutputFixingParser
 from app.models.output import ValidatorOutput
-import json
+from app.services.ingest import ParsedSummary, SummaryInput, ensure_parsed
+from app.services.llm_stage import LLMStage, run_stage, arun_stage
+from app.services.suggestion_templates import template_suggestions
+from app.utils.metrics import metrics
+from app.utils.settings import get_settings
+from app.utils.prompt_payload import build_payload, payload_budget
 
-def validate_clinical_summary(data: dict) -> Dict[str, Any]:
-    try:
-        ClinicalSummary.model_validate(data)
-        return {
-            "is_valid": True,
-            "missing_fields": [],
-            "suggestions": []
-        }
-    except ValidationError as e:
-        missing_fields = []
-        for err in e.errors():
-            loc = ".".join(str(x) for x in err["loc"])
-            missing_fields.append(loc)
-        # Use LLM to generate a user-friendly suggestion with output parsing
-        llm = GroqLLM(model="llama3-70b-8192", temperature=0.2)
-        base_parser = PydanticOutputParser(pydantic_object=ValidatorOutput)
-        parser = OutputFixingParser.from_llm(parser=base_parser, llm=llm.llm)
-        prompt = VALIDATOR_SUGGESTION_PROMPT.format(
-            data=json.dumps(data, indent=2),
-            missing_fields=missing_fields
-        ) + "\n" + parser.get_format_instructions()
-        llm_response = llm.call(prompt)
-        try:
-            result = parser.parse(llm_response)
-            return result.dict()
-        except Exception:
-            return {
-                "is_valid": False,
-                "missing_fields": missing_fields,
-                "suggestions": ["Sorry, we could not generate suggestions. Please check your data."]
-            } 
\ No newline at end of file
+VALIDATOR_STAGE = LLMStage(name="validator", output_model=ValidatorOutput, template=VALIDATOR_SUGGESTION_PROMPT)
+
+def _suggestion_fallback(missing_fields: List[str]) -> Dict[str, Any]:
+    return {
+        "is_valid": False,
+        "missing_fields": missing_fields,
+        "suggestions": ["Sorry, we could not generate suggestions. Please check your data."]
+    }
+
+def _valid_result() -> Dict[str, Any]:
+    return {
+        "is_valid": True,
+        "missing_fields": [],
+        "suggestions": []
+    }
+
+def _template_result(parsed: ParsedSummary) -> Dict[str, Any]:
+    metrics.inc("validator_suggestions_total", path="template")
+    return {
+        "is_valid": False,
+        "missing_fields": parsed.missing_fields,
+        "suggestions": template_suggestions(parsed.errors)
+    }
+
+def _build_suggestion_prompt(data: dict, missing_fields: List[str], format_instructions: str) -> str:
+    max_tokens = payload_budget(VALIDATOR_SUGGESTION_PROMPT, str(missing_fields), format_instructions)
+    return VALIDATOR_SUGGESTION_PROMPT.format(
+        data=build_payload(data, "validator", missing_fields, max_tokens=max_tokens),
+        missing_fields=missing_fields
+    ) + format_instructions
+
+def validate_clinical_summary(data: SummaryInput, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Validates the summary against ClinicalSummary, reusing the validation of a ParsedSummary;
+    every schema error is reported at once. Suggestions for invalid summaries are built
+    locally from the field metadata; set MEDICHECK_LLM_SUGGESTIONS to have the LLM phrase them.
+    """
+    parsed = ensure_parsed(data)
+    if parsed.is_valid:
+        return _valid_result()
+    if not get_settings().llm_suggestions:
+        return _template_result(parsed)
+    metrics.inc("validator_suggestions_total", path="llm")
+    missing_fields = parsed.missing_fields
+    # Use LLM to generate a user-friendly suggestion with output parsing
+    return run_stage(
+        VALIDATOR_STAGE,
+        lambda format_instructions: _build_suggestion_prompt(parsed.data, missing_fields, format_instructions),
+        lambda: _suggestion_fallback(missing_fields),
+        cache_parts=(parsed.canonical,),
+        use_cache=use_cache,
+    )
+
+async def avalidate_clinical_summary(data: SummaryInput, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Async variant of validate_clinical_summary; the schema check and template suggestions stay
+    local, only the opt-in suggestion LLM call is awaited.
+    """
+    parsed = ensure_parsed(data)
+    if parsed.is_valid:
+        return _valid_result()
+    if not get_settings().llm_suggestions:
+        return _template_result(parsed)
+    metrics.inc("validator_suggestions_total", path="llm")
+    missing_fields = parsed.missing_fields
+    return await arun_stage(
+        VALIDATOR_STAGE,
+        lambda format_instructions: _build_suggestion_prompt(parsed.data, missing_fields, format_instructions),
+        lambda: _suggestion_fallback(missing_fields),
+        cache_parts=(parsed.canonical,),
+        use_cache=use_cache,
+    )
@@ -0,0 +1,100 @@
+import gc
+import os
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_IMPORTED_AT = time.time()
+_ready_at: Optional[float] = None
+_preloaded = False
+
+
+def _process_started() -> float:
+    """
+    Wall-clock start of this process (for a forked worker: the fork), from /proc where
+    available, else the first import of this module.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return _IMPORTED_AT
+
+
+def _memory() -> Dict[str, int]:
+    """
+    Resident (RSS) and proportional (PSS: shared pages split between the processes sharing
+    them) memory in bytes; PSS is what a preloaded worker really costs.
+    """
+    memory = {}
+    if resource is not None:
+        memory["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    memory[f"{name.lower()}_bytes"] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return memory
+
+
+def preload() -> None:
+    """
+    Run in the gunicorn master before forking workers: import everything and build the policies,
+    parsers, LLM clients and compiled flows once, so every worker starts with them copy-on-write
+    instead of building its own. The objects are then frozen out of the garbage collector, whose
+    passes would otherwise touch (and un-share) every preloaded page in each worker.
+    """
+    global _preloaded
+    from app.utils.registry import registry
+    registry.warm_up()
+    gc.collect()
+    gc.freeze()
+    _preloaded = True
+
+
+def after_fork() -> None:
+    """
+    Run in each worker right after the fork: drop per-process state that must not be shared
+    with the master (SQLite connections, the scheduler's locks and buckets); it is rebuilt on
+    first use. Compiled flows, parsers and LLM clients are kept.
+    """
+    from app.services.decision_index import get_decision_index
+    from app.services.jobs import get_job_store
+    from app.utils.cache import get_result_cache
+    from app.utils.llm import get_scheduler
+    get_result_cache.cache_clear()
+    get_decision_index.cache_clear()
+    get_job_store.cache_clear()
+    get_scheduler.cache_clear()
+
+
+def mark_ready() -> None:
+    """
+    Record that this process finished its startup and serves requests.
+    """
+    global _ready_at
+    _ready_at = time.time()
+
+
+def process_stats() -> Dict[str, Any]:
+    """
+    Cold start (process start or fork until ready) and memory of the serving process.
+    """
+    started = _process_started()
+    return {
+        "pid": os.getpid(),
+        "preloaded": _preloaded,
+        "startup_seconds": round(_ready_at - started, 3) if _ready_at is not None else None,
+        "uptime_seconds": round(time.time() - started, 1),
+        **_memory(),
+    }
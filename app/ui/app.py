@@ -1,8 +1,399 @@
 import streamlit as st
 import requests
+import hashlib
 import json
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeouts in seconds; the read timeout bounds the wait between two chunks, so
+# streamed validations and batches may take longer in total.
+BACKEND_TIMEOUT = (
+    float(os.getenv("BACKEND_CONNECT_TIMEOUT", "5")),
+    float(os.getenv("BACKEND_READ_TIMEOUT", "120")),
+)
+BATCH_CONCURRENCY = int(os.getenv("BACKEND_BATCH_CONCURRENCY", "8"))
+# Validation results are reused for the same file and backend for this long.
+RESULT_TTL_SECONDS = 3600
+RESULT_CACHE_ENTRIES = 256
+
+
+@st.cache_resource
+def get_session():
+    """
+    One HTTP session per UI process, shared by all reruns and browser sessions, so requests reuse
+    pooled keep-alive connections to the backend. Only failed connection attempts are retried;
+    a validation that reached the backend is never sent twice.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class ResultCache:
+    """
+    Final validation results by (backend URL, file hash) with a per-entry TTL, dropping the
+    oldest entries past max_entries.
+    """
+    def __init__(self, ttl_seconds, max_entries):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def set(self, key, result):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+@st.cache_resource
+def get_result_cache():
+    """
+    Results shared by all reruns and browser sessions of this UI process, whether they were
+    streamed or fetched in one request. Only the result is kept: the live progress of a
+    streamed validation is drawn outside any cache, so nothing stale is replayed.
+    """
+    return ResultCache(RESULT_TTL_SECONDS, RESULT_CACHE_ENTRIES)
+
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@st.cache_data(max_entries=256)
+def parse_summary(digest, _data):
+    """
+    Decode an uploaded file once per content; reruns reuse the parsed JSON. `_data` is not
+    hashed by Streamlit, the digest is the cache key.
+    """
+    return json.loads(_data)
+
+
+def iter_sse(response):
+    """
+    Yield (event, data) pairs from a text/event-stream response.
+    """
+    event = "message"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            event = "message"
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            yield event, json.loads(line[len("data:"):].strip())
+
+
+def show_server_error(response):
+    st.error(f"❌ Server error: Status code {response.status_code}")
+    try:
+        st.json(response.json())
+    except:
+        st.text(response.text)
+
+
+class StreamError(Exception):
+    """
+    The streaming endpoint reported an error, or ended without a result.
+    """
+
+
+def stream_validation(backend_url, json_data):
+    """
+    Call the streaming endpoint, showing each stage as it is decided and the policy message as it
+    is written. Returns the final result; raises StreamError or a requests error otherwise.
+    """
+    st.markdown("---")
+    st.subheader("⏳ Live Progress")
+    stages = st.empty()
+    message = st.empty()
+    done = []
+    policy_text = ""
+    result = None
+    with get_session().post(f"{backend_url}/api/validate-summary/stream", json=json_data, stream=True, timeout=BACKEND_TIMEOUT) as response:
+        if response.status_code >= 400:
+            response.content  # read the error body before the connection is released
+            response.raise_for_status()
+        for event, data in iter_sse(response):
+            if event == "guardrail":
+                done.append("✅ Recognised as a clinical summary" if data["insurance_summary"] else "📝 Not a clinical summary")
+            elif event == "validation":
+                done.append("✅ All required fields present" if data["valid_summary"] else "⚠️ Missing or invalid fields")
+            elif event == "token":
+                if not policy_text:
+                    done.append("🧠 Evaluating the insurance policy...")
+                policy_text += data["text"]
+                message.markdown(policy_text)
+            elif event == "policy":
+                message.empty()
+            elif event == "result":
+                result = data
+            elif event == "error":
+                raise StreamError(data.get("error"))
+            stages.markdown("\n".join(f"- {line}" for line in done))
+    if result is None:
+        raise StreamError("The backend closed the stream without a result.")
+    return result
+
+
+def validate_summary(backend_url, json_data):
+    """
+    Validate one summary in one request. Errors raise.
+    """
+    response = get_session().post(f"{backend_url}/api/validate-summary", json=json_data, timeout=BACKEND_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def validate_cached(backend_url, digest, json_data, stream):
+    """
+    The cached result for the file's content when there is one, otherwise validate it (streamed
+    with live progress, or in one request) and cache the result. Errors raise and are not cached.
+    """
+    cache = get_result_cache()
+    result = cache.get((backend_url, digest))
+    if result is not None:
+        return result
+    if stream:
+        result = stream_validation(backend_url, json_data)
+    else:
+        with st.spinner("Validating clinical summary..."):
+            result = validate_summary(backend_url, json_data)
+    cache.set((backend_url, digest), result)
+    return result
+
+
+def render_result(result, json_data):
+    message = result.get("message", "")
+    combined_report = {
+        "submitted_summary": json_data,
+        "validation_result": result,
+        "validated_at": datetime.now().isoformat()
+    }
+
+    report_str = json.dumps(combined_report, indent=2)
+    st.download_button(
+        label="📄 Download Validation Report",
+        data=report_str,
+        file_name=f"validation_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+        mime="application/json"
+    )
+    st.markdown("---")
+    st.subheader("🧾 Validation Result")
+
+    # CASE 1 — Guardrail fail
+    if not result.get("insurance_summary", False):
+        st.info(f"📝 Guardrail Failed: {message}")
+
+    # CASE 2 — Validation fail
+    elif result.get("insurance_summary", False) and not result.get("valid_summary", False):
+        st.warning(f"⚠️ Validation Warning: {message}")
+        missing_fields = result.get("missing_fields", [])
+        if missing_fields:
+            st.markdown("#### ❗ Missing Fields:")
+            for field in missing_fields:
+                st.markdown(f"- `{field}`")
+
+    # CASE 3 — Policy check failed
+    elif result.get("valid_summary", False) and not result.get("approved", False):
+        st.error(f"❌ Policy Rejected: {message}")
+
+    # CASE 4 — All checks passed
+    elif result.get("approved", False):
+        st.success(f"✅ Approved: {message}")
+
+    else:
+        st.warning("⚠️ Unexpected response. Please check backend output.")
+
+
+def remember_result(backend_url, digest, result):
+    st.session_state.setdefault("results", {})[(backend_url, digest)] = (time.time(), result)
+
+
+def recalled_result(backend_url, digest):
+    """
+    The result this browser session last got for a file's content, so reruns (widget clicks,
+    downloads) show it again without re-validating.
+    """
+    entry = st.session_state.get("results", {}).get((backend_url, digest))
+    if entry is None or time.time() - entry[0] > RESULT_TTL_SECONDS:
+        return None
+    return entry[1]
+
+
+def show_request_error(error):
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        show_server_error(error.response)
+    else:
+        st.error(f"❌ Could not reach the backend: {error}")
+
+
+def validate_batch(backend_url, summaries, concurrency, on_record):
+    """
+    Submit the summaries as one NDJSON batch to /api/validate-batch, calling on_record with each
+    {index, ok, result | error} line as the backend finishes it. Returns False on a server error.
+    """
+    body = "".join(json.dumps(summary) + "\n" for summary in summaries).encode("utf-8")
+    with get_session().post(
+        f"{backend_url}/api/validate-batch",
+        params={"concurrency": concurrency},
+        data=body,
+        headers={"Content-Type": "application/x-ndjson"},
+        stream=True,
+        timeout=BACKEND_TIMEOUT,
+    ) as response:
+        if response.status_code != 200:
+            show_server_error(response)
+            return False
+        for line in response.iter_lines():
+            if line:
+                on_record(json.loads(line))
+    return True
+
+
+def result_status(result):
+    if not result.get("insurance_summary", False):
+        return "📝 Not a clinical summary"
+    if not result.get("valid_summary", False):
+        return "⚠️ Missing fields"
+    if result.get("approved", False):
+        return "✅ Approved"
+    return "❌ Policy rejected"
+
+
+def result_row(name, result=None, error=None):
+    if error is not None:
+        return {"File": name, "Status": "❌ Error", "Missing fields": "", "Message": error}
+    if result is None:
+        return {"File": name, "Status": "⏳ Not validated yet", "Missing fields": "", "Message": ""}
+    return {
+        "File": name,
+        "Status": result_status(result),
+        "Missing fields": ", ".join(result.get("missing_fields", [])),
+        "Message": result.get("message", ""),
+    }
+
+
+def validate_one(uploaded_file, backend_url):
+    st.success(f"✅ Uploaded: `{uploaded_file.name}` ({uploaded_file.size / 1024:.2f} KB)")
+    data = uploaded_file.getvalue()
+    digest = file_hash(data)
+    try:
+        json_data = parse_summary(digest, data)
+    except ValueError as e:
+        st.error(f"❌ Failed to parse JSON file: {e}")
+        return
+    st.markdown("### 🔍 Preview of Uploaded Data")
+    st.json(json_data, expanded=False)
+
+    stream = st.checkbox("⚡ Show results live as they are generated", value=True)
+    result = recalled_result(backend_url, digest)
+    if st.button("🧠 Validate Summary"):
+        try:
+            result = validate_cached(backend_url, digest, json_data, stream)
+        except StreamError as e:
+            result = None
+            st.error(f"❌ Server error: {e}")
+        except requests.RequestException as e:
+            result = None
+            show_request_error(e)
+        if result is not None:
+            remember_result(backend_url, digest, result)
+
+    if result is not None:
+        render_result(result, json_data)
+
+
+def validate_many(uploaded_files, backend_url):
+    """
+    Several files: validate the ones without a result in one concurrent batch request and list
+    every file's outcome in a table that fills in as the backend finishes each summary. Files
+    with the same content are submitted once.
+    """
+    st.success(f"✅ Uploaded {len(uploaded_files)} files")
+    files = []
+    for uploaded_file in uploaded_files:
+        data = uploaded_file.getvalue()
+        digest = file_hash(data)
+        try:
+            files.append((uploaded_file.name, digest, parse_summary(digest, data), None))
+        except ValueError as e:
+            files.append((uploaded_file.name, digest, None, f"Invalid JSON: {e}"))
+    errors = {digest: error for _, digest, _, error in files if error is not None}
+    pending = {
+        digest: json_data
+        for _, digest, json_data, error in files
+        if error is None and recalled_result(backend_url, digest) is None
+    }
+
+    def rows():
+        return [result_row(name, recalled_result(backend_url, digest), errors.get(digest)) for name, digest, _, _ in files]
+
+    concurrency = st.number_input("Summaries validated at once", min_value=1, max_value=64, value=BATCH_CONCURRENCY)
+    label = f"🧠 Validate {len(pending)} Summaries" if pending else "✅ All summaries validated"
+    run = st.button(label, disabled=not pending)
+    st.markdown("---")
+    st.subheader("🧾 Validation Results")
+    table = st.empty()
+    table.dataframe(rows(), hide_index=True)
+
+    if run and pending:
+        submitted = list(pending.items())
+        progress = st.progress(0.0, text=f"Validating 0 of {len(submitted)}...")
+        done = 0
+        shown_at = time.monotonic()
+
+        def on_record(record):
+            nonlocal done, shown_at
+            digest = submitted[record["index"]][0]
+            if record["ok"]:
+                remember_result(backend_url, digest, record["result"])
+            else:
+                errors[digest] = record["error"]
+            done += 1
+            progress.progress(done / len(submitted), text=f"Validating {done} of {len(submitted)}...")
+            # Redraw the table at most a few times a second, and once at the end.
+            if done == len(submitted) or time.monotonic() - shown_at > 0.25:
+                table.dataframe(rows(), hide_index=True)
+                shown_at = time.monotonic()
+
+        try:
+            validate_batch(backend_url, [json_data for _, json_data in submitted], int(concurrency), on_record)
+        except requests.RequestException as e:
+            show_request_error(e)
+        table.dataframe(rows(), hide_index=True)
+        progress.empty()
+
+    report = [
+        {"file": name, "submitted_summary": json_data, "validation_result": recalled_result(backend_url, digest)}
+        for name, digest, json_data, _ in files
+        if recalled_result(backend_url, digest) is not None
+    ]
+    if report:
+        st.download_button(
+            label="📄 Download Validation Report",
+            data=json.dumps({"results": report, "validated_at": datetime.now().isoformat()}, indent=2),
+            file_name=f"validation_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json"
+        )
 
 
 def main():
@@ -12,9 +403,10 @@ def main():
     # 📋 Instructions
     st.markdown("""
     ### 🧾 How to Use MediCheck
-    1. **Upload** a clinical summary JSON file (format shown below).
+    1. **Upload** a clinical summary JSON file (format shown below), or several to clear a queue.
     2. **Click "Validate Summary"** to let our AI evaluate it.
-    3. **Review the validation results**, including any missing fields.
+    3. **Review the validation results**, including any missing fields; several files are
+       validated concurrently and listed in a results table.
     """)
 
     st.markdown("---")
@@ -89,76 +481,14 @@ def main():
     st.markdown("---")
 
     # File upload
-    uploaded_file = st.file_uploader("📂 Upload Clinical Summary JSON", type=["json"])
+    uploaded_files = st.file_uploader("📂 Upload Clinical Summary JSON", type=["json"], accept_multiple_files=True)
     backend_url = os.getenv("BACKEND_URL", "http://127.0.0.1:8000").strip()
 
-    if uploaded_file:
-        st.success(f"✅ Uploaded: `{uploaded_file.name}` ({uploaded_file.size / 1024:.2f} KB)")
-        try:
-            json_data = json.load(uploaded_file)
-            st.markdown("### 🔍 Preview of Uploaded Data")
-            st.json(json_data, expanded=False)
-
-            if st.button("🧠 Validate Summary"):
-                with st.spinner("Validating clinical summary..."):
-                    response = requests.post(
-                        f"{backend_url}/api/validate-summary",
-                        json=json_data
-                    )
-
-                if response.status_code == 200:
-                    result = response.json()
-                    message = result.get("message", "")
-                    combined_report = {
-                        "submitted_summary": json_data,
-                        "validation_result": result,
-                        "validated_at": datetime.now().isoformat()
-                    }
-
-                    report_str = json.dumps(combined_report, indent=2)
-                    st.download_button(
-                        label="📄 Download Validation Report",
-                        data=report_str,
-                        file_name=f"validation_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                        mime="application/json"
-                    )
-                    st.markdown("---")
-                    st.subheader("🧾 Validation Result")
-
-                    # CASE 1 — Guardrail fail
-                    if not result.get("insurance_summary", False):
-                        st.info(f"📝 Guardrail Failed: {message}")
-                    
-                    # CASE 2 — Validation fail
-                    elif result.get("insurance_summary", False) and not result.get("valid_summary", False):
-                        st.warning(f"⚠️ Validation Warning: {message}")
-                        missing_fields = result.get("missing_fields", {})
-                        if missing_fields:
-                            st.markdown("#### ❗ Missing Sections:")
-                            for section, fields in missing_fields.items():
-                                st.markdown(f"- **{section.title()}**: {', '.join(fields)}")
-
-                    # CASE 3 — Policy check failed
-                    elif result.get("valid_summary", False) and not result.get("approved", False):
-                        st.error(f"❌ Policy Rejected: {message}")
-
-                    # CASE 4 — All checks passed
-                    elif result.get("approved", False):
-                        st.success(f"✅ Approved: {message}")
-
-                    else:
-                        st.warning("⚠️ Unexpected response. Please check backend output.")
-                else:
-                    st.error(f"❌ Server error: Status code {response.status_code}")
-                    try:
-                        st.json(response.json())
-                    except:
-                        st.text(response.text)
-
-        except Exception as e:
-            st.error(f"❌ Failed to parse JSON file: {e}")
-        
-if __name__ == "__main__":
-    main()
+    if len(uploaded_files) == 1:
+        validate_one(uploaded_files[0], backend_url)
+    elif uploaded_files:
+        validate_many(uploaded_files, backend_url)
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import typing
+from typing import Any, Tuple
+
+
+def unwrap_annotation(annotation: Any) -> Tuple[Any, bool]:
+    """
+    Strip Optional[...] and List[...] from a field annotation; returns (inner type, is_list).
+    """
+    is_list = False
+    while True:
+        origin = typing.get_origin(annotation)
+        if origin is typing.Union:
+            args = [a for a in typing.get_args(annotation) if a is not type(None)]
+            annotation = args[0] if args else None
+        elif origin in (list, typing.List):
+            is_list = True
+            annotation = typing.get_args(annotation)[0]
+        else:
+            return annotation, is_list
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from app.utils.metrics import metrics
+from app.utils.settings import get_settings
+
+
+def canonical_json(value: Any) -> str:
+    """
+    Deterministic, minified JSON used for hashing: sorted keys, no whitespace.
+    """
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU cache with a per-entry TTL. Not shared between worker processes.
+    """
+    # Calls return at once, so async code may call them on the event loop.
+    blocking = False
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    On-disk cache in a SQLite file, shared by every worker process on the host and kept across
+    restarts. Entries expire after the TTL; beyond max_entries the least recently used are evicted.
+    To keep reads from taking the database write lock, a hit refreshes an entry's access time
+    only when it is older than touch_interval seconds, and eviction runs once every
+    evict_every inserts (so the table may briefly exceed max_entries by that many rows).
+    """
+    # Calls wait on the database (and its lock), so async code runs them in a thread.
+    blocking = True
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS result_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float, touch_interval: float = 60.0, evict_every: Optional[int] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.touch_interval = touch_interval
+        self.evict_every = evict_every or max(1, max_entries // 100)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._inserts = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(self._SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS result_cache_accessed ON result_cache (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, accessed_at FROM result_cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[1] >= self.touch_interval:
+            conn.execute("UPDATE result_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO result_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + self.ttl_seconds, now)
+        )
+        with self._lock:
+            self._inserts += 1
+            due = self._inserts >= self.evict_every
+            if due:
+                self._inserts = 0
+        if due:
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM result_cache WHERE expires_at <= ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM result_cache WHERE key IN "
+                "(SELECT key FROM result_cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM result_cache")
+
+    def __len__(self) -> int:
+        (count,) = self._connect().execute("SELECT COUNT(*) FROM result_cache").fetchone()
+        return count
+
+
+class ResultCache:
+    """
+    Content-addressed cache of LLM stage outputs (GuardrailOutput, ValidatorOutput,
+    PolicyEvalOutput as dicts). Keys hash the canonical input together with everything that
+    shapes the answer: prompt template, model, temperature and policy text.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def make_key(stage: str, *parts: Any) -> str:
+        digest = hashlib.sha256(stage.encode("utf-8"))
+        for part in parts:
+            digest.update(b"\x00")
+            digest.update((part if isinstance(part, str) else canonical_json(part)).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, stage: str, key: str) -> Optional[Dict[str, Any]]:
+        value = self.backend.get(key)
+        metrics.inc("cache_requests_total", stage=stage, result="hit" if value is not None else "miss")
+        return value
+
+    def set(self, stage: str, key: str, value: Dict[str, Any]) -> None:
+        self.backend.set(key, value)
+
+    async def aget(self, stage: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        get for async code: a blocking backend is queried in a worker thread, off the event loop.
+        """
+        if not self.backend.blocking:
+            return self.get(stage, key)
+        return await asyncio.to_thread(self.get, stage, key)
+
+    async def aset(self, stage: str, key: str, value: Dict[str, Any]) -> None:
+        if not self.backend.blocking:
+            return self.set(stage, key, value)
+        await asyncio.to_thread(self.set, stage, key, value)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+@lru_cache(maxsize=1)
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    The process-wide result cache configured by MEDICHECK_CACHE_*, or None when disabled.
+    """
+    settings = get_settings()
+    if settings.cache_backend == "off":
+        return None
+    if settings.cache_backend == "sqlite":
+        backend = SQLiteCacheBackend(settings.cache_path, settings.cache_max_entries, settings.cache_ttl_seconds)
+    elif settings.cache_backend == "memory":
+        backend = MemoryCacheBackend(settings.cache_max_entries, settings.cache_ttl_seconds)
+    else:
+        raise ValueError(f"Unknown MEDICHECK_CACHE_BACKEND '{settings.cache_backend}'")
+    return ResultCache(backend)
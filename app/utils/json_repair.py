@@ -0,0 +1,84 @@
+import json
+import re
+from typing import Any, Optional
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+
+
+def _first_object(text: str) -> Optional[str]:
+    """
+    The first balanced {...} block in text, skipping braces inside JSON strings.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """
+    Drop commas directly before a closing } or ], outside JSON strings.
+    """
+    out = []
+    in_string = False
+    escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ",":
+            j = i + 1
+            while j < len(text) and text[j].isspace():
+                j += 1
+            if j < len(text) and text[j] in "}]":
+                continue
+        out.append(char)
+    return "".join(out)
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """
+    Cheap local recovery of a JSON object from an LLM completion: strips markdown code fences,
+    extracts the first {...} object from surrounding prose and removes trailing commas.
+    Returns the decoded value, or None when nothing usable is found.
+    """
+    candidates = [text.strip()]
+    fenced = _FENCE.search(text)
+    if fenced:
+        candidates.append(fenced.group(1).strip())
+    block = _first_object(candidates[-1])
+    if block is not None:
+        candidates.append(block)
+    for candidate in candidates:
+        for attempt in (candidate, _strip_trailing_commas(candidate)):
+            try:
+                return json.loads(attempt, strict=False)
+            except ValueError:
+                continue
+    return None
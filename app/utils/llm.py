@@ -1,40 +1,878 @@
+import asyncio
+import heapq
+import json
+import itertools
 import os
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Type, TypeVar
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel, PrivateAttr
+from app.utils.metrics import metrics, record_timing, current_stage
+from app.utils.prompt_payload import estimate_tokens
+from app.utils.settings import Settings, get_settings
 
-load_dotenv()
+
+T = TypeVar("T")
 
 def get_groq_api_key():
     """
-    Retrieve the GROQ API key from environment variables.
+    Retrieve the GROQ API key from environment variables (or .env, loaded with the settings).
     Raises an error if not set.
     """
+    get_settings()
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         raise ValueError("GROQ_API_KEY environment variable is not set")
     return api_key
 
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    True for provider errors worth retrying: rate limits, timeouts, connection and 5xx errors.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code in TRANSIENT_STATUS_CODES:
+        return True
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """
+    Seconds the provider asked us to wait (Retry-After header), if any.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+# Lower value = served first. The API marks interactive requests, batch/job paths mark batch.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+_llm_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+@contextmanager
+def llm_priority(priority: int):
+    """
+    Run the enclosed LLM calls (including those of tasks created inside) at the given priority.
+    """
+    token = _llm_priority.set(priority)
+    try:
+        yield
+    finally:
+        _llm_priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` tokens, refilled continuously at `capacity`
+    per `period` seconds. A capacity of 0 means unlimited. Not thread-safe on its own.
+    """
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period if capacity else 0.0
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Seconds until `amount` tokens are available (0 if they are now).
+        Requests larger than the whole bucket only wait for a full bucket.
+        """
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        if self.capacity:
+            self.tokens -= min(amount, self.capacity)
+
+
+class SharedTokenBuckets:
+    """
+    The RPM and TPM buckets kept in a SQLite file instead of process memory, so every worker
+    process on the host draws from one provider budget. Each take is a short IMMEDIATE
+    transaction; bucket times are wall-clock since monotonic clocks are per process.
+    """
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS token_buckets (
+            name TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path: str, rpm: int, tpm: int):
+        self.path = path
+        self.capacities = {"requests": rpm, "tokens": tpm}
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().execute(self._SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def try_take(self, requests: float, tokens: float) -> float:
+        """
+        Take one request slot and `tokens` if both buckets have them; returns 0 on success,
+        else the seconds until they will (nothing is taken then).
+        """
+        amounts = {"requests": requests, "tokens": tokens}
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            rows = conn.execute("SELECT name, tokens, updated FROM token_buckets").fetchall()
+            stored = {name: (value, updated) for name, value, updated in rows}
+            buckets = {}
+            for name, capacity in self.capacities.items():
+                bucket = buckets[name] = TokenBucket(capacity)
+                bucket.tokens, bucket.updated = stored.get(name, (capacity, now))
+            wait = max(bucket.wait_time(amounts[name], now) for name, bucket in buckets.items())
+            if wait == 0:
+                for name, bucket in buckets.items():
+                    bucket.consume(amounts[name])
+                    conn.execute(
+                        "INSERT OR REPLACE INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                        (name, bucket.tokens, bucket.updated)
+                    )
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class LLMScheduler:
+    """
+    Process-wide gate in front of the provider. Every call waits for a request slot (RPM bucket)
+    and its estimated tokens (TPM bucket); waiting calls are served strictly by priority, then
+    arrival order. Transient failures (429, timeouts, 5xx) are retried with jittered exponential
+    backoff, honouring Retry-After, so bursts queue up at the provider limit instead of failing.
+    With `shared` buckets the budget is shared with the other worker processes; priorities
+    still order the calls within this process, and async callers take from the shared buckets
+    in a worker thread.
+    """
+    def __init__(
+        self, rpm: int, tpm: int, max_retries: int, backoff_base: float = 1.0, backoff_max: float = 30.0,
+        shared: Optional[SharedTokenBuckets] = None,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.shared = shared
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[int, int]] = []
+        self._wakers: Dict[Tuple[int, int], Callable[[], None]] = {}
+        self._sequence = itertools.count()
+
+    def _enqueue(self, priority: int, waker: Callable[[], None]) -> Tuple[int, int]:
+        ticket = (priority, next(self._sequence))
+        with self._lock:
+            heapq.heappush(self._waiters, ticket)
+            self._wakers[ticket] = waker
+        return ticket
+
+    def _dequeue(self, ticket: Tuple[int, int]) -> None:
+        with self._lock:
+            if ticket in self._waiters:
+                was_head = self._waiters[0] == ticket
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                del self._wakers[ticket]
+                if was_head:
+                    self._wake_head()
+
+    def _wake_head(self) -> None:
+        """
+        Tell the waiter now at the head of the queue to try again. Called with the lock held.
+        """
+        if self._waiters:
+            self._wakers[self._waiters[0]]()
+
+    def _grant(self, ticket: Tuple[int, int]) -> None:
+        """
+        Remove a ticket that got its budget from the queue and wake the next one. Called with
+        the lock held; a ticket dequeued meanwhile (its caller was cancelled) is left alone.
+        """
+        if ticket not in self._wakers:
+            return
+        if self._waiters[0] == ticket:
+            heapq.heappop(self._waiters)
+        else:
+            self._waiters.remove(ticket)
+            heapq.heapify(self._waiters)
+        del self._wakers[ticket]
+        self._wake_head()
+
+    def _try_acquire(self, ticket: Tuple[int, int], tokens: int) -> Optional[float]:
+        """
+        Take the budget if this ticket is at the head of the queue and the budget is there.
+        Returns 0 on success, the seconds until the budget refills if this ticket is next, or
+        None if it is queued behind others; it is woken when it reaches the head.
+        """
+        if self.shared is not None:
+            return self._try_acquire_shared(ticket, tokens)
+        with self._lock:
+            if self._waiters[0] != ticket:
+                return None
+            now = time.monotonic()
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                return wait
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            self._grant(ticket)
+            return 0.0
+
+    def _try_acquire_shared(self, ticket: Tuple[int, int], tokens: int) -> Optional[float]:
+        """
+        _try_acquire against the SharedTokenBuckets. Their SQLite transaction runs without the
+        lock, so it never holds up the other waiters; async callers run this in a worker thread.
+        """
+        with self._lock:
+            if not self._waiters or self._waiters[0] != ticket:
+                return None
+        wait = self.shared.try_take(1, tokens)
+        if wait == 0:
+            with self._lock:
+                self._grant(ticket)
+        return wait
+
+    async def acquire(self, tokens: int, priority: Optional[int] = None) -> float:
+        """
+        Wait for budget without blocking the event loop; returns the time spent queued.
+        The head of the queue sleeps until the budget refills, the others until they are woken.
+        """
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        ticket = self._enqueue(
+            _llm_priority.get() if priority is None else priority, lambda: loop.call_soon_threadsafe(wake.set)
+        )
+        start = time.monotonic()
+        try:
+            while True:
+                wake.clear()
+                if self.shared is None:
+                    wait = self._try_acquire(ticket, tokens)
+                else:
+                    # The shared buckets live in SQLite; keep their transaction off the event loop.
+                    wait = await asyncio.to_thread(self._try_acquire_shared, ticket, tokens)
+                if wait == 0:
+                    break
+                try:
+                    await asyncio.wait_for(wake.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+        return self._record_wait(start)
+
+    def acquire_sync(self, tokens: int, priority: Optional[int] = None) -> float:
+        """
+        Blocking variant of acquire for sync callers.
+        """
+        wake = threading.Event()
+        ticket = self._enqueue(_llm_priority.get() if priority is None else priority, wake.set)
+        start = time.monotonic()
+        try:
+            while True:
+                wake.clear()
+                wait = self._try_acquire(ticket, tokens)
+                if wait == 0:
+                    break
+                wake.wait(wait)
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+        return self._record_wait(start)
+
+    def _record_wait(self, start: float) -> float:
+        waited = time.monotonic() - start
+        metrics.inc("llm_scheduler_wait_seconds_total", waited)
+        metrics.observe("llm_queue_wait_seconds", waited, stage=current_stage())
+        record_timing("llm_stages", current_stage(), queue_ms=waited * 1000)
+        return waited
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        metrics.inc("llm_retries_total", status=str(getattr(error, "status_code", type(error).__name__)))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return retry_after
+        return min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+    async def run(self, call: Callable[[], Awaitable[T]], tokens: int) -> T:
+        """
+        Await call() under the budget, retrying transient failures.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(tokens)
+            try:
+                return await call()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+
+    async def stream(self, call: Callable[[], AsyncIterator[T]], tokens: int) -> AsyncIterator[T]:
+        """
+        Iterate call() under the budget. Transient failures are retried only until the first
+        item arrives; after that the partial stream cannot be replayed and the error propagates.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(tokens)
+            started = False
+            try:
+                async for item in call():
+                    started = True
+                    yield item
+                return
+            except Exception as e:
+                if started or attempt >= self.max_retries or not is_transient_error(e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+
+    def run_sync(self, call: Callable[[], T], tokens: int) -> T:
+        """
+        Blocking variant of run.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire_sync(tokens)
+            try:
+                return call()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    raise
+                time.sleep(self._backoff(attempt, e))
+
+
+@lru_cache(maxsize=1)
+def get_scheduler() -> LLMScheduler:
+    """
+    The shared scheduler configured by MEDICHECK_LLM_RPM / _TPM / _MAX_RETRIES; with
+    MEDICHECK_LLM_RATE_LIMIT_BACKEND=sqlite the RPM/TPM budget is shared between processes.
+    """
+    settings = get_settings()
+    shared = None
+    if settings.llm_rate_limit_backend == "sqlite" and (settings.llm_rpm or settings.llm_tpm):
+        shared = SharedTokenBuckets(settings.llm_rate_limit_path, settings.llm_rpm, settings.llm_tpm)
+    elif settings.llm_rate_limit_backend not in ("memory", "sqlite"):
+        raise ValueError(f"Unknown MEDICHECK_LLM_RATE_LIMIT_BACKEND '{settings.llm_rate_limit_backend}'")
+    return LLMScheduler(rpm=settings.llm_rpm, tpm=settings.llm_tpm, max_retries=settings.llm_max_retries, shared=shared)
+
+def _rate_limits(settings: Settings) -> Tuple[Any, ...]:
+    return (settings.llm_rpm, settings.llm_tpm, settings.llm_rate_limit_backend, settings.llm_rate_limit_path)
+
+def refresh_scheduler(previous: Settings) -> None:
+    """
+    Apply re-read settings to the shared scheduler. Unless the RPM/TPM limits or where they are
+    kept changed since the `previous` settings, the scheduler is kept: its buckets stay drained
+    and queued callers keep their place, so a reload does not grant a fresh burst.
+    """
+    settings = get_settings()
+    if _rate_limits(settings) != _rate_limits(previous):
+        get_scheduler.cache_clear()
+    elif get_scheduler.cache_info().currsize:
+        get_scheduler().max_retries = settings.llm_max_retries
+
+def _prompt_text(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return "\n".join(_prompt_text(getattr(item, "content", item)) for item in value)
+    if hasattr(value, "to_string"):
+        return value.to_string()
+    return str(value)
+
+def _call_tokens(prompt: Any) -> int:
+    """
+    Tokens a call is charged against the TPM budget: the prompt estimate plus the completion allowance.
+    """
+    return estimate_tokens(_prompt_text(prompt)) + get_settings().llm_completion_tokens
+
+
+# Hedging waits for a backend's p95 latency once this many calls have been timed; before that
+# (and with no MEDICHECK_LLM_HEDGE_DELAY_MS) it waits HEDGE_DEFAULT_DELAY seconds.
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_DELAY = 2.0
+
+
+class BackendHealth:
+    """
+    Circuit breaker and latency window of one pool backend. After `threshold` consecutive
+    failures the backend is skipped for `cooldown` seconds; the next call after that is a
+    trial, and a success closes the circuit again.
+    """
+    def __init__(self, name: str, threshold: int, cooldown: float, window: int = 200):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+    def healthy(self, now: Optional[float] = None) -> bool:
+        return self.open_until <= (time.monotonic() if now is None else now)
+
+    def record_success(self, elapsed: Optional[float] = None) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+        if elapsed is not None:
+            self.latencies.append(elapsed)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            if self.healthy():
+                metrics.inc("llm_backend_circuit_open_total", backend=self.name)
+            self.open_until = time.monotonic() + self.cooldown
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[max(0, int(len(ordered) * 0.95 + 0.5) - 1)]
+
+    def describe(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            "backend": self.name,
+            "healthy": self.healthy(),
+            "consecutive_failures": self.failures,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class LLMPool(BaseChatModel):
+    """
+    A chat model spreading calls over several backends (providers or models) in order of
+    preference. A failing backend is failed over to the next one immediately, and skipped
+    while its circuit is open (see BackendHealth). With `hedge`, an async call still running
+    after the backend's p95 latency (or `hedge_delay` seconds) gets a second attempt on the next
+    backend (the same one if it is alone); whichever answers first wins and the other is
+    cancelled, which bounds tail latency. Extra attempts take their own scheduler budget.
+    Structured output bindings (response_format, tools) are passed to every backend, so all of
+    them must speak the OpenAI-style API (Groq and OpenAICompatibleChat do).
+    """
+    backends: List[BaseChatModel]
+    names: List[str]
+    hedge: bool = False
+    hedge_delay: float = 0.0
+    failure_threshold: int = 3
+    cooldown: float = 30.0
+
+    _health: List[BackendHealth] = PrivateAttr()
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._health = [BackendHealth(name, self.failure_threshold, self.cooldown) for name in self.names]
+
+    @property
+    def _llm_type(self) -> str:
+        return "medicheck-pool"
+
+    def bind_tools(self, tools: List[Any], tool_choice: Optional[str] = None, **kwargs: Any) -> Runnable:
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+        if isinstance(tool_choice, str):
+            tool_choice = {"type": "function", "function": {"name": tool_choice}}
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def health(self) -> List[Dict[str, Any]]:
+        return [health.describe() for health in self._health]
+
+    def _order(self) -> List[int]:
+        """
+        Backend indexes to try: healthy ones by preference, then those cooling down by the time
+        their circuit closes, as a last resort.
+        """
+        now = time.monotonic()
+        ready = [i for i, health in enumerate(self._health) if health.healthy(now)]
+        cooling = sorted((i for i, health in enumerate(self._health) if not health.healthy(now)), key=lambda i: self._health[i].open_until)
+        return ready + cooling
+
+    def _hedge_after(self, index: int) -> float:
+        if self.hedge_delay > 0:
+            return self.hedge_delay
+        return self._health[index].p95() or HEDGE_DEFAULT_DELAY
+
+    def _record(self, index: int, error: Optional[BaseException], elapsed: float) -> None:
+        health = self._health[index]
+        if error is None:
+            health.record_success(elapsed)
+            outcome = "ok"
+        elif _is_generation_error(error):
+            # The backend answered; the answer was rejected by its structured output check.
+            health.record_success()
+            outcome = "ok"
+        else:
+            health.record_failure()
+            outcome = "error"
+        metrics.inc("llm_backend_requests_total", backend=health.name, outcome=outcome)
+
+    def _failover(self, index: int) -> None:
+        """
+        Count a call moving on from the backend at index after it failed.
+        """
+        metrics.inc("llm_failovers_total", backend=self._health[index].name)
+
+    def _call(self, index: int, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> BaseMessage:
+        start = time.perf_counter()
+        try:
+            message = self.backends[index].invoke(messages, stop=stop, **kwargs)
+        except Exception as e:
+            self._record(index, e, time.perf_counter() - start)
+            raise
+        self._record(index, None, time.perf_counter() - start)
+        return message
+
+    async def _acall(self, index: int, messages: List[BaseMessage], stop: Optional[List[str]], extra: bool, **kwargs: Any) -> BaseMessage:
+        if extra:
+            await get_scheduler().acquire(_call_tokens(messages))
+        start = time.perf_counter()
+        try:
+            message = await self.backends[index].ainvoke(messages, stop=stop, **kwargs)
+        except asyncio.CancelledError:
+            metrics.inc("llm_backend_requests_total", backend=self._health[index].name, outcome="cancelled")
+            raise
+        except Exception as e:
+            self._record(index, e, time.perf_counter() - start)
+            raise
+        self._record(index, None, time.perf_counter() - start)
+        return message
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        """
+        Sync calls fail over but are not hedged.
+        """
+        error: Optional[Exception] = None
+        failed: Optional[int] = None
+        for index in self._order():
+            if failed is not None:
+                self._failover(failed)
+                get_scheduler().acquire_sync(_call_tokens(messages))
+            try:
+                message = self._call(index, messages, stop, **kwargs)
+            except Exception as e:
+                if _is_generation_error(e):
+                    raise
+                error, failed = e, index
+                continue
+            return ChatResult(generations=[ChatGeneration(message=message)])
+        raise error
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        order = self._order()
+        remaining = list(order)
+        tasks: Dict[asyncio.Task, Tuple[int, bool]] = {}
+        error: Optional[Exception] = None
+        failed: Optional[int] = None
+
+        def launch(index: int, extra: bool, hedged: bool) -> None:
+            task = asyncio.ensure_future(self._acall(index, messages, stop, extra, **kwargs))
+            tasks[task] = (index, hedged)
+
+        primary = remaining.pop(0)
+        launch(primary, extra=False, hedged=False)
+        may_hedge = self.hedge
+        try:
+            while tasks:
+                timeout = self._hedge_after(primary) if may_hedge else None
+                done, _ = await asyncio.wait(set(tasks), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    may_hedge = False
+                    healthy = bool(remaining) and self._health[remaining[0]].healthy()
+                    launch(remaining.pop(0) if healthy else primary, extra=True, hedged=True)
+                    metrics.inc("llm_hedged_requests_total", outcome="fired")
+                    continue
+                for task in done:
+                    index, hedged = tasks.pop(task)
+                    try:
+                        message = task.result()
+                    except Exception as e:
+                        if _is_generation_error(e):
+                            raise
+                        error, failed = e, index
+                        continue
+                    if hedged:
+                        metrics.inc("llm_hedged_requests_total", outcome="won")
+                    return ChatResult(generations=[ChatGeneration(message=message)])
+                if not tasks and remaining:
+                    self._failover(failed)
+                    primary = remaining.pop(0)
+                    launch(primary, extra=True, hedged=False)
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        """
+        Streams fail over until the first chunk arrives; they are not hedged.
+        """
+        error: Optional[Exception] = None
+        failed: Optional[int] = None
+        for index in self._order():
+            if failed is not None:
+                self._failover(failed)
+                await get_scheduler().acquire(_call_tokens(messages))
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in self.backends[index].astream(messages, stop=stop, **kwargs):
+                    started = True
+                    yield ChatGenerationChunk(message=chunk)
+            except Exception as e:
+                self._record(index, e, time.perf_counter() - start)
+                if started or _is_generation_error(e):
+                    raise
+                error, failed = e, index
+                continue
+            self._record(index, None, time.perf_counter() - start)
+            return
+        raise error
+
+
+def _groq_chat(api_key: str, model: str, temperature: float) -> BaseChatModel:
+    # langchain_groq (and the groq SDK) is the slowest import of the app; only load it once a
+    # Groq client is actually built, so tools that never call Groq start without it.
+    from langchain_groq import ChatGroq
+    # Retries are done by the scheduler so they count against the rate budget.
+    return ChatGroq(groq_api_key=api_key, model_name=model, temperature=temperature, max_retries=0)
+
+
+def _chat_model(spec: str, temperature: float) -> BaseChatModel:
+    """
+    A chat model for one MEDICHECK_LLM_FALLBACKS entry: "groq:MODEL", or "openai:MODEL@BASE_URL"
+    for an OpenAI-compatible server (API key, if any, from MEDICHECK_OPENAI_API_KEY).
+    """
+    provider, _, rest = spec.partition(":")
+    model, _, base_url = rest.partition("@")
+    if provider == "groq" and model:
+        return _groq_chat(get_groq_api_key(), model, temperature)
+    if provider == "openai" and model and base_url:
+        from app.utils.openai_compat import OpenAICompatibleChat
+        return OpenAICompatibleChat(base_url=base_url, model=model, api_key=os.getenv("MEDICHECK_OPENAI_API_KEY"), temperature=temperature)
+    raise ValueError(f"Invalid LLM backend '{spec}' in MEDICHECK_LLM_FALLBACKS; use groq:MODEL or openai:MODEL@BASE_URL.")
+
+
+def build_pool(primary: BaseChatModel, name: str, temperature: float) -> BaseChatModel:
+    """
+    The chat model for a client: `primary` alone, or an LLMPool of it followed by the
+    MEDICHECK_LLM_FALLBACKS backends when fallbacks or hedging (MEDICHECK_LLM_HEDGE) are configured.
+    """
+    settings = get_settings()
+    specs = [spec.strip() for spec in settings.llm_fallbacks.split(",") if spec.strip()]
+    if not specs and not settings.llm_hedge:
+        return primary
+    return LLMPool(
+        backends=[primary] + [_chat_model(spec, temperature) for spec in specs],
+        names=[name] + [spec.split("@")[0] for spec in specs],
+        hedge=settings.llm_hedge,
+        hedge_delay=settings.llm_hedge_delay_ms / 1000,
+        failure_threshold=settings.llm_failure_threshold,
+        cooldown=settings.llm_cooldown_seconds,
+    )
+
+
 class GroqLLM:
     """
     Utility class for interacting with the Groq LLM via LangChain.
+    All calls go through the shared LLMScheduler, which owns rate limiting and retries.
     """
-    def __init__(self, model: str = "llama3-70b-8192", temperature: float = 0.5):
+    def __init__(self, model: str = "llama3-70b-8192", temperature: float = 0.5, chat_model: Optional[BaseChatModel] = None):
         """
-        Initialize the LLM client with the specified model and temperature.
+        Initialize the LLM client with the specified model and temperature. Passing chat_model
+        replaces the Groq client (e.g. with a local stand-in for benchmarks); no API key is needed then.
         """
         self.model = model
         self.temperature = temperature
-        self.api_key = get_groq_api_key()
-        self.llm = ChatGroq(
-            groq_api_key=self.api_key,
-            model_name=self.model,
-            temperature=self.temperature
+        if chat_model is not None:
+            self.api_key = None
+            self.llm = chat_model
+        else:
+            self.api_key = get_groq_api_key()
+            self.llm = build_pool(_groq_chat(self.api_key, self.model, self.temperature), f"groq:{self.model}", self.temperature)
+        # Scheduled runnable for LangChain components that call the model themselves
+        # (OutputFixingParser), so their calls share the same budget and retries. Every call
+        # through it is a parser repair and is counted as such.
+        self.runnable = RunnableLambda(self._repair_invoke, afunc=self._arepair_invoke, name=f"scheduled-{model}")
+        self._tool_models: Dict[Type[BaseModel], Runnable] = {}
+
+    def structured(self, schema: Optional[Type[BaseModel]]) -> Runnable:
+        """
+        The chat model to call for an answer shaped like schema, per MEDICHECK_STRUCTURED_OUTPUT:
+        "json_mode" constrains the completion to a JSON object, "tool_calling" forces a call of a
+        tool whose arguments are the schema, and "off" (or no schema) uses the plain model.
+        """
+        mode = get_settings().structured_output
+        if schema is None or mode == "off":
+            return self.llm
+        if mode == "tool_calling":
+            model = self._tool_models.get(schema)
+            if model is None:
+                model = self._tool_models[schema] = self.llm.bind_tools([schema], tool_choice=schema.__name__)
+            return model
+        if mode == "json_mode":
+            return self.llm.bind(response_format={"type": "json_object"})
+        raise ValueError(f"Unknown MEDICHECK_STRUCTURED_OUTPUT '{mode}'")
+
+    def _tokens(self, prompt: Any) -> int:
+        return _call_tokens(prompt)
+
+    def health(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Per-backend health when the client uses an LLMPool, else None.
+        """
+        return self.llm.health() if isinstance(self.llm, LLMPool) else None
+
+    def _record_call(self, start: float, usage: Optional[dict]) -> None:
+        """
+        Per-stage call latency and the prompt/completion tokens reported by the API.
+        """
+        stage = current_stage()
+        elapsed = time.perf_counter() - start
+        usage = usage or {}
+        prompt_tokens = usage.get("input_tokens", 0)
+        completion_tokens = usage.get("output_tokens", 0)
+        metrics.inc("llm_calls_total", stage=stage)
+        metrics.observe("llm_call_seconds", elapsed, stage=stage)
+        metrics.inc("llm_tokens_total", prompt_tokens, stage=stage, kind="prompt")
+        metrics.inc("llm_tokens_total", completion_tokens, stage=stage, kind="completion")
+        record_timing(
+            "llm_stages", stage,
+            llm_calls=1, llm_ms=elapsed * 1000, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
         )
 
-    def call(self, prompt: str) -> str:
+    def _invoke_once(self, prompt: Any, model: Optional[Runnable] = None) -> Any:
+        start = time.perf_counter()
+        response = (model or self.llm).invoke(prompt)
+        self._record_call(start, response.usage_metadata)
+        return response
+
+    async def _ainvoke_once(self, prompt: Any, model: Optional[Runnable] = None) -> Any:
+        start = time.perf_counter()
+        response = await (model or self.llm).ainvoke(prompt)
+        self._record_call(start, response.usage_metadata)
+        return response
+
+    def _invoke(self, prompt: Any, model: Optional[Runnable] = None) -> Any:
+        return get_scheduler().run_sync(lambda: self._invoke_once(prompt, model), self._tokens(prompt))
+
+    async def _ainvoke(self, prompt: Any, model: Optional[Runnable] = None) -> Any:
+        return await get_scheduler().run(lambda: self._ainvoke_once(prompt, model), self._tokens(prompt))
+
+    def _record_repair(self) -> None:
+        metrics.inc("llm_parser_retries_total", stage=current_stage())
+        record_timing("llm_stages", current_stage(), parser_retries=1)
+
+    def _repair_invoke(self, prompt: Any) -> Any:
+        self._record_repair()
+        return self._invoke(prompt)
+
+    async def _arepair_invoke(self, prompt: Any) -> Any:
+        self._record_repair()
+        return await self._ainvoke(prompt)
+
+    def call(self, prompt: str, schema: Optional[Type[BaseModel]] = None) -> str:
+        """
+        Get the LLM's response for the given prompt as a single string. With schema, the
+        provider's structured output mode is used and the response is the JSON answer.
+        """
+        try:
+            response = self._invoke([HumanMessage(content=prompt)], self.structured(schema))
+        except Exception as e:
+            return _failed_generation(e)
+        return _response_text(response)
+
+    async def acall(self, prompt: str, schema: Optional[Type[BaseModel]] = None) -> str:
         """
-        Get the LLM's response for the given prompt as a single string.
+        Async variant of call; awaits the LLM without blocking the event loop.
         """
-        response = self.llm.invoke([HumanMessage(content=prompt)])
-        return response.content
+        try:
+            response = await self._ainvoke([HumanMessage(content=prompt)], self.structured(schema))
+        except Exception as e:
+            return _failed_generation(e)
+        return _response_text(response)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream the LLM's raw response for the given prompt as text chunks. Structured output is
+        never bound here: tool-call arguments do not stream as text, and with JSON mode
+        (response_format) ChatGroq does not stream at all but returns the whole answer as one
+        chunk. Callers parse, and if needed repair, the streamed JSON locally.
+        """
+        messages = [HumanMessage(content=prompt)]
+        start = time.perf_counter()
+        usage = {}
+        async for chunk in get_scheduler().stream(lambda: self.llm.astream(messages), self._tokens(messages)):
+            for key, value in (chunk.usage_metadata or {}).items():
+                if isinstance(value, int):
+                    usage[key] = usage.get(key, 0) + value
+            yield chunk.content
+        self._record_call(start, usage)
+
+
+def _response_text(response: Any) -> str:
+    """
+    The answer of a chat completion: the forced tool call's arguments as JSON, else the content.
+    """
+    if getattr(response, "tool_calls", None):
+        return json.dumps(response.tool_calls[0]["args"])
+    return response.content
+
+
+def _generation_error_body(error: BaseException) -> Optional[dict]:
+    body = getattr(error, "body", None)
+    if isinstance(body, dict):
+        body = body.get("error", body)
+    if not isinstance(body, dict) or body.get("code") not in ("json_validate_failed", "tool_use_failed"):
+        return None
+    return body
+
+def _is_generation_error(error: BaseException) -> bool:
+    """
+    True when the provider answered but rejected the completion against the structured output
+    format; not a sign of an unhealthy backend.
+    """
+    return _generation_error_body(error) is not None
+
+def _failed_generation(error: Exception) -> str:
+    """
+    Groq rejects a JSON-mode completion that is not valid JSON with a 400 "json_validate_failed"
+    error carrying the completion; return it for local repair instead of failing the stage.
+    Any other error is re-raised.
+    """
+    body = _generation_error_body(error)
+    if body is None:
+        raise error
+    metrics.inc("llm_structured_output_rejected_total", stage=current_stage())
+    return body.get("failed_generation") or ""
@@ -0,0 +1,194 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Histogram bucket upper bounds in seconds, from cache hits to slow LLM completions.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Metrics:
+    """
+    Minimal thread-safe, process-local counter and histogram registry. Series are identified by
+    a name plus optional string labels, e.g. metrics.inc("guardrail_decisions_total", path="llm").
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = defaultdict(float)
+        # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self._histograms: Dict[Tuple[str, LabelKey], List[float]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> Tuple[str, LabelKey]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        """
+        Increment the counter identified by name and labels.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] += amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Record one observation (e.g. a duration in seconds) in the histogram name{labels}.
+        """
+        key = self._key(name, labels)
+        index = bisect.bisect_left(LATENCY_BUCKETS, value)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0.0] * (len(LATENCY_BUCKETS) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """
+        Observe the wall time of the with-block in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def get(self, name: str, **labels: str) -> float:
+        """
+        Current value of a counter (0 if it was never incremented).
+        """
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0.0)
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        All counters as {"name{label=value,...}": value}; histograms contribute their _count and _sum.
+        """
+        with self._lock:
+            items = list(self._counters.items())
+            for (name, labels), series in self._histograms.items():
+                items.append(((name + "_count", labels), sum(series[:-1])))
+                items.append(((name + "_sum", labels), series[-1]))
+        result = {}
+        for (name, labels), value in sorted(items):
+            if labels:
+                name = name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+            result[name] = value
+        return result
+
+    def render_prometheus(self) -> str:
+        """
+        All series in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(series)) for key, series in self._histograms.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), series in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0.0
+            for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {series[-1]}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def _labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+metrics = Metrics()
+
+
+class RequestTimings:
+    """
+    Per-request breakdown collected alongside the process-wide metrics while a
+    collect_timings() block is active: wall time per graph node, and per LLM stage the wall
+    time, scheduler queue wait, LLM calls, parser retries, tokens and cache hits.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._sections: Dict[str, Dict[str, Dict[str, float]]] = {"nodes": {}, "llm_stages": {}}
+
+    def add(self, section: str, name: str, **values: float) -> None:
+        with self._lock:
+            entry = self._sections[section].setdefault(name, {})
+            for key, value in values.items():
+                entry[key] = entry.get(key, 0) + value
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            sections = {
+                section: {name: {k: round(v, 2) if k.endswith("_ms") else v for k, v in entry.items()} for name, entry in entries.items()}
+                for section, entries in self._sections.items()
+            }
+        return {"total_ms": round((time.perf_counter() - self._start) * 1000, 2), **sections}
+
+
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+_current_stage: ContextVar[Optional[str]] = ContextVar("current_stage", default=None)
+
+
+@contextmanager
+def collect_timings() -> Iterator[RequestTimings]:
+    """
+    Collect a RequestTimings breakdown for everything run inside the with-block, including
+    tasks and threads started from it with a copy of the context.
+    """
+    timings = RequestTimings()
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def record_timing(section: str, name: str, **values: float) -> None:
+    """
+    Add values to the active request's breakdown; no-op outside collect_timings().
+    """
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(section, name, **values)
+
+
+@contextmanager
+def stage_scope(stage: str) -> Iterator[None]:
+    """
+    Attribute LLM calls made inside the with-block (including parser repair calls) to stage.
+    """
+    token = _current_stage.set(stage)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+
+
+def current_stage() -> str:
+    return _current_stage.get() or "unknown"
@@ -0,0 +1,161 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+# LangChain message types -> OpenAI chat roles.
+ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool"}
+
+
+class ChatCompletionError(Exception):
+    """
+    A non-2xx answer of an OpenAI-compatible server. Carries status_code and the decoded error
+    body like the Groq client's errors, so retries and structured output recovery treat both alike.
+    """
+    def __init__(self, status_code: int, body: Any):
+        super().__init__(f"Chat completion failed with HTTP {status_code}: {body}")
+        self.status_code = status_code
+        self.body = body
+
+
+def _raise_for_status(response: httpx.Response) -> None:
+    if response.is_success:
+        return
+    try:
+        body = response.json()
+    except ValueError:
+        body = response.text
+    raise ChatCompletionError(response.status_code, body)
+
+
+def _usage(usage: Optional[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+    if not usage:
+        return None
+    prompt_tokens = usage.get("prompt_tokens", 0)
+    completion_tokens = usage.get("completion_tokens", 0)
+    return {
+        "input_tokens": prompt_tokens,
+        "output_tokens": completion_tokens,
+        "total_tokens": usage.get("total_tokens", prompt_tokens + completion_tokens),
+    }
+
+
+class OpenAICompatibleChat(BaseChatModel):
+    """
+    Minimal chat model for servers speaking the OpenAI chat completions API (vLLM, llama.cpp,
+    Ollama, LM Studio, ...), over httpx. Supports the response_format and tools/tool_choice
+    arguments the pipeline binds for structured output, and streaming. Timeouts and connection
+    errors are raised as TimeoutError / ConnectionError so the scheduler retries them.
+    """
+    base_url: str
+    model: str
+    api_key: Optional[str] = None
+    temperature: float = 0.5
+    timeout: float = 60.0
+
+    _client: Optional[httpx.Client] = PrivateAttr(default=None)
+    _aclient: Optional[httpx.AsyncClient] = PrivateAttr(default=None)
+    _aclient_loop: Any = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "openai-compatible"
+
+    def _client_options(self) -> Dict[str, Any]:
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        return {"base_url": self.base_url.rstrip("/"), "headers": headers, "timeout": self.timeout}
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(**self._client_options())
+        return self._client
+
+    @property
+    def aclient(self) -> httpx.AsyncClient:
+        """
+        The async client of the running event loop; its pooled connections cannot be reused from
+        another loop (e.g. after asyncio.run in scripts), so a new loop gets a new client.
+        """
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            self._aclient = httpx.AsyncClient(**self._client_options())
+            self._aclient_loop = loop
+        return self._aclient
+
+    def bind_tools(self, tools: List[Any], tool_choice: Optional[str] = None, **kwargs: Any):
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+        if isinstance(tool_choice, str):
+            tool_choice = {"type": "function", "function": {"name": tool_choice}}
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _request(self, messages: List[BaseMessage], stop: Optional[List[str]], stream: bool, **kwargs: Any) -> Dict[str, Any]:
+        request = {
+            "model": self.model,
+            "messages": [{"role": ROLES.get(message.type, "user"), "content": message.content} for message in messages],
+            "temperature": self.temperature,
+            **{key: value for key, value in kwargs.items() if value is not None},
+        }
+        if stop:
+            request["stop"] = stop
+        if stream:
+            request["stream"] = True
+            request["stream_options"] = {"include_usage": True}
+        return request
+
+    @staticmethod
+    def _message(data: Dict[str, Any]) -> AIMessage:
+        message = data["choices"][0]["message"]
+        tool_calls = [
+            {"name": call["function"]["name"], "args": json.loads(call["function"]["arguments"] or "{}"), "id": call.get("id")}
+            for call in message.get("tool_calls") or []
+        ]
+        return AIMessage(content=message.get("content") or "", tool_calls=tool_calls, usage_metadata=_usage(data.get("usage")))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        try:
+            response = self.client.post("/chat/completions", json=self._request(messages, stop, False, **kwargs))
+        except httpx.TimeoutException as e:
+            raise TimeoutError(str(e)) from e
+        except httpx.TransportError as e:
+            raise ConnectionError(str(e)) from e
+        _raise_for_status(response)
+        return ChatResult(generations=[ChatGeneration(message=self._message(response.json()))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        try:
+            response = await self.aclient.post("/chat/completions", json=self._request(messages, stop, False, **kwargs))
+        except httpx.TimeoutException as e:
+            raise TimeoutError(str(e)) from e
+        except httpx.TransportError as e:
+            raise ConnectionError(str(e)) from e
+        _raise_for_status(response)
+        return ChatResult(generations=[ChatGeneration(message=self._message(response.json()))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        request = self._request(messages, stop, True, **kwargs)
+        try:
+            async with self.aclient.stream("POST", "/chat/completions", json=request) as response:
+                if not response.is_success:
+                    await response.aread()
+                    _raise_for_status(response)
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    choices = event.get("choices") or [{}]
+                    content = (choices[0].get("delta") or {}).get("content") or ""
+                    usage = _usage(event.get("usage"))
+                    if content or usage:
+                        yield ChatGenerationChunk(message=AIMessageChunk(content=content, usage_metadata=usage))
+        except httpx.TimeoutException as e:
+            raise TimeoutError(str(e)) from e
+        except httpx.TransportError as e:
+            raise ConnectionError(str(e)) from e
@@ -0,0 +1,238 @@
+import json
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+from app.utils.metrics import metrics
+from app.utils.settings import get_settings
+
+# Per-stage field projection of the claim sent to the LLM. "include" keeps only the listed
+# paths, "exclude" drops paths; dotted paths apply to every item when they cross a list.
+STAGE_PROJECTIONS: Dict[str, Dict[str, List[str]]] = {
+    # Full policy text: identifiers and the signature never affect eligibility.
+    "policy": {
+        "exclude": [
+            "patient_demographics.full_name",
+            "patient_demographics.insurance_id",
+            "physician_signature",
+        ],
+    },
+    # Judgemental criteria only: vitals, history, procedures, labs and diagnosis.
+    "policy_judgement": {
+        "include": [
+            "patient_demographics.age",
+            "patient_demographics.gender",
+            "hpi",
+            "past_medical_history",
+            "procedures_treatments",
+            "imaging_lab_results",
+            "diagnosis_discharge_summary",
+        ],
+    },
+}
+
+# The guardrail only has to recognise the kind of document, so long values are clipped.
+GUARDRAIL_MAX_STRING = 200
+GUARDRAIL_MAX_LIST_ITEMS = 10
+
+# Context budget: the list sections trimmed to their most recent items when a claim does not
+# fit the model's context, and the string length values are clipped to as a last resort.
+BUDGET_LIST_SECTIONS = ("imaging_lab_results", "procedures_treatments")
+BUDGET_MAX_STRING = 500
+# estimate_tokens is approximate (dense JSON tokenises worse than prose), so only this share of
+# the context is planned for.
+BUDGET_HEADROOM = 0.9
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap prompt token estimate (~4 characters per token for English/JSON with Llama tokenizers).
+    """
+    return max(1, len(text) // 4)
+
+
+class PayloadTooLarge(ValueError):
+    """
+    The claim does not fit the model's context even with its list sections trimmed.
+    """
+
+
+def compact_json(value: Any) -> str:
+    """
+    Minified JSON for prompts: no indentation or spaces, non-ASCII kept as-is.
+    """
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _path_tree(paths: Iterable[str]) -> Dict[str, Any]:
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        node = tree
+        parts = path.split(".")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+            if node is True:
+                break
+        else:
+            node[parts[-1]] = True
+    return tree
+
+
+def _include(value: Any, tree: Dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [_include(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    result = {}
+    for key, subtree in tree.items():
+        if key in value:
+            result[key] = value[key] if subtree is True else _include(value[key], subtree)
+    return result
+
+
+def _exclude(value: Any, tree: Dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [_exclude(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    result = {}
+    for key, item in value.items():
+        subtree = tree.get(key)
+        if subtree is True:
+            continue
+        result[key] = item if subtree is None else _exclude(item, subtree)
+    return result
+
+
+def project(data: Any, include: Optional[Iterable[str]] = None, exclude: Iterable[str] = ()) -> Any:
+    """
+    Keep only the `include` paths (when given), then drop the `exclude` paths.
+    """
+    if include is not None:
+        data = _include(data, _path_tree(include))
+    exclude = list(exclude)
+    if exclude:
+        data = _exclude(data, _path_tree(exclude))
+    return data
+
+
+def _clip(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > GUARDRAIL_MAX_STRING:
+        return value[:GUARDRAIL_MAX_STRING] + "…"
+    if isinstance(value, list):
+        clipped = [_clip(item) for item in value[:GUARDRAIL_MAX_LIST_ITEMS]]
+        if len(value) > GUARDRAIL_MAX_LIST_ITEMS:
+            clipped.append(f"… {len(value) - GUARDRAIL_MAX_LIST_ITEMS} more items")
+        return clipped
+    if isinstance(value, dict):
+        return {key: _clip(item) for key, item in value.items()}
+    return value
+
+
+def _clip_strings(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > BUDGET_MAX_STRING:
+        return value[:BUDGET_MAX_STRING] + "…"
+    if isinstance(value, list):
+        return [_clip_strings(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _clip_strings(item) for key, item in value.items()}
+    return value
+
+
+def _item_label(item: Any) -> Optional[str]:
+    if isinstance(item, dict):
+        label = item.get("type") or item.get("procedure_name")
+        if isinstance(label, str):
+            return label
+    return None
+
+
+def _item_date(item: Any) -> str:
+    date = item.get("date") if isinstance(item, dict) else None
+    return date if isinstance(date, str) else ""
+
+
+def _keep_recent(items: List[Any], keep: int) -> List[Any]:
+    """
+    The `keep` most recent items (by ISO `date`) in their original order, followed by a note
+    summarising the ones left out: how many, their date range and most frequent kinds.
+    """
+    if len(items) <= keep:
+        return items
+    recent = sorted(range(len(items)), key=lambda i: _item_date(items[i]), reverse=True)[:keep]
+    kept = set(recent)
+    omitted = [item for i, item in enumerate(items) if i not in kept]
+    note = f"… {len(omitted)} earlier items omitted"
+    dates = sorted(date for date in map(_item_date, omitted) if date)
+    if dates:
+        note += f" ({dates[0]} to {dates[-1]})"
+    labels = Counter(label for label in map(_item_label, omitted) if label)
+    if labels:
+        note += ": " + ", ".join(f"{label} ×{count}" for label, count in labels.most_common(5))
+    return [items[i] for i in sorted(kept)] + [note]
+
+
+def _fit(value: Any, stage: str, max_tokens: int) -> str:
+    """
+    compact_json of value within max_tokens: as-is when it fits, else with BUDGET_LIST_SECTIONS
+    cut to the largest number of most recent items that fits (long strings clipped as well if
+    even empty lists do not fit). Raises PayloadTooLarge when nothing fits.
+    """
+    text = compact_json(value)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if isinstance(value, dict):
+        for base in (value, _clip_strings(value)):
+            sections = {name: base[name] for name in BUDGET_LIST_SECTIONS if isinstance(base.get(name), list)}
+            low, high = 0, max((len(items) for items in sections.values()), default=0)
+            best = None
+            while low <= high:
+                keep = (low + high) // 2
+                text = compact_json({**base, **{name: _keep_recent(items, keep) for name, items in sections.items()}})
+                if estimate_tokens(text) <= max_tokens:
+                    best, low = text, keep + 1
+                else:
+                    high = keep - 1
+            if best is not None:
+                metrics.inc("prompt_payload_trimmed_total", stage=stage)
+                return best
+    metrics.inc("prompt_payload_rejected_total", stage=stage)
+    raise PayloadTooLarge(
+        f"The clinical summary is too large for the model's {get_settings().llm_context_tokens}-token context "
+        f"even with {' and '.join(BUDGET_LIST_SECTIONS)} trimmed to their most recent entries; "
+        "shorten its free-text fields or split it into separate claims."
+    )
+
+
+def payload_budget(*prompt_text: str) -> int:
+    """
+    Tokens left for the claim in a prompt whose remaining text is prompt_text, after reserving
+    the completion (MEDICHECK_LLM_CONTEXT_TOKENS, MEDICHECK_LLM_COMPLETION_TOKENS).
+    """
+    settings = get_settings()
+    available = int(settings.llm_context_tokens * BUDGET_HEADROOM) - settings.llm_completion_tokens
+    return available - sum(estimate_tokens(text) for text in prompt_text)
+
+
+def build_payload(data: Any, stage: str, missing_fields: Optional[List[str]] = None, max_tokens: Optional[int] = None) -> str:
+    """
+    Minified, field-projected representation of the claim for one prompt stage:
+    - guardrail: the whole document with long strings and lists clipped;
+    - validator: the top-level keys present plus only the sections that have errors;
+    - policy / policy_judgement: see STAGE_PROJECTIONS.
+    With max_tokens (see payload_budget), oversized list sections are trimmed to fit.
+    """
+    if stage == "guardrail":
+        value = _clip(data)
+    elif stage == "validator" and isinstance(data, dict):
+        sections = {str(field).split(".")[0] for field in missing_fields or []}
+        value = {
+            "present_sections": list(data),
+            **{name: data[name] for name in data if name in sections},
+        }
+    elif stage == "validator":
+        value = data
+    else:
+        spec = STAGE_PROJECTIONS[stage]
+        value = project(data, spec.get("include"), spec.get("exclude", ()))
+    if max_tokens is None:
+        return compact_json(value)
+    return _fit(value, stage, max_tokens)
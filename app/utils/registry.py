@@ -0,0 +1,141 @@
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Tuple, Type
+from pydantic import BaseModel
+from app.utils.llm import GroqLLM, refresh_scheduler
+from app.utils.settings import get_settings
+
+if TYPE_CHECKING:
+    from langchain.output_parsers import PydanticOutputParser, OutputFixingParser
+
+
+class FlowRegistry:
+    """
+    Process-wide registry of the compiled validation flows, LLM clients and output parsers.
+    Everything is built once (at app startup via warm_up, or lazily on first use) and then
+    shared by every request. reload() rebuilds all of it, e.g. after rotating GROQ_API_KEY.
+    """
+    def __init__(self, llm_factory: Callable[..., Any] = GroqLLM):
+        self.llm_factory = llm_factory
+        self._lock = threading.RLock()
+        self._flow_builders: Dict[str, Callable[[], Any]] = {}
+        self._flows: Dict[str, Any] = {}
+        self._llms: Dict[Tuple[str, float], Any] = {}
+        self._parsers: Dict[Tuple[Type[BaseModel], str, float], Tuple["PydanticOutputParser", "OutputFixingParser"]] = {}
+        self._parser_specs: Dict[Tuple[Type[BaseModel], str, float], None] = {}
+        self.generation = 0
+
+    def register_flow(self, name: str, builder: Callable[[], Any]) -> None:
+        """
+        Register a builder returning a compiled graph under the given name.
+        """
+        with self._lock:
+            self._flow_builders[name] = builder
+            self._flows.pop(name, None)
+
+    def register_parser(self, pydantic_object: Type[BaseModel], model: str, temperature: float) -> None:
+        """
+        Declare an (output model, LLM) combination a service needs, so warm_up can build it ahead of time.
+        """
+        with self._lock:
+            self._parser_specs[(pydantic_object, model, float(temperature))] = None
+
+    def get_flow(self, name: str = "standard") -> Any:
+        """
+        Return the compiled flow registered under name, compiling it on first use.
+        """
+        flow = self._flows.get(name)
+        if flow is not None:
+            return flow
+        with self._lock:
+            if name not in self._flows:
+                if name not in self._flow_builders:
+                    raise KeyError(f"No validation flow registered under '{name}'")
+                self._flows[name] = self._flow_builders[name]()
+            return self._flows[name]
+
+    def get_llm(self, model: str, temperature: float) -> Any:
+        """
+        Return the shared LLM client for the given model and temperature.
+        """
+        key = (model, float(temperature))
+        llm = self._llms.get(key)
+        if llm is not None:
+            return llm
+        with self._lock:
+            if key not in self._llms:
+                self._llms[key] = self.llm_factory(model=model, temperature=temperature)
+            return self._llms[key]
+
+    def get_parsers(self, pydantic_object: Type[BaseModel], model: str, temperature: float) -> Tuple["PydanticOutputParser", "OutputFixingParser"]:
+        """
+        Return the (base, fixing) output parser pair for pydantic_object. The fixing parser calls the
+        shared LLM client through its scheduled runnable, so repair calls are rate limited too.
+        """
+        key = (pydantic_object, model, float(temperature))
+        parsers = self._parsers.get(key)
+        if parsers is not None:
+            return parsers
+        with self._lock:
+            if key not in self._parsers:
+                from langchain.output_parsers import PydanticOutputParser, OutputFixingParser
+                llm = self.get_llm(model, temperature)
+                base_parser = PydanticOutputParser(pydantic_object=pydantic_object)
+                parser = OutputFixingParser.from_llm(parser=base_parser, llm=llm.runnable)
+                self._parsers[key] = (base_parser, parser)
+            return self._parsers[key]
+
+    def warm_up(self) -> None:
+        """
+        Load and compile the payer policies, build every registered parser/LLM client and compile
+        every registered flow ahead of the first request.
+        """
+        from app.services.policy_registry import get_policy_registry
+        with self._lock:
+            get_policy_registry()
+            for pydantic_object, model, temperature in list(self._parser_specs):
+                self.get_parsers(pydantic_object, model, temperature)
+            for name in list(self._flow_builders):
+                self.get_flow(name)
+
+    def reload(self) -> int:
+        """
+        Re-read settings and policies, then drop and rebuild all flows, LLM clients and parsers. In-flight requests keep the
+        objects they already hold; new requests pick up the rebuilt ones. The LLM scheduler is only
+        replaced when the rate limits changed.
+        Returns the new registry generation.
+        """
+        with self._lock:
+            previous = get_settings()
+            get_settings.cache_clear()
+            from app.utils.cache import get_result_cache
+            from app.services.policy_registry import get_policy_registry
+            from app.services.decision_index import get_decision_index
+            get_result_cache.cache_clear()
+            get_policy_registry.cache_clear()
+            get_decision_index.cache_clear()
+            refresh_scheduler(previous)
+            self._flows = {}
+            self._llms = {}
+            self._parsers = {}
+            self.generation += 1
+            self.warm_up()
+            return self.generation
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Summary of what is currently cached, for diagnostics.
+        """
+        return {
+            "generation": self.generation,
+            "flows": sorted(self._flows),
+            "llm_clients": [f"{model}@{temperature}" for model, temperature in self._llms],
+            "llm_backends": {
+                f"{model}@{temperature}": health
+                for (model, temperature), llm in self._llms.items()
+                if (health := getattr(llm, "health", lambda: None)()) is not None
+            },
+            "parsers": len(self._parsers),
+        }
+
+
+registry = FlowRegistry()
@@ -0,0 +1,127 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from dotenv import load_dotenv
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+def _env_str(name: str, default: str) -> str:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip()
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return float(value)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Runtime tuning knobs, read from MEDICHECK_* environment variables.
+    """
+    guardrail_fast_path: bool = True
+    speculative_policy: bool = True
+    llm_suggestions: bool = False
+    cache_backend: str = "memory"
+    cache_path: str = ".medicheck/result_cache.sqlite3"
+    cache_ttl_seconds: int = 24 * 3600
+    cache_max_entries: int = 10000
+    batch_concurrency: int = 8
+    batch_max_concurrency: int = 64
+    jobs_db_path: str = ".medicheck/jobs.sqlite3"
+    job_workers: int = 4
+    job_max_attempts: int = 5
+    job_lease_seconds: int = 300
+    job_retention_seconds: int = 7 * 24 * 3600
+    llm_rpm: int = 0
+    llm_tpm: int = 0
+    llm_max_retries: int = 3
+    llm_completion_tokens: int = 512
+    structured_output: str = "json_mode"
+    llm_output_fixing: bool = True
+    policy_dir: str = ""
+    default_policy: str = "default"
+    max_policies_per_request: int = 32
+    max_summary_bytes: int = 1024 * 1024
+    max_batch_bytes: int = 64 * 1024 * 1024
+    llm_context_tokens: int = 8192
+    llm_fallbacks: str = ""
+    llm_failure_threshold: int = 3
+    llm_cooldown_seconds: int = 30
+    llm_hedge: bool = False
+    llm_hedge_delay_ms: int = 0
+    decision_index: str = "fingerprint"
+    decision_min_similarity: float = 0.9
+    decision_index_max_entries: int = 10000
+    llm_rate_limit_backend: str = "memory"
+    llm_rate_limit_path: str = ".medicheck/rate_limit.sqlite3"
+    serve_bind: str = "0.0.0.0:8000"
+    serve_workers: int = 0
+    serve_preload: bool = True
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Load settings from the environment once; registry.reload() clears this cache.
+    """
+    load_dotenv()
+    return Settings(
+        guardrail_fast_path=_env_bool("MEDICHECK_GUARDRAIL_FAST_PATH", Settings.guardrail_fast_path),
+        speculative_policy=_env_bool("MEDICHECK_SPECULATIVE_POLICY", Settings.speculative_policy),
+        llm_suggestions=_env_bool("MEDICHECK_LLM_SUGGESTIONS", Settings.llm_suggestions),
+        cache_backend=_env_str("MEDICHECK_CACHE_BACKEND", Settings.cache_backend).lower(),
+        cache_path=_env_str("MEDICHECK_CACHE_PATH", Settings.cache_path),
+        cache_ttl_seconds=_env_int("MEDICHECK_CACHE_TTL_SECONDS", Settings.cache_ttl_seconds),
+        cache_max_entries=_env_int("MEDICHECK_CACHE_MAX_ENTRIES", Settings.cache_max_entries),
+        batch_concurrency=_env_int("MEDICHECK_BATCH_CONCURRENCY", Settings.batch_concurrency),
+        batch_max_concurrency=_env_int("MEDICHECK_BATCH_MAX_CONCURRENCY", Settings.batch_max_concurrency),
+        jobs_db_path=_env_str("MEDICHECK_JOBS_DB_PATH", Settings.jobs_db_path),
+        job_workers=_env_int("MEDICHECK_JOB_WORKERS", Settings.job_workers),
+        job_max_attempts=_env_int("MEDICHECK_JOB_MAX_ATTEMPTS", Settings.job_max_attempts),
+        job_lease_seconds=_env_int("MEDICHECK_JOB_LEASE_SECONDS", Settings.job_lease_seconds),
+        job_retention_seconds=_env_int("MEDICHECK_JOB_RETENTION_SECONDS", Settings.job_retention_seconds),
+        llm_rpm=_env_int("MEDICHECK_LLM_RPM", Settings.llm_rpm),
+        llm_tpm=_env_int("MEDICHECK_LLM_TPM", Settings.llm_tpm),
+        llm_max_retries=_env_int("MEDICHECK_LLM_MAX_RETRIES", Settings.llm_max_retries),
+        llm_completion_tokens=_env_int("MEDICHECK_LLM_COMPLETION_TOKENS", Settings.llm_completion_tokens),
+        structured_output=_env_str("MEDICHECK_STRUCTURED_OUTPUT", Settings.structured_output).lower(),
+        llm_output_fixing=_env_bool("MEDICHECK_LLM_OUTPUT_FIXING", Settings.llm_output_fixing),
+        policy_dir=_env_str("MEDICHECK_POLICY_DIR", Settings.policy_dir),
+        default_policy=_env_str("MEDICHECK_DEFAULT_POLICY", Settings.default_policy),
+        max_policies_per_request=_env_int("MEDICHECK_MAX_POLICIES_PER_REQUEST", Settings.max_policies_per_request),
+        max_summary_bytes=_env_int("MEDICHECK_MAX_SUMMARY_BYTES", Settings.max_summary_bytes),
+        max_batch_bytes=_env_int("MEDICHECK_MAX_BATCH_BYTES", Settings.max_batch_bytes),
+        llm_context_tokens=_env_int("MEDICHECK_LLM_CONTEXT_TOKENS", Settings.llm_context_tokens),
+        llm_fallbacks=_env_str("MEDICHECK_LLM_FALLBACKS", Settings.llm_fallbacks),
+        llm_failure_threshold=_env_int("MEDICHECK_LLM_FAILURE_THRESHOLD", Settings.llm_failure_threshold),
+        llm_cooldown_seconds=_env_int("MEDICHECK_LLM_COOLDOWN_SECONDS", Settings.llm_cooldown_seconds),
+        llm_hedge=_env_bool("MEDICHECK_LLM_HEDGE", Settings.llm_hedge),
+        llm_hedge_delay_ms=_env_int("MEDICHECK_LLM_HEDGE_DELAY_MS", Settings.llm_hedge_delay_ms),
+        decision_index=_env_str("MEDICHECK_DECISION_INDEX", Settings.decision_index).lower(),
+        decision_min_similarity=_env_float("MEDICHECK_DECISION_MIN_SIMILARITY", Settings.decision_min_similarity),
+        decision_index_max_entries=_env_int("MEDICHECK_DECISION_INDEX_MAX_ENTRIES", Settings.decision_index_max_entries),
+        llm_rate_limit_backend=_env_str("MEDICHECK_LLM_RATE_LIMIT_BACKEND", Settings.llm_rate_limit_backend).lower(),
+        llm_rate_limit_path=_env_str("MEDICHECK_LLM_RATE_LIMIT_PATH", Settings.llm_rate_limit_path),
+        serve_bind=_env_str("MEDICHECK_SERVE_BIND", Settings.serve_bind),
+        serve_workers=_env_int("MEDICHECK_SERVE_WORKERS", Settings.serve_workers),
+        serve_preload=_env_bool("MEDICHECK_SERVE_PRELOAD", Settings.serve_preload),
+    )
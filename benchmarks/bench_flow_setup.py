@@ -0,0 +1,59 @@
+"""
+Per-request setup overhead of the validation flow: building the graph and LLM clients for
+every claim (the old behaviour) versus reusing the ones held by the process-wide registry.
+No LLM calls are made; a dummy GROQ_API_KEY is enough.
+
+    poetry run python benchmarks/bench_flow_setup.py [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GROQ_API_KEY", "benchmark-dummy-key")
+
+from langchain.output_parsers import PydanticOutputParser, OutputFixingParser
+from app.flow_graph.langgraph import create_validation_flow
+from app.models.output import GuardrailOutput, PolicyEvalOutput, ValidatorOutput
+from app.utils.llm import GroqLLM
+from app.utils.registry import registry
+
+OUTPUT_MODELS = (GuardrailOutput, ValidatorOutput, PolicyEvalOutput)
+
+
+def per_request_setup():
+    create_validation_flow()
+    for output_model in OUTPUT_MODELS:
+        llm = GroqLLM(model="llama3-70b-8192", temperature=0.2)
+        base_parser = PydanticOutputParser(pydantic_object=output_model)
+        OutputFixingParser.from_llm(parser=base_parser, llm=llm.llm)
+
+
+def registry_setup():
+    registry.get_flow("standard")
+    for output_model in OUTPUT_MODELS:
+        registry.get_llm(model="llama3-70b-8192", temperature=0.2)
+        registry.get_parsers(output_model, model="llama3-70b-8192", temperature=0.2)
+
+
+def measure(fn, iterations):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    registry.warm_up()
+    before = measure(per_request_setup, iterations)
+    after = measure(registry_setup, iterations)
+    print(f"iterations:            {iterations}")
+    print(f"per-request setup:     {before * 1e3:9.3f} ms/request")
+    print(f"registry lookup:       {after * 1e3:9.3f} ms/request")
+    print(f"speed-up:              {before / after:9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
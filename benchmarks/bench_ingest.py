@@ -0,0 +1,126 @@
+"""
+Cost of ingesting one claim, from the raw request bytes up to everything the stages derive from
+it (schema validation, cache-key serialisation, prompt payloads), for large synthetic summaries:
+
+- per-stage:     json.loads, then each stage re-validates and re-serialises the dict on its own
+                 (how the flow worked before app.services.ingest.ParsedSummary)
+- parse-once:    ParsedSummary.from_json, shared by the stages
+- validate-dict / validate-json: schema check alone, json.loads plus model_validate on the dict
+                 versus model_validate_json on the bytes (which parses them a second time; this
+                 is why ParsedSummary validates the decoded value)
+
+plus the whole flow on the event loop with every LLM stage served from a warm result cache.
+Invalid claims have a field removed from every list item, so pydantic reports one error per
+item in a single pass.
+
+    poetry run python benchmarks/bench_ingest.py [items,...] [iterations]
+"""
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GROQ_API_KEY", "benchmark-dummy-key")
+os.environ["MEDICHECK_CACHE_BACKEND"] = "memory"
+
+from pydantic import ValidationError
+from fake_llm import fake_llm_factory
+from synthetic import large
+from app.flow_graph.langgraph import aprocess_clinical_summary
+from app.models.clinical_summary import ClinicalSummary
+from app.services.ingest import ParsedSummary
+from app.utils.cache import canonical_json
+from app.utils.prompt_payload import build_payload
+from app.utils.registry import registry
+
+
+def per_stage(raw: bytes) -> None:
+    data = json.loads(raw)
+    canonical_json(data)  # guardrail cache key
+    build_payload(data, "guardrail")
+    try:  # validator
+        ClinicalSummary.model_validate(data)
+        valid = True
+    except ValidationError as e:
+        valid = False
+        [".".join(str(x) for x in err["loc"]) for err in e.errors()]
+    canonical_json(data)  # validator cache key
+    if valid:
+        ClinicalSummary.model_validate(data)  # policy rules
+        canonical_json(data)  # policy cache key
+        build_payload(data, "policy_judgement")
+
+
+def parse_once(raw: bytes) -> None:
+    parsed = ParsedSummary.from_json(raw)
+    parsed.canonical
+    parsed.payload("guardrail")
+    parsed.missing_fields
+    if parsed.is_valid:
+        parsed.summary
+        parsed.payload("policy_judgement")
+
+
+def validate_dict(raw: bytes) -> None:
+    data = json.loads(raw)
+    try:
+        ClinicalSummary.model_validate(data)
+    except ValidationError as e:
+        e.errors()
+
+
+def validate_json(raw: bytes) -> None:
+    json.loads(raw)
+    try:
+        ClinicalSummary.model_validate_json(raw)
+    except ValidationError as e:
+        e.errors()
+
+
+def claim(items: int, valid: bool) -> bytes:
+    data = large(random.Random(items), items=items)
+    if not valid:
+        for procedure in data["procedures_treatments"]:
+            del procedure["justification"]
+    return json.dumps(data).encode()
+
+
+def measure(call, iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10, 100, 300, 1000]
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    registry.llm_factory = fake_llm_factory(latency=0.0)
+    registry.reload()
+    loop = asyncio.new_event_loop()
+    print(f"median of {iterations} iterations, ms")
+    print(f"{'items':>6} {'claim':8} {'KB':>7} {'per-stage':>10} {'parse-once':>11} {'validate-dict':>14} {'validate-json':>14} {'flow':>8}")
+    for items in sizes:
+        for valid in (True, False):
+            raw = claim(items, valid)
+            loop.run_until_complete(aprocess_clinical_summary(ParsedSummary.from_json(raw)))  # warm the result cache
+            ingest_old = measure(lambda: per_stage(raw), iterations)
+            ingest_new = measure(lambda: parse_once(raw), iterations)
+            ingest_dict = measure(lambda: validate_dict(raw), iterations)
+            ingest_json = measure(lambda: validate_json(raw), iterations)
+            flow = measure(lambda: loop.run_until_complete(aprocess_clinical_summary(ParsedSummary.from_json(raw))), iterations)
+            print(
+                f"{items:>6} {'valid' if valid else 'invalid':8} {len(raw) / 1024:>7.1f} {ingest_old:>10.2f} "
+                f"{ingest_new:>11.2f} {ingest_dict:>14.2f} {ingest_json:>14.2f} {flow:>8.2f}"
+            )
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
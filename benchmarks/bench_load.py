@@ -0,0 +1,237 @@
+"""
+Offline load test: throughput and p50/p95/p99 latency of the validation pipeline at several
+concurrency levels, against the fake chat model in fake_llm.py and synthetic payloads from
+synthetic.py, so it costs no Groq quota and is reproducible per seed.
+
+Targets:
+- flow:      aprocess_clinical_summary on the event loop (what the API awaits)
+- flow-sync: process_clinical_summary in worker threads (scripts and sync callers)
+- http:      POST /api/validate-summary through the ASGI app (httpx ASGITransport, no sockets)
+
+    poetry run python benchmarks/bench_load.py --concurrency 1,8,32 --requests 200 \\
+        --latency lognormal:0.4,0.5 --output bench-report.json
+    poetry run python benchmarks/bench_load.py --baseline bench-report.json   # after a change
+
+With --baseline, scenarios are compared by name and the script exits with status 1 when p95
+latency grew or throughput dropped by more than --threshold (default 15%).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GROQ_API_KEY", "benchmark-dummy-key")
+
+TARGETS = ("flow", "flow-sync", "http")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", default="flow,http", help=f"comma-separated subset of {', '.join(TARGETS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="payloads per scenario")
+    parser.add_argument("--latency", default="lognormal:0.4,0.5", help="fake LLM latency spec, see fake_llm.py")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of fake answers that need a parser repair")
+    parser.add_argument("--pool", type=int, default=1, help="fake backends per LLM client (LLMPool with failover)")
+    parser.add_argument("--hedge", action="store_true", help="hedge slow calls with a second attempt after the backend's p95")
+    parser.add_argument("--primary-failure-rate", type=float, default=0.0, help="share of calls the first fake backend fails")
+    parser.add_argument("--mix", default=None, help="payload mix, e.g. eligible=3,invalid=1 (default: synthetic.DEFAULT_MIX)")
+    parser.add_argument("--mode", default="standard", help="pipeline mode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="keep the in-memory result cache on (off by default)")
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    parser.add_argument("--baseline", help="compare against a previous JSON report")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative regression tolerance")
+    return parser.parse_args(argv)
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def llm_calls() -> float:
+    from app.utils.metrics import metrics
+    return sum(value for name, value in metrics.snapshot().items() if name.startswith("llm_calls_total"))
+
+
+async def run_scenario(
+    name: str,
+    call: Callable[[Dict[str, Any]], Awaitable[Any]],
+    payloads: List[Tuple[str, Dict[str, Any]]],
+    concurrency: int,
+) -> Dict[str, Any]:
+    """
+    Drive `call` over the payloads with `concurrency` workers and summarise the latencies.
+    """
+    pending = iter(payloads)
+    latencies: List[float] = []
+    by_kind: Dict[str, List[float]] = {}
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for kind, payload in pending:
+            start = time.perf_counter()
+            try:
+                await call(payload)
+            except Exception:
+                errors += 1
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            latencies.append(elapsed)
+            by_kind.setdefault(kind, []).append(elapsed)
+
+    calls_before = llm_calls()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "name": name,
+        "concurrency": concurrency,
+        "requests": len(payloads),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "mean_ms": round(statistics.mean(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "llm_calls_per_request": round((llm_calls() - calls_before) / len(payloads), 3),
+        "p50_ms_by_kind": {kind: round(percentile(sorted(values), 50), 2) for kind, values in sorted(by_kind.items())},
+    }
+
+
+async def run_all(args: argparse.Namespace, payloads: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    import httpx
+    from app.flow_graph.langgraph import aprocess_clinical_summary, process_clinical_summary
+    from app.main import app
+
+    async def flow(payload):
+        return await aprocess_clinical_summary(payload, mode=args.mode)
+
+    async def flow_sync(payload):
+        return await asyncio.to_thread(process_clinical_summary, payload, True, args.mode)
+
+    results = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://medicheck", timeout=None) as client:
+        async def http(payload):
+            response = await client.post("/api/validate-summary", params={"mode": args.mode}, json=payload)
+            response.raise_for_status()
+            return response.json()
+
+        calls = {"flow": flow, "flow-sync": flow_sync, "http": http}
+        for target in args.targets.split(","):
+            for concurrency in (int(c) for c in args.concurrency.split(",")):
+                name = f"{target}@c{concurrency}"
+                results.append(await run_scenario(name, calls[target], payloads, concurrency))
+                print_row(results[-1])
+    return results
+
+
+def print_header() -> None:
+    print(f"{'scenario':16} {'rps':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'llm/req':>8} {'errors':>7}")
+
+
+def print_row(row: Dict[str, Any]) -> None:
+    print(
+        f"{row['name']:16} {row['throughput_rps']:>9.2f} {row['mean_ms']:>9.1f} {row['p50_ms']:>9.1f} "
+        f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['llm_calls_per_request']:>8.2f} {row['errors']:>7}"
+    )
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Print per-scenario deltas against the baseline; returns the regressions found.
+    """
+    for key in ("latency", "requests", "mix", "mode", "seed", "malformed_rate", "pool", "hedge", "primary_failure_rate"):
+        if report["config"].get(key) != baseline["config"].get(key):
+            print(f"warning: baseline was run with {key}={baseline['config'].get(key)!r}, this run with {report['config'].get(key)!r}")
+    previous = {row["name"]: row for row in baseline["scenarios"]}
+    regressions = []
+    print(f"\n{'scenario':16} {'rps':>18} {'p95 ms':>20}")
+    for row in report["scenarios"]:
+        base = previous.get(row["name"])
+        if base is None:
+            continue
+        rps_delta = row["throughput_rps"] / base["throughput_rps"] - 1 if base["throughput_rps"] else 0.0
+        p95_delta = row["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        flag = ""
+        if rps_delta < -threshold or p95_delta > threshold:
+            flag = "  REGRESSION"
+            regressions.append(row["name"])
+        print(
+            f"{row['name']:16} {base['throughput_rps']:>8.2f} -> {row['throughput_rps']:<8.2f}"
+            f" {base['p95_ms']:>8.1f} -> {row['p95_ms']:<8.1f} ({rps_delta:+.0%} rps, {p95_delta:+.0%} p95){flag}"
+        )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    for target in args.targets.split(","):
+        if target not in TARGETS:
+            raise SystemExit(f"Unknown target '{target}'; use one of: {', '.join(TARGETS)}.")
+    os.environ["MEDICHECK_CACHE_BACKEND"] = "memory" if args.cache else "off"
+    os.environ["MEDICHECK_JOB_WORKERS"] = "0"
+
+    from fake_llm import fake_llm_factory
+    from synthetic import generate, parse_mix
+    from app.utils.registry import registry
+
+    registry.llm_factory = fake_llm_factory(
+        latency=args.latency, seed=args.seed, malformed_rate=args.malformed_rate,
+        pool_size=args.pool, hedge=args.hedge, primary_failure_rate=args.primary_failure_rate
+    )
+    registry.reload()
+    payloads = generate(args.requests, seed=args.seed, mix=parse_mix(args.mix) if args.mix else None)
+
+    print(f"fake LLM latency {args.latency}, {args.requests} requests per scenario, mode {args.mode}")
+    print_header()
+    scenarios = asyncio.run(run_all(args, payloads))
+    report = {
+        "config": {
+            "latency": args.latency,
+            "malformed_rate": args.malformed_rate,
+            "pool": args.pool,
+            "hedge": args.hedge,
+            "primary_failure_rate": args.primary_failure_rate,
+            "requests": args.requests,
+            "mix": args.mix,
+            "mode": args.mode,
+            "seed": args.seed,
+            "cache": args.cache,
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scenarios": scenarios,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nreport written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} scenario(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
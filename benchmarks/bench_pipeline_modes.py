@@ -0,0 +1,65 @@
+"""
+Standard versus fused pipeline on the sample summaries in policy_data/, against a fake LLM
+with a fixed per-call latency. Reports LLM round-trips and mean end-to-end latency per claim,
+with the structural guardrail fast path on (the default) and off.
+
+    poetry run python benchmarks/bench_pipeline_modes.py [latency_seconds] [iterations]
+"""
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GROQ_API_KEY", "benchmark-dummy-key")
+os.environ["MEDICHECK_CACHE_BACKEND"] = "off"
+
+from fake_llm import fake_llm_factory
+from app.flow_graph.langgraph import PIPELINE_MODES, aprocess_clinical_summary
+from app.utils.metrics import metrics
+from app.utils.registry import registry
+
+POLICY_DATA = os.path.join(os.path.dirname(__file__), "..", "policy_data")
+
+
+def load_samples():
+    samples = {}
+    for path in sorted(glob.glob(os.path.join(POLICY_DATA, "*.json"))):
+        with open(path) as f:
+            samples[os.path.basename(path)] = json.load(f)
+    return samples
+
+
+def llm_calls():
+    return sum(value for name, value in metrics.snapshot().items() if name.startswith("llm_calls_total"))
+
+
+async def measure(data, mode, iterations):
+    before = llm_calls()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await aprocess_clinical_summary(data, mode=mode)
+    elapsed = time.perf_counter() - start
+    return (llm_calls() - before) / iterations, elapsed / iterations * 1000
+
+
+def main():
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.3
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    samples = load_samples()
+    registry.llm_factory = fake_llm_factory(latency=latency)
+    print(f"fake LLM latency {latency * 1000:.0f} ms, {iterations} iterations per cell")
+    for fast_path in ("true", "false"):
+        os.environ["MEDICHECK_GUARDRAIL_FAST_PATH"] = fast_path
+        registry.reload()
+        print(f"\nguardrail fast path: {fast_path}")
+        print(f"{'sample':34} " + " ".join(f"{mode + ' calls':>14} {mode + ' ms':>12}" for mode in PIPELINE_MODES))
+        for name, data in samples.items():
+            cells = [asyncio.run(measure(data, mode, iterations)) for mode in PIPELINE_MODES]
+            print(f"{name:34} " + " ".join(f"{calls:>14.1f} {ms:>12.1f}" for calls, ms in cells))
+
+
+if __name__ == "__main__":
+    main()
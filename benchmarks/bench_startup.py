@@ -0,0 +1,147 @@
+"""
+Cold start and memory of the serving modes, plus import time of the app's entry modules:
+
+- imports:          fresh interpreters importing app.services.ingest, app.services.batch and
+                    app.main; reports wall time and whether langgraph / langchain_groq were loaded
+- uvicorn:          one `uvicorn app.main:app` process
+- gunicorn:         `gunicorn -c python:app.gunicorn_conf app.main:app` with --workers workers,
+                    without preload (every worker imports and builds everything itself)
+- gunicorn-preload: the same with MEDICHECK_SERVE_PRELOAD=true (default): the master builds the
+                    flows once and forks
+
+For each server the time from launch until every worker answered /api/stats is measured, with
+each worker's own startup time, RSS and PSS (shared pages split between processes, from
+/proc/self/smaps_rollup) as reported by /api/stats. Linux only; needs gunicorn and
+uvicorn-worker installed. No LLM calls are made.
+
+    poetry run python benchmarks/bench_startup.py [--workers 4] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+IMPORTS = ("app.services.ingest", "app.services.batch", "app.main")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    parser.add_argument("--repeat", type=int, default=3, help="launches per server mode (median reported)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for a server to come up")
+    return parser.parse_args(argv)
+
+
+def _env(tmp: str, **extra: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("GROQ_API_KEY", "benchmark-dummy-key")
+    env.update({
+        "PYTHONPATH": ROOT,
+        "MEDICHECK_JOB_WORKERS": "0",
+        "MEDICHECK_CACHE_PATH": os.path.join(tmp, "result_cache.sqlite3"),
+        "MEDICHECK_LLM_RATE_LIMIT_PATH": os.path.join(tmp, "rate_limit.sqlite3"),
+        "MEDICHECK_JOBS_DB_PATH": os.path.join(tmp, "jobs.sqlite3"),
+    })
+    env.update(extra)
+    return env
+
+
+def measure_import(module: str, env: Dict[str, str]) -> Dict[str, Any]:
+    code = (
+        "import sys, time; start = time.perf_counter(); import " + module + "; "
+        "print(time.perf_counter() - start, 'langgraph' in sys.modules, 'langchain_groq' in sys.modules)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], env=env, cwd=ROOT, capture_output=True, text=True, check=True)
+    seconds, langgraph, groq = out.stdout.split()
+    return {"module": module, "ms": float(seconds) * 1000, "langgraph": langgraph == "True", "langchain_groq": groq == "True"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _stats(port: int) -> Optional[Dict[str, Any]]:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/stats", timeout=2) as response:
+            return json.loads(response.read())["process"]
+    except OSError:
+        return None
+
+
+def measure_server(command: List[str], workers: int, port: int, env: Dict[str, str], timeout: float) -> Dict[str, Any]:
+    """
+    Launch the server, poll /api/stats (a new connection each time, so the requests spread
+    over the workers) until `workers` distinct processes answered, then stop it.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    seen: Dict[int, Dict[str, Any]] = {}
+    first = None
+    try:
+        while len(seen) < workers:
+            if time.perf_counter() - start > timeout or process.poll() is not None:
+                raise RuntimeError(f"{' '.join(command)} did not come up ({len(seen)}/{workers} workers)")
+            stats = _stats(port)
+            if stats is None:
+                time.sleep(0.05)
+                continue
+            if first is None:
+                first = time.perf_counter() - start
+            seen[stats["pid"]] = stats
+        ready = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    per_worker = list(seen.values())
+    return {
+        "first_response_s": first,
+        "all_workers_s": ready,
+        "worker_startup_s": statistics.median(w["startup_seconds"] for w in per_worker),
+        "worker_rss_mb": statistics.median(w.get("rss_bytes", w.get("max_rss_bytes", 0)) for w in per_worker) / 2**20,
+        "worker_pss_mb": statistics.median(w.get("pss_bytes", 0) for w in per_worker) / 2**20,
+        "total_pss_mb": sum(w.get("pss_bytes", 0) for w in per_worker) / 2**20,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp)
+        print(f"{'module':24} {'import ms':>10} {'langgraph':>10} {'langchain_groq':>15}")
+        for module in IMPORTS:
+            result = measure_import(module, env)
+            print(f"{module:24} {result['ms']:>10.0f} {str(result['langgraph']):>10} {str(result['langchain_groq']):>15}")
+
+        modes = {
+            "uvicorn": (1, lambda port: [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)], {}),
+            "gunicorn": (args.workers, None, {"MEDICHECK_SERVE_PRELOAD": "false"}),
+            "gunicorn-preload": (args.workers, None, {"MEDICHECK_SERVE_PRELOAD": "true"}),
+        }
+        print()
+        print(f"{'server':18} {'workers':>7} {'first s':>8} {'all s':>7} {'worker start s':>15} {'RSS MB':>8} {'PSS MB':>8} {'total PSS MB':>13}")
+        for name, (workers, command, extra) in modes.items():
+            runs = []
+            for _ in range(args.repeat):
+                port = _free_port()
+                server_env = _env(tmp, MEDICHECK_SERVE_BIND=f"127.0.0.1:{port}", MEDICHECK_SERVE_WORKERS=str(workers), **extra)
+                argv_ = command(port) if command else [sys.executable, "-m", "gunicorn", "-c", "python:app.gunicorn_conf", "app.main:app"]
+                runs.append(measure_server(argv_, workers, port, server_env, args.timeout))
+            row = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            print(
+                f"{name:18} {workers:>7} {row['first_response_s']:>8.2f} {row['all_workers_s']:>7.2f} "
+                f"{row['worker_startup_s']:>15.2f} {row['worker_rss_mb']:>8.1f} {row['worker_pss_mb']:>8.1f} {row['total_pss_mb']:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Latency of a validation failure (policy_data/validation_fail_summary.json) with suggestions
+built locally from the ClinicalSummary field metadata (the default) versus phrased by the LLM
+(MEDICHECK_LLM_SUGGESTIONS=true), the latter against the fake LLM in fake_llm.py.
+
+    poetry run python benchmarks/bench_validation_suggestions.py [latency_seconds] [iterations]
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GROQ_API_KEY", "benchmark-dummy-key")
+os.environ["MEDICHECK_CACHE_BACKEND"] = "off"
+
+from fake_llm import fake_llm_factory
+from app.flow_graph.langgraph import aprocess_clinical_summary
+from app.utils.registry import registry
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "policy_data", "validation_fail_summary.json")
+
+
+async def measure(data, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await aprocess_clinical_summary(data)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with open(SAMPLE) as f:
+        data = json.load(f)
+    registry.llm_factory = fake_llm_factory(latency=latency)
+    print(f"fake LLM latency {latency * 1000:.0f} ms, {iterations} iterations")
+    print(f"{'suggestions':12} {'mean ms':>10} {'p50 ms':>10} {'max ms':>10}")
+    for label, llm_suggestions in (("template", "false"), ("llm", "true")):
+        os.environ["MEDICHECK_LLM_SUGGESTIONS"] = llm_suggestions
+        registry.reload()
+        timings = asyncio.run(measure(data, iterations))
+        print(f"{label:12} {statistics.mean(timings):>10.2f} {statistics.median(timings):>10.2f} {max(timings):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Offline stand-in for the Groq chat model used by the benchmarks. FakeChatModel is a LangChain
+chat model that answers every prompt with a canned, schema-valid JSON response after a delay
+drawn from a configurable latency distribution, and reports token usage like the real API.
+It is plugged into a regular GroqLLM, so the scheduler, output parsers, cache and
+instrumentation all run exactly as in production:
+
+    registry.llm_factory = fake_llm_factory(latency="lognormal:0.4,0.5", seed=1)
+    registry.reload()
+
+With pool_size > 1 or hedge, each client is an LLMPool of fake backends (the first one failing
+primary_failure_rate of its calls), to exercise failover and hedged requests offline.
+
+Latency specs (seconds): "fixed:S", "uniform:LO,HI", "normal:MEAN,STD", "lognormal:MEDIAN,SIGMA".
+"""
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+from app.utils.llm import GroqLLM, LLMPool, estimate_tokens
+from app.utils.settings import get_settings
+
+GUARDRAIL_ANSWER = {"is_insurance_summary": True, "reason": "Structured clinical summary.", "polite_message": "Your document looks like a clinical summary."}
+POLICY_ANSWER = {"policy_approved": True, "failed_criteria": [], "policy_message": "The patient meets the policy criteria."}
+VALIDATOR_ANSWER = {"is_valid": False, "missing_fields": [], "suggestions": ["Please complete the missing fields."]}
+# What a model returns when it ignores the format instructions, without structured output:
+# JSON in a markdown fence or with a trailing comma (repaired locally), or plain prose
+# (only OutputFixingParser's repair call recovers it).
+MALFORMED_KINDS = ("fenced", "trailing_comma", "prose")
+PROSE_ANSWER = "Sure! Here is my assessment of the document you sent."
+
+
+def malformed_answer(answer: Dict[str, Any], kind: str) -> str:
+    """
+    The answer as a model ignoring the format instructions might write it.
+    """
+    if kind == "fenced":
+        return "Here is the result:\n```json\n" + json.dumps(answer, indent=2) + "\n```"
+    if kind == "trailing_comma":
+        return json.dumps(answer)[:-1] + ",}"
+    return PROSE_ANSWER
+
+
+def canned_answer(prompt: str) -> Dict[str, Any]:
+    """
+    Picks the canned response by the role line each prompt template opens with; repair prompts
+    of the fixing parser have none, so for them it goes by the schema's field names.
+    """
+    if "Completion:" in prompt:
+        fused = {**GUARDRAIL_ANSWER, **POLICY_ANSWER}
+        for answer in (fused, GUARDRAIL_ANSWER, POLICY_ANSWER):
+            if all(f'"{key}"' in prompt for key in answer):
+                return answer
+        return VALIDATOR_ANSWER
+    if "classifier and insurance policy evaluator" in prompt:
+        return {**GUARDRAIL_ANSWER, **POLICY_ANSWER}
+    if "clinical document classifier" in prompt:
+        return GUARDRAIL_ANSWER
+    if "insurance policy evaluator" in prompt:
+        return POLICY_ANSWER
+    return VALIDATOR_ANSWER
+
+
+def parse_latency(spec: Union[str, float]) -> Callable[[random.Random], float]:
+    """
+    Turn a latency spec into a sampler of delays in seconds.
+    """
+    if isinstance(spec, (int, float)):
+        spec = f"fixed:{spec}"
+    kind, _, args = spec.partition(":")
+    params = [float(x) for x in args.split(",") if x]
+    if kind == "fixed":
+        return lambda rng: params[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(params[0], params[1]))
+    if kind == "lognormal":
+        return lambda rng: params[0] * math.exp(rng.gauss(0.0, params[1]))
+    raise ValueError(f"Unknown latency distribution '{kind}'; use fixed, uniform, normal or lognormal.")
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic (per seed) local chat model with canned structured answers.
+    """
+    latency: str = "fixed:0.3"
+    seed: int = 0
+    # Share of answers that are not JSON, so the fixing parser makes a repair call.
+    malformed_rate: float = 0.0
+    # Share of calls failing with a connection error, for failover tests.
+    failure_rate: float = 0.0
+    chunk_size: int = 8
+    calls: int = 0
+
+    _rng: random.Random = PrivateAttr()
+    _sample: Callable[[random.Random], float] = PrivateAttr()
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._rng = random.Random(self.seed)
+        self._sample = parse_latency(self.latency)
+
+    @property
+    def _llm_type(self) -> str:
+        return "medicheck-fake"
+
+    def _should_stream(self, *, async_api: bool, run_manager: Any = None, **kwargs: Any) -> bool:
+        # Like ChatGroq: JSON mode is not streamed, astream() yields the whole answer at once.
+        if "response_format" in kwargs:
+            return False
+        return super()._should_stream(async_api=async_api, run_manager=run_manager, **kwargs)
+
+    def bind_tools(self, tools: Sequence[Any], tool_choice: Optional[str] = None, **kwargs: Any) -> Runnable:
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _answer(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        """
+        With response_format or tools bound (structured output) the answer is always valid,
+        as the provider guarantees; otherwise malformed_rate of the answers are malformed.
+        """
+        self.calls += 1
+        prompt = "\n".join(str(m.content) for m in messages)
+        answer = canned_answer(prompt)
+        structured = "response_format" in kwargs or "tools" in kwargs
+        # Repair prompts quote the malformed completion; always answer them properly.
+        if not structured and self.malformed_rate and "Completion:" not in prompt and self._rng.random() < self.malformed_rate:
+            text = malformed_answer(answer, self._rng.choice(MALFORMED_KINDS))
+        else:
+            text = json.dumps(answer)
+        usage = {
+            "input_tokens": estimate_tokens(prompt),
+            "output_tokens": estimate_tokens(text),
+            "total_tokens": estimate_tokens(prompt) + estimate_tokens(text),
+        }
+        if "tools" in kwargs:
+            name = kwargs["tools"][0]["function"]["name"]
+            return AIMessage(content="", tool_calls=[{"name": name, "args": answer, "id": f"call_{self.calls}"}], usage_metadata=usage)
+        return AIMessage(content=text, usage_metadata=usage)
+
+    def _chunks(self, message: AIMessage) -> List[AIMessageChunk]:
+        text = message.content
+        chunks = [AIMessageChunk(content=text[i:i + self.chunk_size]) for i in range(0, len(text), self.chunk_size)]
+        chunks[-1] = AIMessageChunk(content=chunks[-1].content, usage_metadata=message.usage_metadata)
+        return chunks
+
+    def _fail(self) -> None:
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise ConnectionError("fake backend unavailable")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._sample(self._rng))
+        self._fail()
+        return ChatResult(generations=[ChatGeneration(message=self._answer(messages, **kwargs))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._sample(self._rng))
+        self._fail()
+        return ChatResult(generations=[ChatGeneration(message=self._answer(messages, **kwargs))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        delay = self._sample(self._rng)
+        self._fail()
+        chunks = self._chunks(self._answer(messages, **kwargs))
+        # First chunk after a fifth of the delay, the rest spread evenly over the remainder.
+        time.sleep(delay / 5)
+        for chunk in chunks:
+            yield ChatGenerationChunk(message=chunk)
+            time.sleep(delay * 4 / 5 / len(chunks))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        delay = self._sample(self._rng)
+        self._fail()
+        chunks = self._chunks(self._answer(messages, **kwargs))
+        await asyncio.sleep(delay / 5)
+        for chunk in chunks:
+            yield ChatGenerationChunk(message=chunk)
+            await asyncio.sleep(delay * 4 / 5 / len(chunks))
+
+
+def fake_llm_factory(
+    latency: Union[str, float] = "fixed:0.3",
+    seed: int = 0,
+    malformed_rate: float = 0.0,
+    pool_size: int = 1,
+    hedge: bool = False,
+    primary_failure_rate: float = 0.0,
+) -> Callable[..., GroqLLM]:
+    """
+    An llm_factory for the registry building GroqLLM clients backed by FakeChatModel, or by an
+    LLMPool of them (hedge delay, failure threshold and cooldown from the MEDICHECK_LLM_* settings).
+    """
+    spec = latency if isinstance(latency, str) else f"fixed:{latency}"
+
+    def factory(model: str, temperature: float) -> GroqLLM:
+        if pool_size <= 1 and not hedge:
+            chat_model = FakeChatModel(latency=spec, seed=seed, malformed_rate=malformed_rate, failure_rate=primary_failure_rate)
+            return GroqLLM(model=model, temperature=temperature, chat_model=chat_model)
+        settings = get_settings()
+        chat_model = LLMPool(
+            backends=[
+                FakeChatModel(latency=spec, seed=seed + i, malformed_rate=malformed_rate, failure_rate=primary_failure_rate if i == 0 else 0.0)
+                for i in range(max(1, pool_size))
+            ],
+            names=[f"fake-{i}" for i in range(max(1, pool_size))],
+            hedge=hedge,
+            hedge_delay=settings.llm_hedge_delay_ms / 1000,
+            failure_threshold=settings.llm_failure_threshold,
+            cooldown=settings.llm_cooldown_seconds,
+        )
+        return GroqLLM(model=model, temperature=temperature, chat_model=chat_model)
+    return factory
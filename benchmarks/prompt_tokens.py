@@ -0,0 +1,85 @@
+"""
+Per-stage prompt size before/after compact, field-projected payloads, over the sample
+summaries in policy_data/. Token counts use app.utils.llm.estimate_tokens (~4 chars/token);
+parser format instructions are identical on both sides and left out.
+
+    poetry run python benchmarks/prompt_tokens.py
+"""
+import glob
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pydantic import ValidationError
+from app.models.clinical_summary import ClinicalSummary
+from app.prompts.guardrail_prompt import GUARDRAIL_PROMPT
+from app.prompts.policy_eval_prompt import POLICY_EVAL_PROMPT
+from app.prompts.policy_judgement_prompt import POLICY_JUDGEMENT_PROMPT
+from app.prompts.validator_suggestion_prompt import VALIDATOR_SUGGESTION_PROMPT
+from app.services.policy_registry import get_policy_registry
+from app.utils.llm import estimate_tokens
+from app.utils.prompt_payload import build_payload
+from policy_data.default_policy import INSURANCE_POLICY
+
+POLICY_DATA = os.path.join(os.path.dirname(__file__), "..", "policy_data")
+JUDGEMENT_CRITERIA = "\n".join(f"- {rule.description}" for rule in get_policy_registry().get("default").rules if rule.is_judgement)
+
+
+def missing_fields(data):
+    try:
+        ClinicalSummary.model_validate(data)
+        return []
+    except ValidationError as e:
+        return [".".join(str(x) for x in err["loc"]) for err in e.errors()]
+
+
+def stage_prompts(data):
+    """
+    Yields (stage, before, after) prompt pairs for the stages this sample would reach.
+    """
+    indented = json.dumps(data, indent=2)
+    yield (
+        "guardrail",
+        GUARDRAIL_PROMPT.format(json_data=indented),
+        GUARDRAIL_PROMPT.format(json_data=build_payload(data, "guardrail")),
+    )
+    missing = missing_fields(data)
+    if missing:
+        yield (
+            "validator",
+            VALIDATOR_SUGGESTION_PROMPT.format(data=indented, missing_fields=missing),
+            VALIDATOR_SUGGESTION_PROMPT.format(data=build_payload(data, "validator", missing), missing_fields=missing),
+        )
+        return
+    yield (
+        "policy",
+        POLICY_EVAL_PROMPT.format(policy=INSURANCE_POLICY, patient_json=indented),
+        POLICY_EVAL_PROMPT.format(policy=INSURANCE_POLICY, patient_json=build_payload(data, "policy")),
+    )
+    yield (
+        "policy_judgement",
+        POLICY_EVAL_PROMPT.format(policy=INSURANCE_POLICY, patient_json=indented),
+        POLICY_JUDGEMENT_PROMPT.format(criteria=JUDGEMENT_CRITERIA, patient_json=build_payload(data, "policy_judgement")),
+    )
+
+
+def main():
+    print(f"{'sample':<32} {'stage':<18} {'before':>7} {'after':>7} {'saved':>7}")
+    totals = {}
+    for path in sorted(glob.glob(os.path.join(POLICY_DATA, "*.json"))):
+        with open(path) as f:
+            data = json.load(f)
+        for stage, before, after in stage_prompts(data):
+            b, a = estimate_tokens(before), estimate_tokens(after)
+            tb, ta = totals.get(stage, (0, 0))
+            totals[stage] = (tb + b, ta + a)
+            print(f"{os.path.basename(path):<32} {stage:<18} {b:>7} {a:>7} {1 - a / b:>7.0%}")
+    print()
+    for stage, (b, a) in totals.items():
+        print(f"{'TOTAL':<32} {stage:<18} {b:>7} {a:>7} {1 - a / b:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
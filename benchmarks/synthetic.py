@@ -0,0 +1,181 @@
+"""
+Synthetic clinical summary payloads for the benchmarks, reproducible per seed:
+
+- "eligible":     schema-valid, passes every mechanical policy rule (reaches the judgement LLM call)
+- "ineligible":   schema-valid, fails one mechanical rule (denied by the local rules)
+- "invalid":      a few required fields removed or mistyped (validation failure)
+- "non_clinical": JSON that is not a clinical summary (guardrail rejection)
+- "large":        eligible, with hundreds of procedures and lab results
+
+Every payload gets a unique patient, so the result cache never serves one payload for another.
+"""
+import random
+import typing
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.models.clinical_summary import ClinicalSummary
+
+KINDS = ("eligible", "ineligible", "invalid", "non_clinical", "large")
+# Default mix: mostly claims that need the LLM, some rule denials, rejections and large payloads.
+DEFAULT_MIX = {"eligible": 0.4, "ineligible": 0.2, "invalid": 0.25, "non_clinical": 0.1, "large": 0.05}
+
+FIRST_NAMES = ("Alice", "Ravi", "Maria", "John", "Aisha", "Chen", "Fatima", "Lukas", "Priya", "Omar")
+LAST_NAMES = ("Green", "Patel", "Garcia", "Smith", "Khan", "Wang", "Rossi", "Nguyen", "Müller", "Okafor")
+COMPLAINTS = (
+    ("Shortness of breath", ["Cough", "Fever"], "Pneumonia", "J18.9", "Bronchoscopy", "CT Chest"),
+    ("Chest pain", ["Sweating", "Nausea"], "Unstable angina", "I20.0", "Coronary angiography", "ECG"),
+    ("Abdominal pain", ["Vomiting"], "Acute cholecystitis", "K81.0", "Laparoscopic cholecystectomy", "Ultrasound Abdomen"),
+    ("Knee pain", ["Swelling", "Stiffness"], "Osteoarthritis of knee", "M17.11", "Knee arthroscopy", "MRI Knee"),
+)
+LABS = ("CBC", "CMP", "Lipid panel", "HbA1c", "X-Ray", "CT", "MRI", "Urinalysis")
+PHYSICIANS = ("Dr. Patel", "Dr. Allen", "Dr. Chen", "Dr. Rossi", "Dr. Okafor")
+
+
+def _day(report_date: date, rng: random.Random, max_days_before: int = 30) -> str:
+    return (report_date - timedelta(days=rng.randint(1, max_days_before))).isoformat()
+
+
+def eligible(rng: random.Random, procedures: int = 1, labs: int = 2) -> Dict[str, Any]:
+    complaint, symptoms, diagnosis, icd, procedure, imaging = rng.choice(COMPLAINTS)
+    report = date(2024, 1, 1) + timedelta(days=rng.randint(0, 365))
+    physician = rng.choice(PHYSICIANS)
+    return {
+        "patient_demographics": {
+            "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "age": rng.randint(51, 90),
+            "gender": rng.choice(("Female", "Male")),
+            "weight": round(rng.uniform(45.0, 79.5), 1),
+            "insurance_id": f"INS-{rng.randint(0, 10**9):09d}",
+            "alcohol_use": False,
+            "smoking": False,
+            "substance_addiction": False,
+        },
+        "hpi": {
+            "chief_complaint": complaint,
+            "duration": f"{rng.randint(1, 14)} days",
+            "onset": rng.choice(("Sudden", "Gradual")),
+            "associated_symptoms": symptoms,
+            "documentation_date": _day(report, rng),
+            "vitals": {
+                "blood_pressure": f"{rng.randint(105, 135)}/{rng.randint(65, 85)}",
+                "heart_rate": rng.randint(60, 95),
+                "temperature": round(rng.uniform(36.4, 37.4), 1),
+            },
+        },
+        "past_medical_history": {
+            "chronic_illnesses": rng.sample(["Hypertension", "Type 2 diabetes", "Asthma", "Hypothyroidism"], 2),
+            "surgical_history": [],
+            "allergies": ["None"],
+            "medication_history": ["Amlodipine"],
+        },
+        "procedures_treatments": [
+            {
+                "date": _day(report, rng),
+                "procedure_name": procedure if i == 0 else f"{procedure} follow-up {i}",
+                "performing_physician": physician,
+                "justification": f"Evaluate {complaint.lower()}",
+                "referral_note_attached": i == 0,
+            }
+            for i in range(procedures)
+        ],
+        "imaging_lab_results": [
+            {
+                "type": imaging if i == 0 else rng.choice(LABS),
+                "date": _day(report, rng),
+                "findings": f"Finding {i}: consistent with {diagnosis.lower()}",
+            }
+            for i in range(labs)
+        ],
+        "diagnosis_discharge_summary": {
+            "final_diagnosis": diagnosis,
+            "icd_10_code": icd,
+            "treatment_summary": "Supportive care and procedure as documented",
+            "discharge_plan": f"Follow-up in {rng.randint(1, 4)} weeks",
+        },
+        "physician_signature": {
+            "attending_physician": physician,
+            "date_of_report": report.isoformat(),
+            "digital_signature": f"{physician.split()[-1].upper()}{report.year}SIG",
+        },
+    }
+
+
+def ineligible(rng: random.Random) -> Dict[str, Any]:
+    data = eligible(rng)
+    rule = rng.choice(("age", "weight", "smoking", "alcohol_use", "referral"))
+    if rule == "age":
+        data["patient_demographics"]["age"] = rng.randint(18, 50)
+    elif rule == "weight":
+        data["patient_demographics"]["weight"] = round(rng.uniform(80.0, 130.0), 1)
+    elif rule == "referral":
+        data["procedures_treatments"][0]["referral_note_attached"] = False
+    else:
+        data["patient_demographics"][rule] = True
+    return data
+
+
+def _required_fields(section: str) -> List[str]:
+    model = ClinicalSummary.model_fields[section].annotation
+    if typing.get_origin(model) is list:
+        model = typing.get_args(model)[0]
+    return [name for name, field in model.model_fields.items() if field.is_required()]
+
+
+def invalid(rng: random.Random) -> Dict[str, Any]:
+    data = eligible(rng)
+    for _ in range(rng.randint(1, 4)):
+        section = rng.choice(list(data))
+        value = data[section]
+        target = value[0] if isinstance(value, list) else value
+        if section == "patient_demographics" and rng.random() < 0.2:
+            target["age"] = "unknown"
+            continue
+        present = [name for name in _required_fields(section) if name in target]
+        if present:
+            del target[rng.choice(present)]
+    return data
+
+
+def non_clinical(rng: random.Random) -> Dict[str, Any]:
+    kind = rng.choice(("invoice", "order", "profile"))
+    if kind == "invoice":
+        return {
+            "invoice_number": f"INV-{rng.randint(1000, 9999)}",
+            "customer": {"name": rng.choice(LAST_NAMES) + " Ltd", "vat_id": f"GB{rng.randint(10**8, 10**9)}"},
+            "lines": [{"sku": f"SKU-{i}", "quantity": rng.randint(1, 5), "unit_price": round(rng.uniform(1, 100), 2)} for i in range(rng.randint(1, 6))],
+            "due": "2024-07-01",
+        }
+    if kind == "order":
+        return {"order_id": rng.randint(1, 10**6), "items": rng.sample(["book", "lamp", "desk", "pen"], 2), "shipping": {"city": "Pune", "express": rng.random() < 0.5}}
+    return {"username": f"user{rng.randint(1, 10**6)}", "followers": rng.randint(0, 5000), "bio": "Coffee, code and cats."}
+
+
+def large(rng: random.Random, items: int = 300) -> Dict[str, Any]:
+    return eligible(rng, procedures=items, labs=items)
+
+
+BUILDERS = {"eligible": eligible, "ineligible": ineligible, "invalid": invalid, "non_clinical": non_clinical, "large": large}
+
+
+def generate(count: int, seed: int = 0, mix: Optional[Dict[str, float]] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    `count` (kind, payload) pairs drawn from `mix` (kind -> weight, default DEFAULT_MIX).
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds: Sequence[str] = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    return [(kind, BUILDERS[kind](rng)) for kind in rng.choices(kinds, weights=weights, k=count)]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """
+    "eligible=3,invalid=1" -> {"eligible": 3.0, "invalid": 1.0}; a bare kind means weight 1.
+    """
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.strip().partition("=")
+        if kind not in BUILDERS:
+            raise ValueError(f"Unknown payload kind '{kind}'; use one of: {', '.join(KINDS)}.")
+        mix[kind] = float(weight) if weight else 1.0
+    return mix
@@ -18,4 +18,47 @@ Supporting Evidence
 - Recent lab results are available and relevant.
   - Blood tests, imaging reports, or diagnostic scans.
 - Procedure is recommended by a treating physician.
-- Referral note or clinical summary is attached. """
\ No newline at end of file
+- Referral note or clinical summary is attached. """
+
+# Structured form of INSURANCE_POLICY for the local rule engine (app/services/policy_rules.py).
+# Each criterion either names a field path in ClinicalSummary and an operator, or is marked
+# "judgement" and is left to the LLM. Paths use "[*]" to address every item of a list section.
+# Only criteria the policy states exactly, on fields the schema requires (or whose default is
+# the compliant value), deny a claim locally when they fail. The others are shortcuts that
+# settle a claim that clearly meets them and otherwise hand the criterion to the LLM
+# ("on_fail": "judgement"): what counts as recent, clear or attached is the policy's wording,
+# not a fixed rule.
+POLICY_CRITERIA = [
+    {"id": "age_over_50", "description": "Age is greater than 50 years.",
+     "field": "patient_demographics.age", "op": "gt", "value": 50},
+    {"id": "weight_under_80kg", "description": "Weight is less than 80 kg.",
+     "field": "patient_demographics.weight", "op": "lt", "value": 80},
+    {"id": "no_alcohol", "description": "No history of alcohol consumption.",
+     "field": "patient_demographics.alcohol_use", "op": "is_false"},
+    {"id": "no_smoking", "description": "No history of smoking.",
+     "field": "patient_demographics.smoking", "op": "is_false"},
+    {"id": "no_substance_addiction", "description": "No history of substance addiction.",
+     "field": "patient_demographics.substance_addiction", "op": "is_false"},
+    {"id": "symptoms_documented", "description": "Clear documentation of symptoms.",
+     "field": "hpi.documentation_date", "op": "present", "on_fail": "judgement"},
+    {"id": "symptoms_recent", "description": "Recent documentation of symptoms.",
+     "field": "hpi.documentation_date", "op": "within_days", "value": 90,
+     "reference": "physician_signature.date_of_report", "on_fail": "judgement"},
+    {"id": "vitals_recorded", "description": "Vital signs (blood pressure, heart rate, temperature) are recorded.",
+     "field": "hpi.vitals", "op": "present", "on_fail": "judgement"},
+    {"id": "vitals_stable", "description": "Recorded vital signs are stable.",
+     "judgement": True},
+    {"id": "history_supports_procedure", "description": "Medical history supports the need for the procedure.",
+     "judgement": True},
+    {"id": "lab_results_available", "description": "Lab results (blood tests, imaging reports, or diagnostic scans) are available.",
+     "field": "imaging_lab_results", "op": "present", "on_fail": "judgement"},
+    {"id": "lab_results_recent", "description": "Lab results are recent.",
+     "field": "imaging_lab_results[*].date", "op": "within_days", "value": 90,
+     "reference": "physician_signature.date_of_report", "on_fail": "judgement"},
+    {"id": "lab_results_relevant", "description": "Lab results are relevant to the diagnosis and procedure.",
+     "judgement": True},
+    {"id": "procedure_recommended", "description": "Procedure is recommended by a treating physician.",
+     "field": "procedures_treatments[*].performing_physician", "op": "all_present", "on_fail": "judgement"},
+    {"id": "referral_note_attached", "description": "Referral note or clinical summary is attached.",
+     "field": "procedures_treatments[*].referral_note_attached", "op": "any_true", "on_fail": "judgement"},
+]
@@ -0,0 +1,81 @@
+import os
+import random
+import pytest
+
+# Tests never call Groq and never touch the .medicheck/ stores of a development checkout.
+os.environ["GROQ_API_KEY"] = "test-key"
+os.environ["MEDICHECK_JOB_WORKERS"] = "0"
+
+from fake_llm import fake_llm_factory  # noqa: E402
+from synthetic import eligible  # noqa: E402
+from app.utils.metrics import metrics  # noqa: E402
+from app.utils.registry import registry  # noqa: E402
+from app.utils.settings import get_settings  # noqa: E402
+
+
+def clear_process_caches() -> None:
+    from app.services.decision_index import get_decision_index
+    from app.services.jobs import get_job_store
+    from app.services.policy_registry import get_policy_registry
+    from app.utils.cache import get_result_cache
+    from app.utils.llm import get_scheduler
+    for cached in (get_settings, get_result_cache, get_decision_index, get_job_store, get_policy_registry, get_scheduler):
+        cached.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """
+    Every test starts with default settings, an in-memory result cache, SQLite stores under
+    its own tmp_path, fresh metrics and caches.
+    """
+    for name in list(os.environ):
+        if name.startswith("MEDICHECK_"):
+            monkeypatch.delenv(name)
+    monkeypatch.setenv("MEDICHECK_JOB_WORKERS", "0")
+    monkeypatch.setenv("MEDICHECK_CACHE_PATH", str(tmp_path / "result_cache.sqlite3"))
+    monkeypatch.setenv("MEDICHECK_JOBS_DB_PATH", str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setenv("MEDICHECK_LLM_RATE_LIMIT_PATH", str(tmp_path / "rate_limit.sqlite3"))
+    clear_process_caches()
+    metrics.reset()
+    yield
+    clear_process_caches()
+
+
+@pytest.fixture
+def configure(monkeypatch):
+    """
+    Set MEDICHECK_* settings for the test: configure(cache_backend="sqlite", llm_rpm=60).
+    """
+    def apply(**settings):
+        for name, value in settings.items():
+            monkeypatch.setenv(f"MEDICHECK_{name.upper()}", str(value).lower() if isinstance(value, bool) else str(value))
+        clear_process_caches()
+    return apply
+
+
+@pytest.fixture
+def fake_llm():
+    """
+    Route every LLM client built by the registry to the benchmarks' FakeChatModel; returns a
+    function (re)installing it with other FakeChatModel options.
+    """
+    original = registry.llm_factory
+
+    def install(latency="fixed:0", **options):
+        registry.llm_factory = fake_llm_factory(latency=latency, **options)
+        registry.reload()
+        metrics.reset()
+
+    install()
+    yield install
+    registry.llm_factory = original
+    registry.reload()
+
+
+@pytest.fixture
+def claim():
+    """
+    A schema-valid claim that meets the default policy's mechanical criteria.
+    """
+    return eligible(random.Random(7))
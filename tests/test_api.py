@@ -0,0 +1,160 @@
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(configure, fake_llm):
+    from app.main import app
+    configure(max_summary_bytes=4096, max_batch_bytes=64 * 1024)
+    with TestClient(app) as client:
+        yield client
+
+
+def multipart(contents: bytes, filename: str = "summary.json", content_type: str = "application/json"):
+    boundary = "medicheck-test-boundary"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + contents + f"\r\n--{boundary}--\r\n".encode()
+    return body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+def chunked(body: bytes, size: int = 1024):
+    # A generator body is sent without Content-Length (chunked transfer encoding).
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def test_validate_summary_from_body_and_upload(client, claim):
+    response = client.post("/api/validate-summary", content=json.dumps(claim))
+    assert response.status_code == 200
+    result = response.json()
+    assert result["insurance_summary"] and result["valid_summary"]
+    body, headers = multipart(json.dumps(claim).encode())
+    uploaded = client.post("/api/validate-summary", content=body, headers=headers)
+    assert uploaded.status_code == 200 and uploaded.json() == result
+
+
+def test_invalid_inputs_are_rejected(client):
+    assert client.post("/api/validate-summary", content=b"{not json").status_code == 400
+    body, headers = multipart(b"{}", filename="notes.txt", content_type="text/plain")
+    assert client.post("/api/validate-summary", content=body, headers=headers).status_code == 400
+    assert client.post("/api/validate-summary?mode=turbo", content=b"{}").status_code == 400
+    assert client.post("/api/validate-summary?policy_id=nope", content=b"{}").status_code == 400
+
+
+def test_declared_oversize_body_is_rejected_before_reading(client):
+    body = b"[" + b" " * 5000 + b"]"
+    assert client.post("/api/validate-summary", content=body).status_code == 413
+    upload, headers = multipart(b"{" + b" " * 30000 + b"}")
+    assert client.post("/api/validate-summary", content=upload, headers=headers).status_code == 413
+
+
+def post_chunked(path: str, body: bytes, headers: dict, chunk_size: int = 1024):
+    """
+    POST to the app over ASGI without Content-Length, one chunk per receive; returns the
+    status code and how many body bytes the app pulled before answering.
+    """
+    from app.main import app
+    chunks = list(chunked(body, chunk_size))
+    sent = []
+    status = []
+
+    async def receive():
+        if len(sent) < len(chunks):
+            sent.append(chunks[len(sent)])
+            return {"type": "http.request", "body": sent[-1], "more_body": len(sent) < len(chunks)}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    return status[0], sum(map(len, sent))
+
+
+def test_undeclared_oversize_upload_is_rejected_while_streaming(client):
+    upload, headers = multipart(b'{"padding": "' + b"x" * 200_000 + b'"}')
+    status, received = post_chunked("/api/validate-summary", upload, headers)
+    # Parsing stopped at the limit instead of spooling the whole upload first.
+    assert status == 413 and received < 32 * 1024
+    status, received = post_chunked("/api/validate-batch", upload * 2, headers)
+    assert status == 413 and received < 128 * 1024
+
+
+def test_upload_just_over_the_summary_limit_is_rejected(client):
+    upload, headers = multipart(b'{"padding": "' + b"x" * 5000 + b'"}')
+    response = client.post("/api/validate-summary", content=chunked(upload), headers=headers)
+    assert response.status_code == 413
+    assert "Uploaded file" in response.json()["detail"]
+
+
+def test_validate_batch_json_array_and_ndjson(client, claim):
+    response = client.post("/api/validate-batch", content=json.dumps([claim, claim]))
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(record["index"] for record in records) == [0, 1]
+    assert all(record["ok"] for record in records)
+    ndjson = json.dumps(claim) + "\nnot json\n"
+    response = client.post("/api/validate-batch", content=ndjson, headers={"Content-Type": "application/x-ndjson"})
+    records = {record["index"]: record for record in map(json.loads, response.text.splitlines())}
+    assert records[0]["ok"] and not records[1]["ok"]
+    upload, headers = multipart(ndjson.encode(), filename="claims.ndjson", content_type="application/octet-stream")
+    response = client.post("/api/validate-batch", content=upload, headers=headers)
+    assert len(response.text.splitlines()) == 2
+    assert client.post("/api/validate-batch", content=b'{"not": "a list"}').status_code == 400
+
+
+@pytest.fixture
+def spooled(monkeypatch):
+    """
+    Every temporary file the endpoints spool request bodies and multipart uploads into.
+    """
+    import tempfile
+    from starlette import formparsers
+    files = []
+
+    class Tracked(tempfile.SpooledTemporaryFile):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            files.append(self)
+    monkeypatch.setattr(tempfile, "SpooledTemporaryFile", Tracked)
+    monkeypatch.setattr(formparsers, "SpooledTemporaryFile", Tracked)
+    return files
+
+
+@pytest.mark.parametrize("path", ["/api/validate-batch", "/api/jobs"])
+def test_batch_inputs_are_closed_once_read(client, claim, spooled, path):
+    ndjson = (json.dumps(claim) + "\n") * 2
+    client.post(path, content=ndjson, headers={"Content-Type": "application/x-ndjson"})
+    client.post(path, content=json.dumps([claim]))
+    client.post(path, content=b"[not json")
+    body, headers = multipart(ndjson.encode(), filename="claims.ndjson", content_type="application/x-ndjson")
+    client.post(path, content=body, headers=headers)
+    body, headers = multipart(b"<xml/>", filename="claims.xml", content_type="application/xml")
+    assert client.post(path, content=body, headers=headers).status_code == 400
+    assert len(spooled) == 5 and all(file.closed for file in spooled)
+
+
+def test_stream_emits_stage_events_then_the_result(client, claim):
+    response = client.post("/api/validate-summary/stream", content=json.dumps(claim))
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line.split(": ", 1)[1] for line in response.text.splitlines() if line.startswith("event: ")]
+    assert events[0] == "guardrail" and events[-1] == "result"
+    assert "policy" in events
+
+
+def test_policies_stats_and_metrics(client, claim):
+    policies = client.get("/api/policies").json()
+    assert policies["default"] in [policy["id"] for policy in policies["policies"]]
+    client.post("/api/validate-summary", content=json.dumps(claim))
+    stats = client.get("/api/stats").json()
+    assert stats["cache"]["entries"] is not None
+    assert "guardrail_decisions_total" in client.get("/metrics").text
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from app.utils.cache import MemoryCacheBackend, ResultCache, SQLiteCacheBackend
+
+
+def test_make_key_depends_on_every_part():
+    assert ResultCache.make_key("policy", "a", {"x": 1}) == ResultCache.make_key("policy", "a", {"x": 1})
+    assert ResultCache.make_key("policy", "a", {"x": 1}) != ResultCache.make_key("policy", "a", {"x": 2})
+    assert ResultCache.make_key("policy", "a") != ResultCache.make_key("guardrail", "a")
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2, ttl_seconds=60)
+    backend.set("a", {"v": 1})
+    backend.set("b", {"v": 2})
+    backend.get("a")
+    backend.set("c", {"v": 3})
+    assert backend.get("b") is None
+    assert backend.get("a") == {"v": 1}
+
+
+def test_memory_backend_expires_entries():
+    backend = MemoryCacheBackend(max_entries=10, ttl_seconds=0)
+    backend.set("a", {"v": 1})
+    assert backend.get("a") is None
+
+
+def test_sqlite_backend_round_trip_and_expiry(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_entries=10, ttl_seconds=60)
+    backend.set("a", {"v": [1, 2]})
+    assert backend.get("a") == {"v": [1, 2]}
+    expired = SQLiteCacheBackend(str(tmp_path / "expired.sqlite3"), max_entries=10, ttl_seconds=0)
+    expired.set("a", {"v": 1})
+    assert expired.get("a") is None
+
+
+def test_sqlite_hit_touches_only_stale_access_times(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_entries=10, ttl_seconds=60, touch_interval=60)
+    backend.set("a", {"v": 1})
+    conn = backend._connect()
+    (written,) = conn.execute("SELECT accessed_at FROM result_cache WHERE key = 'a'").fetchone()
+    backend.get("a")
+    assert conn.execute("SELECT accessed_at FROM result_cache WHERE key = 'a'").fetchone() == (written,)
+    conn.execute("UPDATE result_cache SET accessed_at = accessed_at - 120")
+    backend.get("a")
+    (touched,) = conn.execute("SELECT accessed_at FROM result_cache WHERE key = 'a'").fetchone()
+    assert touched >= written
+
+
+def test_sqlite_evicts_every_n_inserts(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_entries=3, ttl_seconds=60, touch_interval=0, evict_every=2)
+    for i in range(4):
+        backend.set(f"k{i}", {"v": i})
+        time.sleep(0.002)
+    assert len(backend) == 3
+    backend.get("k1")
+    backend.set("k4", {"v": 4})
+    assert len(backend) == 4  # over the limit until the next eviction pass
+    backend.set("k5", {"v": 5})
+    assert len(backend) == 3
+    assert backend.get("k1") == {"v": 1}
+    assert backend.get("k0") is None
+
+
+def test_sqlite_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    SQLiteCacheBackend(path, max_entries=10, ttl_seconds=60).set("a", {"v": 1})
+    assert SQLiteCacheBackend(path, max_entries=10, ttl_seconds=60).get("a") == {"v": 1}
+
+
+def test_async_access_to_sqlite_runs_off_the_event_loop(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_entries=10, ttl_seconds=60)
+    cache = ResultCache(backend)
+    threads = []
+    original_get = backend.get
+
+    def get(key):
+        threads.append(threading.get_ident())
+        return original_get(key)
+
+    backend.get = get
+
+    async def run():
+        await cache.aset("policy", "k", {"v": 1})
+        return await cache.aget("policy", "k")
+
+    assert asyncio.run(run()) == {"v": 1}
+    assert threads and threads[0] != threading.get_ident()
@@ -0,0 +1,109 @@
+import csv
+import json
+import pytest
+from app.cli import Checkpoint, ResultWriter, iter_files, iter_summaries, main
+from app.services.batch import ItemError
+from app.services.ingest import ParsedSummary
+
+
+@pytest.fixture
+def inputs(tmp_path, claim):
+    """
+    A directory with one .json summary, an NDJSON file with a broken line and a file to skip.
+    """
+    root = tmp_path / "claims"
+    (root / "nested").mkdir(parents=True)
+    (root / "a.json").write_text(json.dumps(claim))
+    (root / "nested" / "b.ndjson").write_text(json.dumps(claim) + "\n\nnot json\n" + json.dumps(claim) + "\n")
+    (root / "notes.txt").write_text("ignored")
+    return root
+
+
+def run_cli(*argv):
+    with pytest.raises(SystemExit) as exit:
+        main([*map(str, argv), "--progress-interval", "0"])
+    return exit.value.code
+
+
+def read_ndjson(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_iter_files_walks_directories_and_globs_once(inputs):
+    files = list(iter_files([str(inputs), str(inputs / "*.json")]))
+    assert files == [str(inputs / "a.json"), str(inputs / "nested" / "b.ndjson")]
+
+
+def test_iter_summaries_names_each_item_and_reports_bad_ones(inputs):
+    items = list(iter_summaries([str(inputs)], max_bytes=1 << 20))
+    sources = [source for source, _ in items]
+    ndjson = str(inputs / "nested" / "b.ndjson")
+    assert sources == [str(inputs / "a.json"), f"{ndjson}:1", f"{ndjson}:3", f"{ndjson}:4"]
+    assert isinstance(items[0][1], ParsedSummary) and isinstance(items[2][1], ItemError)
+    oversized = list(iter_summaries([str(inputs / "a.json")], max_bytes=10))
+    assert isinstance(oversized[0][1], ItemError)
+
+
+def test_checkpoint_records_and_reloads_finished_items(tmp_path):
+    path = str(tmp_path / "run.checkpoint")
+    checkpoint = Checkpoint(path, restart=False)
+    checkpoint.record("a.json", True)
+    checkpoint.record("b.ndjson:3", False)
+    checkpoint.close()
+    resumed = Checkpoint(path, restart=False)
+    assert resumed.done("a.json", retry_failed=False) and resumed.done("a.json", retry_failed=True)
+    assert resumed.done("b.ndjson:3", retry_failed=False)
+    assert not resumed.done("b.ndjson:3", retry_failed=True)
+    assert not resumed.done("c.json", retry_failed=False)
+    resumed.close()
+    restarted = Checkpoint(path, restart=True)
+    restarted.close()
+    assert restarted.status == {} and (tmp_path / "run.checkpoint").read_text() == ""
+
+
+def test_csv_writer_flattens_results_and_writes_the_header_once(tmp_path):
+    path = str(tmp_path / "results.csv")
+    writer = ResultWriter(path, "csv", restart=False)
+    writer.write("a.json", {"index": 0, "ok": True, "result": {"approved": False, "missing_fields": ["hpi.onset", "hpi.vitals"]}})
+    writer.close()
+    writer = ResultWriter(path, "csv", restart=False)
+    writer.write("b.json", {"index": 1, "ok": False, "error": "Invalid JSON"})
+    writer.close()
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["source"] for row in rows] == ["a.json", "b.json"]
+    assert rows[0]["missing_fields"] == "hpi.onset; hpi.vitals" and rows[0]["approved"] == "False"
+    assert rows[1]["ok"] == "False" and rows[1]["error"] == "Invalid JSON"
+
+
+def test_run_writes_results_and_resumes_from_the_checkpoint(fake_llm, inputs, tmp_path):
+    output = tmp_path / "results.ndjson"
+    assert run_cli(inputs, "--output", output) == 1
+    records = read_ndjson(output)
+    assert len(records) == 4
+    assert sum(not record["ok"] for record in records) == 1
+    assert all("index" not in record for record in records)
+    checkpoint = (tmp_path / "results.ndjson.checkpoint").read_text().splitlines()
+    assert sorted(line.split("\t")[0] for line in checkpoint) == ["error", "ok", "ok", "ok"]
+
+    # A rerun skips everything already recorded and succeeds.
+    assert run_cli(inputs, "--output", output) == 0
+    assert len(read_ndjson(output)) == 4
+    # --retry-failed reruns only the failed line.
+    assert run_cli(inputs, "--output", output, "--retry-failed") == 1
+    rerun = read_ndjson(output)[4:]
+    assert [record["source"] for record in rerun] == [str(inputs / "nested" / "b.ndjson") + ":3"]
+    # --restart truncates the output and the checkpoint.
+    assert run_cli(inputs, "--output", output, "--restart") == 1
+    assert len(read_ndjson(output)) == 4
+
+
+def test_run_resumes_after_an_interruption(fake_llm, inputs, tmp_path):
+    output = tmp_path / "results.csv"
+    with open(str(output) + ".checkpoint", "w", encoding="utf-8") as f:
+        f.write(f"ok\t{inputs / 'a.json'}\n")
+    assert run_cli(inputs, "--output", output, "--concurrency", "2") == 1
+    with open(output, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert str(inputs / "a.json") not in [row["source"] for row in rows]
+    assert len(rows) == 3
@@ -0,0 +1,122 @@
+import asyncio
+import copy
+import pytest
+from app.services.decision_index import DecisionIndex, DecisionQuery, decision_fingerprint
+from app.services.ingest import ParsedSummary
+from app.services.policy import POLICY_JUDGEMENT_STAGE, aevaluate_policy, evaluate_policy
+from app.utils.metrics import metrics
+
+
+def same_case_other_patient(claim):
+    """
+    The claim for another patient, documented a week later and typed differently.
+    """
+    other = copy.deepcopy(claim)
+    other["patient_demographics"]["full_name"] = "Someone Else"
+    other["patient_demographics"]["insurance_id"] = "INS-000000001"
+    other["physician_signature"]["digital_signature"] = "OTHER2024SIG"
+    other["hpi"]["chief_complaint"] = "  " + claim["hpi"]["chief_complaint"].upper() + " "
+    other["past_medical_history"]["chronic_illnesses"].reverse()
+    for section, field in (("hpi", "documentation_date"), ("physician_signature", "date_of_report")):
+        day = int(other[section][field][-2:]) + 7
+        other[section][field] = other[section][field][:-2] + f"{day:02d}"
+    for item in other["procedures_treatments"] + other["imaging_lab_results"]:
+        day = int(item["date"][-2:]) + 7
+        item["date"] = item["date"][:-2] + f"{day:02d}"
+    return other
+
+
+def llm_calls() -> float:
+    return metrics.get("llm_calls_total", stage="policy_judgement") + metrics.get("llm_calls_total", stage="policy")
+
+
+def test_fingerprint_ignores_identifiers_dates_and_formatting(claim):
+    other = same_case_other_patient(claim)
+    assert decision_fingerprint(other, "policy_judgement") == decision_fingerprint(claim, "policy_judgement")
+
+
+@pytest.mark.parametrize("change", [
+    lambda claim: claim["patient_demographics"].update(age=claim["patient_demographics"]["age"] + 1),
+    lambda claim: claim["hpi"]["vitals"].update(heart_rate=claim["hpi"]["vitals"]["heart_rate"] + 20),
+    lambda claim: claim["hpi"].update(documentation_date="2023-01-01"),
+    lambda claim: claim["procedures_treatments"][0].update(performing_physician=""),
+])
+def test_fingerprint_keeps_what_the_decision_depends_on(claim, change):
+    changed = copy.deepcopy(claim)
+    change(changed)
+    assert decision_fingerprint(changed, "policy_judgement") != decision_fingerprint(claim, "policy_judgement")
+
+
+def test_equivalent_claim_reuses_the_decision(fake_llm, claim):
+    first = evaluate_policy(claim)
+    assert first["decision_path"] == "llm_judgement" and "decision_reuse" not in first
+    assert llm_calls() == 1
+    reused = evaluate_policy(same_case_other_patient(claim))
+    assert llm_calls() == 1
+    assert reused["decision_reuse"] == {"match": "fingerprint", "similarity": 1.0, "confidence": "high"}
+    assert reused["policy_approved"] == first["policy_approved"]
+    assert metrics.get("policy_decision_reuse_total", match="fingerprint") == 1
+
+
+def test_use_cache_false_and_index_off_call_the_llm(configure, fake_llm, claim):
+    evaluate_policy(claim)
+    evaluate_policy(same_case_other_patient(claim), use_cache=False)
+    assert llm_calls() == 2
+    configure(decision_index="off")
+    fake_llm()
+    evaluate_policy(claim)
+    evaluate_policy(same_case_other_patient(claim))
+    assert llm_calls() == 2
+    assert metrics.get("policy_decision_reuse_total", match="fingerprint") == 0
+
+
+def test_async_evaluation_reuses_the_decision(fake_llm, claim):
+    async def main():
+        await aevaluate_policy(claim)
+        return await aevaluate_policy(same_case_other_patient(claim))
+    reused = asyncio.run(main())
+    assert reused["decision_reuse"]["match"] == "fingerprint"
+    assert llm_calls() == 1
+
+
+def test_unparseable_answers_are_not_remembered(configure, fake_llm, claim, monkeypatch):
+    import fake_llm as fake
+    from app.services.policy import UNPARSEABLE_CRITERION
+    configure(structured_output="off", llm_output_fixing=False)
+    fake_llm(malformed_rate=1.0)
+    monkeypatch.setattr(fake, "malformed_answer", lambda answer, kind: fake.PROSE_ANSWER)
+    assert evaluate_policy(claim)["failed_criteria"] == [UNPARSEABLE_CRITERION]
+    retried = evaluate_policy(same_case_other_patient(claim))
+    assert "decision_reuse" not in retried
+    assert llm_calls() == 2
+
+
+def query(claim, parts=("policy",)) -> DecisionQuery:
+    return DecisionQuery.for_claim(POLICY_JUDGEMENT_STAGE, parts, ParsedSummary(claim))
+
+
+def test_similar_mode_matches_close_narratives_with_the_same_profile(claim):
+    index = DecisionIndex(None, similar=True, min_similarity=0.8, max_entries=10)
+    result = {"policy_approved": True, "failed_criteria": [], "policy_message": "ok"}
+    index.remember(query(claim), result)
+    close = copy.deepcopy(claim)
+    close["diagnosis_discharge_summary"]["discharge_plan"] += " and physiotherapy"
+    match = index.lookup(query(close))
+    assert match["decision_reuse"]["match"] == "similar"
+    assert 0.8 <= match["decision_reuse"]["similarity"] < 1.0
+    other_profile = copy.deepcopy(close)
+    other_profile["patient_demographics"]["age"] += 1
+    assert index.lookup(query(other_profile)) is None
+    assert index.lookup(query(close, parts=("another policy",))) is None
+
+
+def test_similar_mode_evicts_the_oldest_entries(claim):
+    index = DecisionIndex(None, similar=True, min_similarity=0.99, max_entries=2)
+    for age in (30, 40, 50):
+        variant = copy.deepcopy(claim)
+        variant["patient_demographics"]["age"] = age
+        index.remember(query(variant), {"age": age})
+    assert len(index) == 2
+    oldest = copy.deepcopy(claim)
+    oldest["patient_demographics"]["age"] = 30
+    assert index.lookup(query(oldest)) is None
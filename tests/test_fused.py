@@ -0,0 +1,43 @@
+import asyncio
+from app.services.fused import acheck_and_evaluate, check_and_evaluate
+from app.utils.metrics import metrics
+
+
+def test_structural_verdict_is_counted_once(fake_llm, claim):
+    guardrail, policies = check_and_evaluate(claim)
+    assert guardrail["decision_path"] == "structural_accept"
+    assert metrics.get("guardrail_decisions_total", path="structural_accept") == 1
+    assert metrics.get("guardrail_llm_calls_avoided_total") == 1
+    assert metrics.get("guardrail_decisions_total", path="llm_fused") == 0
+    assert len(policies) == 1
+
+
+def test_fused_prompt_without_the_fast_path(configure, fake_llm, claim):
+    configure(guardrail_fast_path=False)
+    guardrail, policies = check_and_evaluate(claim)
+    assert guardrail["decision_path"] == "llm_fused" and guardrail["is_insurance_summary"]
+    assert policies[0]["decision_path"] == "llm_fused" and policies[0]["policy_approved"]
+    assert metrics.get("guardrail_decisions_total", path="llm_fused") == 1
+    assert metrics.get("policy_decisions_total", path="llm_fused") == 1
+    assert metrics.get("guardrail_decisions_total", path="structural_accept") == 0
+    assert metrics.get("guardrail_decisions_total", path="llm") == 0
+    assert metrics.get("llm_calls_total", stage="guardrail_policy") == 1
+
+
+def test_async_fused_prompt_without_the_fast_path(configure, fake_llm, claim):
+    configure(guardrail_fast_path=False)
+    guardrail, policies = asyncio.run(acheck_and_evaluate(claim))
+    assert guardrail["decision_path"] == "llm_fused"
+    assert policies[0]["policy_id"] and policies[0]["decision_path"] == "llm_fused"
+    assert metrics.get("guardrail_decisions_total", path="llm_fused") == 1
+    assert metrics.get("llm_calls_total", stage="guardrail_policy") == 1
+
+
+def test_several_policies_are_not_fused(configure, fake_llm, claim):
+    from app.services.policy_registry import get_policy_registry
+    configure(guardrail_fast_path=False)
+    policy_ids = get_policy_registry().ids()[:2]
+    guardrail, policies = check_and_evaluate(claim, policy_ids=policy_ids)
+    assert guardrail["decision_path"] == "llm"
+    assert metrics.get("guardrail_decisions_total", path="llm") == 1
+    assert [policy["policy_id"] for policy in policies] == policy_ids
@@ -0,0 +1,264 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.services.batch import ItemError
+from app.services.jobs import JobStore, JobWorkerPool
+from app.utils.metrics import metrics
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def _job(store, *items):
+    job_id = store.create_job()
+    store.add_items(job_id, list(enumerate(items)))
+    store.seal_job(job_id)
+    return job_id
+
+
+def test_claim_complete_finishes_the_job(store, claim):
+    job_id = _job(store, claim)
+    item = store.claim("w1", lease_seconds=60)
+    assert (item["job_id"], item["index"], item["attempt"]) == (job_id, 0, 1)
+    assert store.claim("w1", lease_seconds=60) is None
+    assert store.complete(job_id, 0, item["lease"], {"approved": True})
+    assert store.status(job_id)["status"] == "completed"
+    assert list(store.results(job_id)) == [{"index": 0, "ok": True, "result": {"approved": True}}]
+
+
+def test_items_are_not_claimable_before_the_job_is_sealed(store, claim):
+    job_id = store.create_job()
+    store.add_items(job_id, [(0, claim)])
+    assert store.claim("w1", lease_seconds=60) is None
+    store.seal_job(job_id)
+    assert store.claim("w1", lease_seconds=60) is not None
+
+
+def test_undecodable_items_are_stored_as_failed(store):
+    job_id = _job(store, ItemError("Invalid JSON"))
+    assert store.status(job_id)["status"] == "completed"
+    assert list(store.results(job_id)) == [{"index": 0, "ok": False, "error": "Invalid JSON"}]
+
+
+def _finished_job(store, count):
+    job_id = _job(store, *[ItemError(f"bad {i}") for i in range(count)])
+    assert store.status(job_id)["status"] == "completed"
+    return job_id
+
+
+def test_results_can_be_consumed_across_threads(store):
+    # Starlette advances a sync iterator on whichever threadpool thread is free; no SQLite
+    # cursor may be carried from one thread to the next.
+    job_id = _finished_job(store, 5)
+    results = store.results(job_id, page_size=2)
+    records = [next(results)]
+    thread = threading.Thread(target=lambda: records.extend(results))
+    thread.start()
+    thread.join()
+    assert [record["index"] for record in records] == [0, 1, 2, 3, 4]
+
+
+def test_results_are_paged_within_offset_and_limit(store):
+    job_id = _finished_job(store, 7)
+    assert [r["index"] for r in store.results(job_id, offset=2, limit=4, page_size=3)] == [2, 3, 4, 5]
+    assert [r["index"] for r in store.results(job_id, page_size=7)] == list(range(7))
+
+    async def collect(**options):
+        return [r["index"] async for r in store.aresults(job_id, **options)]
+    assert asyncio.run(collect(offset=1, page_size=2)) == list(range(1, 7))
+    assert asyncio.run(collect(limit=3, page_size=2)) == [0, 1, 2]
+
+
+def test_every_claim_gets_its_own_lease(store, claim):
+    job_id = _job(store, claim)
+    first = store.claim("w1", lease_seconds=0)
+    second = store.claim("w1", lease_seconds=60)
+    assert second["attempt"] == 2 and second["lease"] != first["lease"]
+    # The same worker id, but the stale claim can neither extend nor record anything.
+    assert not store.renew(job_id, 0, first["lease"], 60)
+    assert not store.complete(job_id, 0, first["lease"], {"approved": True})
+    assert not store.fail(job_id, 0, first["lease"], "boom")
+    assert store.complete(job_id, 0, second["lease"], {"approved": False})
+    assert list(store.results(job_id))[0]["result"] == {"approved": False}
+
+
+def test_renewed_leases_are_not_reclaimed(store, claim):
+    job_id = _job(store, claim)
+    item = store.claim("w1", lease_seconds=0.05)
+    assert store.renew(job_id, 0, item["lease"], 60)
+    time.sleep(0.1)
+    assert store.claim("w2", lease_seconds=60) is None
+
+
+def test_expired_items_fail_after_max_attempts(store, claim):
+    job_id = _job(store, claim)
+    for attempt in (1, 2):
+        assert store.claim("w1", lease_seconds=0, max_attempts=2)["attempt"] == attempt
+    assert store.claim("w1", lease_seconds=0, max_attempts=2) is None
+    status = store.status(job_id)
+    assert (status["status"], status["failed"]) == ("completed", 1)
+    assert "Lease expired" in list(store.results(job_id))[0]["error"]
+
+
+def test_failed_items_retry_when_due(store, claim):
+    job_id = _job(store, claim)
+    item = store.claim("w1", lease_seconds=60)
+    assert store.fail(job_id, 0, item["lease"], "RateLimitError", retry_at=time.time() + 60)
+    assert store.claim("w1", lease_seconds=60) is None
+    store.fail(job_id, 0, item["lease"], "ignored")
+    store._connect().execute("UPDATE job_items SET available_at = 0")
+    assert store.claim("w1", lease_seconds=60)["attempt"] == 2
+
+
+def test_release_hands_back_the_workers_items(store, claim):
+    job_id = _job(store, claim, claim)
+    store.claim("w1", lease_seconds=60)
+    store.claim("w2", lease_seconds=60)
+    assert store.release("w1") == 1
+    item = store.claim("w3", lease_seconds=60)
+    assert item["attempt"] == 1
+    assert store.status(job_id)["running"] == 2
+
+
+def test_claim_queries_use_their_indexes(store):
+    conn = store._connect()
+    for query, index in ((store._EXPIRED_LEASE, "job_items_lease"), (store._DUE_PENDING, "job_items_claim")):
+        plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, (0,)))
+        assert f"USING INDEX {index}" in plan and "TEMP B-TREE" not in plan
+
+
+def test_prune_deletes_old_completed_jobs(store, claim):
+    done = _job(store, ItemError("bad"))
+    open_job = _job(store, claim)
+    assert store.prune(older_than=time.time() - 60) == 0
+    assert store.prune(older_than=time.time() + 1) == 1
+    assert store.status(done) is None and list(store.results(done)) == []
+    assert store.status(open_job)["status"] == "queued"
+
+
+def test_slow_items_keep_their_lease_and_complete_once(store, claim, fake_llm):
+    # LLM calls take longer than the lease: without the heartbeat a sibling worker would
+    # re-claim the item and both would complete it.
+    fake_llm(latency="fixed:0.5")
+    job_id = _job(store, claim)
+
+    async def run():
+        pool = JobWorkerPool(store, workers=2, max_attempts=3, lease_seconds=0.2, poll_interval=0.02)
+        pool.start()
+        try:
+            for _ in range(200):
+                if store.status(job_id)["status"] == "completed":
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await pool.stop()
+
+    asyncio.run(run())
+    assert store.status(job_id)["done"] == 1
+    assert metrics.get("job_items_total", outcome="done") == 1
+    assert metrics.get("job_items_total", outcome="lease_lost") == 0
+    assert metrics.get("llm_calls_total", stage="policy_judgement") == 1
+
+
+def test_transient_errors_are_retried(store, claim, fake_llm, monkeypatch):
+    fake_llm()
+    job_id = _job(store, claim)
+    calls = []
+
+    async def flaky(summary, **options):
+        calls.append(1)
+        if len(calls) == 1:
+            raise TimeoutError("upstream timed out")
+        return {"approved": True}
+
+    monkeypatch.setattr("app.flow_graph.langgraph.aprocess_clinical_summary", flaky)
+    pool = JobWorkerPool(store, workers=1, max_attempts=3, lease_seconds=60)
+    monkeypatch.setattr(pool, "_retry_delay", lambda attempt: 0)
+
+    async def run():
+        for _ in range(2):
+            await pool._process(store.claim(pool.worker_id, 60, 3))
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert list(store.results(job_id)) == [{"index": 0, "ok": True, "result": {"approved": True}}]
+    assert metrics.get("job_items_total", outcome="retried") == 1
+
+
+def test_items_run_with_the_jobs_mode_and_policies(store, claim, monkeypatch):
+    job_id = store.create_job(use_cache=False, mode="fused", policy_ids=["elective_surgery", "diagnostic_imaging"])
+    store.add_items(job_id, [(0, claim)])
+    store.seal_job(job_id)
+    calls = []
+
+    async def record(summary, **options):
+        calls.append(options)
+        return {"approved": True}
+
+    monkeypatch.setattr("app.flow_graph.langgraph.aprocess_clinical_summary", record)
+    pool = JobWorkerPool(store, workers=1, max_attempts=3, lease_seconds=60)
+    asyncio.run(pool._process(store.claim(pool.worker_id, 60, 3)))
+    assert calls == [{"use_cache": False, "mode": "fused", "policy_ids": ["elective_surgery", "diagnostic_imaging"]}]
+    assert store.status(job_id)["mode"] == "fused"
+
+
+def test_stores_created_before_job_options_are_migrated(tmp_path, claim):
+    import sqlite3
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, use_cache INTEGER NOT NULL,"
+        " total INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, finished_at REAL)"
+    )
+    conn.execute("INSERT INTO jobs (id, status, use_cache, created_at) VALUES ('old', 'queued', 1, 0)")
+    conn.commit()
+    conn.close()
+    store = JobStore(path)
+    store.add_items("old", [(0, claim)])
+    item = store.claim("w1", lease_seconds=60)
+    assert (item["job_id"], item["mode"], item["policy_ids"]) == ("old", "standard", None)
+
+
+def test_failed_submission_leaves_no_job_behind(claim, monkeypatch):
+    import json
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services import jobs
+
+    def broken(self, job_id, items):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(jobs.JobStore, "add_items", broken)
+    with TestClient(app, raise_server_exceptions=False) as client:
+        response = client.post("/api/jobs", content=json.dumps([claim]))
+        assert response.status_code == 500
+    conn = jobs.get_job_store()._connect()
+    assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+
+
+def test_jobs_api_runs_a_batch_to_completion(configure, fake_llm, claim):
+    import json
+    from fastapi.testclient import TestClient
+    from app.main import app
+    configure(job_workers=1)
+    body = json.dumps(claim) + "\nnot json\n"
+    with TestClient(app) as client:
+        response = client.post("/api/jobs", content=body, headers={"Content-Type": "application/x-ndjson"})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        for _ in range(200):
+            status = client.get(f"/api/jobs/{job_id}").json()
+            if status["status"] == "completed":
+                break
+            time.sleep(0.02)
+        assert (status["status"], status["done"], status["failed"]) == ("completed", 1, 1)
+        results = [json.loads(line) for line in client.get(f"/api/jobs/{job_id}/results").text.splitlines()]
+        assert [(r["index"], r["ok"]) for r in results] == [(0, True), (1, False)]
+        assert client.get("/api/jobs/unknown").status_code == 404
+        assert client.post("/api/jobs?mode=nope", content=body).status_code == 400
+        assert client.post("/api/jobs?policy_id=nope", content=body).status_code == 400
+        response = client.post("/api/jobs?mode=fused&policy_id=elective_surgery", content=json.dumps(claim))
+        assert (response.json()["mode"], response.json()["policy_ids"]) == ("fused", ["elective_surgery"])
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import pytest
+from fake_llm import POLICY_ANSWER
+from app.models.output import PolicyEvalOutput
+from app.services.llm_stage import _parse_locally, arun_stage, partial_field, run_stage
+from app.services.policy import POLICY_STAGE
+from app.utils.json_repair import repair_json
+from app.utils.metrics import metrics
+from app.utils.registry import registry
+
+ANSWER = {"policy_approved": True, "failed_criteria": ["a, {b}"], "policy_message": "Approved."}
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps(ANSWER),
+    "```json\n" + json.dumps(ANSWER, indent=2) + "\n```",
+    "Here is the result: " + json.dumps(ANSWER) + " Let me know if you need more.",
+    json.dumps(ANSWER)[:-1] + ",}",
+    '{"policy_approved": true, "failed_criteria": ["a, {b}",], "policy_message": "Approved.",}',
+])
+def test_repair_json_recovers_the_object(text):
+    assert repair_json(text) == ANSWER
+
+
+@pytest.mark.parametrize("text", ["", "Sure! Here is my assessment.", '{"policy_approved": tru'])
+def test_repair_json_gives_up_without_an_object(text):
+    assert repair_json(text) is None
+
+
+def test_parse_locally_reports_how_the_completion_was_parsed():
+    assert _parse_locally(POLICY_STAGE, json.dumps(ANSWER))[1] == "direct"
+    parsed, outcome = _parse_locally(POLICY_STAGE, "```json\n" + json.dumps(ANSWER) + "\n```")
+    assert outcome == "repaired" and parsed == PolicyEvalOutput(**ANSWER)
+    assert _parse_locally(POLICY_STAGE, json.dumps({"policy_approved": True})) == (None, "fallback")
+
+
+def test_partial_field_decodes_a_string_field_as_it_arrives():
+    text = '{"policy_approved": true, "policy_message": "The patient me'
+    assert partial_field(text, "policy_message") == "The patient me"
+    assert partial_field('{"policy_approved": tr', "policy_message") is None
+    assert partial_field("no json yet", "policy_message") is None
+
+
+def test_malformed_completions_are_repaired_without_another_call(configure, fake_llm):
+    configure(structured_output="off", llm_output_fixing=False)
+    fake_llm(malformed_rate=1.0, seed=3)
+    for i in range(6):
+        result = run_stage(POLICY_STAGE, lambda instructions: f"insurance policy evaluator {i}" + instructions, dict, use_cache=False)
+        assert result in (POLICY_ANSWER, {})
+    repaired = metrics.get("llm_output_parse_total", stage="policy", outcome="repaired")
+    assert repaired > 0
+    assert metrics.get("llm_output_parse_total", stage="policy", outcome="direct") == 0
+    assert repaired + metrics.get("llm_output_parse_total", stage="policy", outcome="fallback") == 6
+    assert metrics.get("llm_calls_total", stage="policy") == 6
+
+
+def test_json_mode_is_bound_for_calls(fake_llm):
+    llm = registry.get_llm(model=POLICY_STAGE.model, temperature=POLICY_STAGE.temperature)
+    answer = asyncio.run(llm.acall("insurance policy evaluator", PolicyEvalOutput))
+    assert json.loads(answer) == POLICY_ANSWER
+
+
+def test_streaming_yields_tokens_with_json_mode_enabled(configure, fake_llm):
+    configure(structured_output="json_mode")
+    llm = registry.get_llm(model=POLICY_STAGE.model, temperature=POLICY_STAGE.temperature)
+
+    async def chunks(stream):
+        return [chunk async for chunk in stream]
+    streamed = asyncio.run(chunks(llm.astream("insurance policy evaluator")))
+    assert len(streamed) > 1
+    assert json.loads("".join(streamed)) == POLICY_ANSWER
+    # A model bound to JSON mode would not stream at all (as ChatGroq falls back to one call).
+    bound = asyncio.run(chunks(llm.structured(PolicyEvalOutput).astream("insurance policy evaluator")))
+    assert len(bound) == 1
+
+
+def test_streamed_stage_reports_the_message_piece_by_piece(configure, fake_llm):
+    configure(structured_output="json_mode")
+    pieces = []
+    result = asyncio.run(arun_stage(
+        POLICY_STAGE, lambda instructions: "insurance policy evaluator" + instructions, dict,
+        use_cache=False, on_token=pieces.append,
+    ))
+    assert result == POLICY_ANSWER
+    assert len(pieces) > 1 and "".join(pieces) == POLICY_ANSWER["policy_message"]
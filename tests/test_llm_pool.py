@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+from typing import Any, List
+import pytest
+from fake_llm import GUARDRAIL_ANSWER, FakeChatModel
+from langchain_core.messages import BaseMessage, HumanMessage
+from app.utils.llm import HEDGE_MIN_SAMPLES, BackendHealth, LLMPool
+from app.utils.metrics import metrics
+
+PROMPT = [HumanMessage(content="clinical document classifier")]
+
+
+class RejectedGeneration(Exception):
+    """
+    What Groq raises when a JSON-mode completion fails its own validation.
+    """
+    def __init__(self):
+        super().__init__("json_validate_failed")
+        self.body = {"error": {"code": "json_validate_failed", "failed_generation": "{oops"}}
+
+
+class RejectingChatModel(FakeChatModel):
+    def _generate(self, messages: List[BaseMessage], stop: Any = None, run_manager: Any = None, **kwargs: Any):
+        self.calls += 1
+        raise RejectedGeneration()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Any = None, run_manager: Any = None, **kwargs: Any):
+        self.calls += 1
+        raise RejectedGeneration()
+
+
+def pool(*backends: FakeChatModel, **options) -> LLMPool:
+    return LLMPool(backends=list(backends), names=[f"fake-{i}" for i in range(len(backends))], **options)
+
+
+def failing(**options) -> FakeChatModel:
+    return FakeChatModel(latency="fixed:0", failure_rate=1.0, **options)
+
+
+def working(latency: str = "fixed:0") -> FakeChatModel:
+    return FakeChatModel(latency=latency)
+
+
+def test_circuit_opens_after_threshold_and_closes_on_success():
+    health = BackendHealth("fake", threshold=2, cooldown=30)
+    health.record_failure()
+    assert health.healthy()
+    health.record_failure()
+    assert not health.healthy()
+    assert health.healthy(time.monotonic() + 31)
+    assert metrics.get("llm_backend_circuit_open_total", backend="fake") == 1
+    health.record_success(0.1)
+    assert health.healthy() and health.failures == 0
+
+
+def test_p95_needs_enough_samples():
+    health = BackendHealth("fake", threshold=3, cooldown=30)
+    for i in range(HEDGE_MIN_SAMPLES - 1):
+        health.record_success(i / 100)
+    assert health.p95() is None
+    for i in range(HEDGE_MIN_SAMPLES - 1, 100):
+        health.record_success(i / 100)
+    # Nearest rank: the 95th of 100 samples.
+    assert health.p95() == pytest.approx(0.94)
+
+
+def test_sync_call_fails_over_to_the_next_backend():
+    primary, secondary = failing(), working()
+    message = pool(primary, secondary).invoke(PROMPT)
+    assert json.loads(message.content) == GUARDRAIL_ANSWER
+    assert metrics.get("llm_failovers_total", backend="fake-0") == 1
+    assert metrics.get("llm_backend_requests_total", backend="fake-0", outcome="error") == 1
+    assert metrics.get("llm_backend_requests_total", backend="fake-1", outcome="ok") == 1
+
+
+def test_open_circuit_skips_the_backend_until_cooldown():
+    primary, secondary = failing(), working()
+    llm = pool(primary, secondary, failure_threshold=2, cooldown=30)
+    for _ in range(5):
+        asyncio.run(llm.ainvoke(PROMPT))
+    assert metrics.get("llm_backend_requests_total", backend="fake-0", outcome="error") == 2
+    assert secondary.calls == 5
+    assert [entry["healthy"] for entry in llm.health()] == [False, True]
+    assert metrics.get("llm_backend_circuit_open_total", backend="fake-0") == 1
+    # Once the cooldown is over the primary gets a trial call again.
+    llm._health[0].open_until = time.monotonic() - 1
+    asyncio.run(llm.ainvoke(PROMPT))
+    assert metrics.get("llm_backend_requests_total", backend="fake-0", outcome="error") == 3
+
+
+def test_cooling_backends_are_the_last_resort():
+    primary, secondary = working(), failing()
+    llm = pool(primary, secondary, failure_threshold=1, cooldown=30)
+    llm._health[0].record_failure()
+    assert llm._order() == [1, 0]
+    message = llm.invoke(PROMPT)
+    assert json.loads(message.content) == GUARDRAIL_ANSWER
+    assert primary.calls == 1
+    assert metrics.get("llm_backend_requests_total", backend="fake-1", outcome="error") == 1
+
+
+def test_error_when_every_backend_fails():
+    with pytest.raises(ConnectionError):
+        pool(failing(), failing()).invoke(PROMPT)
+    with pytest.raises(ConnectionError):
+        asyncio.run(pool(failing(), failing()).ainvoke(PROMPT))
+
+
+def test_rejected_generation_is_not_failed_over():
+    rejecting, secondary = RejectingChatModel(latency="fixed:0"), working()
+    llm = pool(rejecting, secondary, failure_threshold=1)
+    with pytest.raises(RejectedGeneration):
+        llm.invoke(PROMPT)
+    with pytest.raises(RejectedGeneration):
+        asyncio.run(llm.ainvoke(PROMPT))
+    assert secondary.calls == 0
+    # The backend answered, so its circuit stays closed.
+    assert llm.health()[0]["healthy"]
+    assert metrics.get("llm_backend_requests_total", backend="fake-0", outcome="ok") == 2
+
+
+def test_slow_call_is_hedged_on_the_next_backend():
+    slow, fast = working("fixed:1.0"), working()
+    llm = pool(slow, fast, hedge=True, hedge_delay=0.02)
+    started = time.monotonic()
+    message = asyncio.run(llm.ainvoke(PROMPT))
+    assert time.monotonic() - started < 0.5
+    assert json.loads(message.content) == GUARDRAIL_ANSWER
+    assert metrics.get("llm_hedged_requests_total", outcome="fired") == 1
+    assert metrics.get("llm_hedged_requests_total", outcome="won") == 1
+    assert metrics.get("llm_backend_requests_total", backend="fake-0", outcome="cancelled") == 1
+
+
+def test_fast_call_is_not_hedged():
+    llm = pool(working(), working(), hedge=True, hedge_delay=0.5)
+    asyncio.run(llm.ainvoke(PROMPT))
+    assert metrics.get("llm_hedged_requests_total", outcome="fired") == 0
+
+
+def test_stream_fails_over_before_the_first_chunk():
+    primary, secondary = failing(), working()
+
+    async def stream():
+        return [chunk.content async for chunk in pool(primary, secondary).astream(PROMPT)]
+    chunks = asyncio.run(stream())
+    assert len(chunks) > 1 and json.loads("".join(chunks)) == GUARDRAIL_ANSWER
+    assert metrics.get("llm_failovers_total", backend="fake-0") == 1
+
+
+def test_registry_clients_use_the_pool(configure, fake_llm, claim):
+    from app.services.guardrail import check_is_insurance_summary
+    from app.utils.registry import registry
+    configure(guardrail_fast_path=False)
+    fake_llm(pool_size=2, primary_failure_rate=1.0)
+    result = check_is_insurance_summary(claim)
+    assert result["decision_path"] == "llm" and result["is_insurance_summary"]
+    health = registry.get_llm(model="llama3-70b-8192", temperature=0.2).health()
+    assert [entry["backend"] for entry in health] == ["fake-0", "fake-1"]
+    assert metrics.get("llm_failovers_total", backend="fake-0") == 1
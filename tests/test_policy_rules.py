@@ -0,0 +1,134 @@
+import pytest
+from app.models.clinical_summary import ClinicalSummary
+from app.services.ingest import ParsedSummary
+from app.services.policy import plan_policy
+from app.services.policy_rules import compile_rule, compile_rules, evaluate_rules
+from policy_data.default_policy import POLICY_CRITERIA
+
+
+def _summary(claim, **changes):
+    for path, value in changes.items():
+        *parents, leaf = path.split("__")
+        target = claim
+        for part in parents:
+            target = target[int(part)] if isinstance(target, list) else target[part]
+        target[leaf] = value
+    return ClinicalSummary.model_validate(claim)
+
+
+def _check(criterion, summary):
+    return compile_rule({"id": "c", "description": "c", **criterion}).check(summary)
+
+
+@pytest.mark.parametrize("op, value, age, expected", [
+    ("gt", 50, 51, True),
+    ("gt", 50, 50, False),
+    ("lt", 80, 79, True),
+    ("lt", 80, 80, False),
+])
+def test_compare_operators(claim, op, value, age, expected):
+    summary = _summary(claim, patient_demographics__age=age)
+    assert _check({"field": "patient_demographics.age", "op": op, "value": value}, summary) is expected
+
+
+def test_compare_is_undetermined_for_a_missing_value(claim):
+    summary = _summary(claim)
+    assert _check({"field": "patient_demographics.height", "op": "gt", "value": 1}, summary) is None
+
+
+@pytest.mark.parametrize("smoking, expected", [(False, True), (None, True), (True, False)])
+def test_is_false(claim, smoking, expected):
+    summary = _summary(claim, patient_demographics__smoking=smoking)
+    assert _check({"field": "patient_demographics.smoking", "op": "is_false"}, summary) is expected
+
+
+@pytest.mark.parametrize("date, expected", [("2024-05-01", True), ("  ", False), (None, False)])
+def test_present(claim, date, expected):
+    summary = _summary(claim, hpi__documentation_date=date)
+    assert _check({"field": "hpi.documentation_date", "op": "present"}, summary) is expected
+
+
+def test_present_treats_an_empty_list_as_absent(claim):
+    summary = _summary(claim, imaging_lab_results=[])
+    assert _check({"field": "imaging_lab_results", "op": "present"}, summary) is False
+
+
+def test_all_present_fans_out_over_list_items(claim):
+    criterion = {"field": "procedures_treatments[*].performing_physician", "op": "all_present"}
+    claim["procedures_treatments"].append({**claim["procedures_treatments"][0], "performing_physician": ""})
+    assert _check(criterion, _summary(claim)) is False
+    assert _check(criterion, _summary(claim, procedures_treatments__1__performing_physician="Dr. Chen")) is True
+    assert _check(criterion, _summary(claim, procedures_treatments=[])) is False
+
+
+def test_any_true(claim):
+    criterion = {"field": "procedures_treatments[*].referral_note_attached", "op": "any_true"}
+    assert _check(criterion, _summary(claim, procedures_treatments__0__referral_note_attached=True)) is True
+    assert _check(criterion, _summary(claim, procedures_treatments__0__referral_note_attached=False)) is False
+
+
+@pytest.mark.parametrize("date, expected", [
+    ("2024-06-01", True),   # the report date itself
+    ("2024-03-03", True),   # 90 days before
+    ("2024-03-02", False),  # 91 days before
+    ("2024-06-02", False),  # after the report
+    ("not a date", None),
+])
+def test_within_days(claim, date, expected):
+    summary = _summary(claim, hpi__documentation_date=date, physician_signature__date_of_report="2024-06-01")
+    criterion = {"field": "hpi.documentation_date", "op": "within_days", "value": 90, "reference": "physician_signature.date_of_report"}
+    assert _check(criterion, summary) is expected
+
+
+def test_within_days_is_undetermined_without_a_reference_date(claim):
+    summary = _summary(claim, physician_signature__date_of_report="unknown")
+    criterion = {"field": "hpi.documentation_date", "op": "within_days", "value": 90, "reference": "physician_signature.date_of_report"}
+    assert _check(criterion, summary) is None
+
+
+def test_malformed_criteria_are_rejected():
+    with pytest.raises(ValueError, match="operator"):
+        compile_rule({"id": "c", "description": "c", "field": "hpi", "op": "between"})
+    with pytest.raises(ValueError, match="on_fail"):
+        compile_rule({"id": "c", "description": "c", "field": "hpi", "op": "present", "on_fail": "ignore"})
+
+
+def test_evaluate_rules_routes_pass_fail_and_undetermined(claim):
+    rules = compile_rules([
+        {"id": "adult", "description": "adult", "field": "patient_demographics.age", "op": "gt", "value": 17},
+        {"id": "young", "description": "young", "field": "patient_demographics.age", "op": "lt", "value": 18},
+        {"id": "referral", "description": "referral", "field": "procedures_treatments[*].referral_note_attached",
+         "op": "any_true", "on_fail": "judgement"},
+        {"id": "dated", "description": "dated", "field": "hpi.documentation_date", "op": "within_days", "value": 1,
+         "reference": "physician_signature.date_of_report"},
+        {"id": "history", "description": "history", "judgement": True},
+    ])
+    summary = _summary(claim, procedures_treatments__0__referral_note_attached=False, hpi__documentation_date="n/a")
+    evaluation = evaluate_rules(rules, summary)
+    assert [rule.id for rule in evaluation.passed] == ["adult"]
+    assert [rule.id for rule in evaluation.failed] == ["young"]
+    assert [rule.id for rule in evaluation.undetermined] == ["referral", "dated", "history"]
+
+
+def test_default_policy_denies_locally_on_stated_criteria(claim):
+    claim["patient_demographics"]["age"] = 40
+    plan = plan_policy(ParsedSummary(claim))
+    assert plan.path == "rules_denied"
+    assert plan.result["failed_criteria"] == ["Age is greater than 50 years."]
+
+
+def test_default_policy_sends_ambiguous_failures_to_the_llm(claim):
+    claim["hpi"]["documentation_date"] = None
+    claim["hpi"]["vitals"] = None
+    claim["procedures_treatments"][0]["referral_note_attached"] = False
+    plan = plan_policy(ParsedSummary(claim))
+    assert plan.path == "llm_judgement"
+    sent = {rule.id for rule in plan.criteria}
+    assert {"symptoms_documented", "vitals_recorded", "referral_note_attached"} <= sent
+    assert {"vitals_stable", "history_supports_procedure", "lab_results_relevant"} <= sent
+
+
+def test_default_policy_deny_rules_are_schema_guaranteed():
+    # Only required fields, or optional flags whose default is the compliant value, may deny.
+    denying = {criterion["id"] for criterion in POLICY_CRITERIA if not criterion.get("judgement") and criterion.get("on_fail", "deny") == "deny"}
+    assert denying == {"age_over_50", "weight_under_80kg", "no_alcohol", "no_smoking", "no_substance_addiction"}
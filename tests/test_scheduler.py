@@ -0,0 +1,283 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.utils.llm import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMScheduler, SharedTokenBuckets, TokenBucket, llm_priority
+
+
+class TransientError(Exception):
+    status_code = 429
+
+
+def scheduler(rpm: int = 0, period: float = 60.0, **options) -> LLMScheduler:
+    """
+    A scheduler whose request bucket refills `rpm` slots per `period` seconds.
+    """
+    options.setdefault("max_retries", 0)
+    sched = LLMScheduler(rpm=0, tpm=0, **options)
+    sched.requests = TokenBucket(rpm, period)
+    return sched
+
+
+def count_attempts(sched: LLMScheduler) -> list:
+    attempts = []
+    original = sched._try_acquire
+
+    def counted(ticket, tokens):
+        attempts.append(ticket)
+        return original(ticket, tokens)
+    sched._try_acquire = counted
+    return attempts
+
+
+def test_token_bucket_wait_time_and_refill():
+    bucket = TokenBucket(2, period=1.0)
+    now = bucket.updated
+    assert bucket.wait_time(1, now) == 0
+    bucket.consume(2)
+    assert bucket.wait_time(1, now) == pytest.approx(0.5)
+    assert bucket.wait_time(1, now + 0.5) == 0
+    assert bucket.wait_time(10, now + 0.5) == pytest.approx(0.5)
+    assert TokenBucket(0).wait_time(1000, now) == 0
+
+
+def test_unlimited_scheduler_does_not_queue():
+    async def main():
+        sched = scheduler()
+        waits = await asyncio.gather(*(sched.acquire(100) for _ in range(20)))
+        assert max(waits) < 0.05
+        assert sched._waiters == [] and sched._wakers == {}
+    asyncio.run(main())
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    async def main():
+        sched = scheduler(rpm=1, period=0.05)
+        await sched.acquire(1)
+        order = []
+
+        async def call(name, priority):
+            await sched.acquire(1, priority=priority)
+            order.append(name)
+        tasks = [asyncio.create_task(call("batch-1", PRIORITY_BATCH))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("batch-2", PRIORITY_BATCH)))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("interactive", PRIORITY_INTERACTIVE)))
+        await asyncio.gather(*tasks)
+        assert order == ["interactive", "batch-1", "batch-2"]
+    asyncio.run(main())
+
+
+def test_priority_context_applies_to_calls_inside():
+    async def main():
+        sched = scheduler(rpm=1, period=0.05)
+        await sched.acquire(1)
+        order = []
+
+        async def call(name):
+            await sched.acquire(1)
+            order.append(name)
+        with llm_priority(PRIORITY_BATCH):
+            batch = asyncio.create_task(call("batch"))
+        await asyncio.sleep(0)
+        await asyncio.gather(batch, call("interactive"))
+        assert order == ["interactive", "batch"]
+    asyncio.run(main())
+
+
+def test_queued_waiters_sleep_until_woken_instead_of_polling():
+    async def main():
+        sched = scheduler(rpm=1, period=0.05)
+        attempts = count_attempts(sched)
+        started = time.monotonic()
+        await asyncio.gather(*(sched.acquire(1) for _ in range(6)))
+        elapsed = time.monotonic() - started
+        # Five refills of 50 ms each; every waiter tries once when queued and about once more
+        # when woken at the head, a 10 ms poll would have made ~25 attempts per waiter.
+        assert 0.2 <= elapsed < 0.6
+        assert len(attempts) <= 6 * 3
+    asyncio.run(main())
+
+
+def test_head_sleeps_exactly_until_the_refill():
+    async def main():
+        sched = scheduler(rpm=1, period=0.2)
+        await sched.acquire(1)
+        attempts = count_attempts(sched)
+        waited = await sched.acquire(1)
+        assert waited == pytest.approx(0.2, abs=0.05)
+        assert len(attempts) <= 3
+    asyncio.run(main())
+
+
+def test_cancelled_head_wakes_the_next_waiter():
+    async def main():
+        sched = scheduler(rpm=1, period=0.3)
+        await sched.acquire(1)
+        head = asyncio.create_task(sched.acquire(1))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(sched.acquire(1))
+        await asyncio.sleep(0.02)
+        head.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await head
+        waited = await asyncio.wait_for(second, 1.0)
+        assert waited < 0.4
+        assert sched._waiters == [] and sched._wakers == {}
+    asyncio.run(main())
+
+
+def test_sync_and_async_callers_share_the_queue():
+    sched = scheduler(rpm=1, period=0.05)
+    sched.acquire_sync(1)
+    done = []
+
+    def sync_caller():
+        sched.acquire_sync(1)
+        done.append("sync")
+
+    async def main():
+        thread = threading.Thread(target=sync_caller)
+        thread.start()
+        await asyncio.gather(*(sched.acquire(1) for _ in range(3)))
+        await asyncio.to_thread(thread.join, 2.0)
+    started = time.monotonic()
+    asyncio.run(main())
+    assert done == ["sync"]
+    assert time.monotonic() - started < 1.0
+
+
+def test_run_retries_transient_errors_only():
+    async def main():
+        sched = scheduler(max_retries=2, backoff_base=0.001)
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise TransientError()
+            return "ok"
+        assert await sched.run(flaky, 10) == "ok"
+        assert len(calls) == 3
+
+        async def broken():
+            raise ValueError("not transient")
+        with pytest.raises(ValueError):
+            await sched.run(broken, 10)
+    asyncio.run(main())
+
+
+def test_stream_is_not_retried_after_the_first_item():
+    async def main():
+        sched = scheduler(max_retries=3, backoff_base=0.001)
+        calls = []
+
+        async def stream():
+            calls.append(1)
+            yield "first"
+            raise TransientError()
+        received = []
+        with pytest.raises(TransientError):
+            async for item in sched.stream(stream, 10):
+                received.append(item)
+        assert received == ["first"] and len(calls) == 1
+    asyncio.run(main())
+
+
+def shared_scheduler(path, rpm: int) -> LLMScheduler:
+    return LLMScheduler(rpm=rpm, tpm=0, max_retries=0, shared=SharedTokenBuckets(str(path), rpm=rpm, tpm=0))
+
+
+def test_shared_buckets_split_one_budget_between_schedulers(tmp_path):
+    path = tmp_path / "rate_limit.sqlite3"
+    first, second = shared_scheduler(path, 3), shared_scheduler(path, 3)
+    first.acquire_sync(1)
+    second.acquire_sync(1)
+    first.acquire_sync(1)
+    assert first.shared.try_take(1, 0) > 0
+    assert second._try_acquire(second._enqueue(PRIORITY_INTERACTIVE, lambda: None), 1) > 0
+
+
+def test_shared_buckets_are_taken_off_the_event_loop(tmp_path):
+    sched = shared_scheduler(tmp_path / "rate_limit.sqlite3", 100)
+    take = sched.shared.try_take
+    threads = []
+
+    def slow_take(requests, tokens):
+        threads.append(threading.current_thread())
+        time.sleep(0.05)
+        return take(requests, tokens)
+    sched.shared.try_take = slow_take
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+        task = asyncio.create_task(ticker())
+        await asyncio.gather(*(sched.acquire(1) for _ in range(3)))
+        task.cancel()
+        return ticks
+    # The loop kept running while the three SQLite takes (~150 ms) were in progress.
+    assert asyncio.run(main()) >= 10
+    assert threading.main_thread() not in threads
+    assert sched._waiters == [] and sched._wakers == {}
+
+
+def test_cancelled_waiter_does_not_break_a_shared_take_in_flight(tmp_path):
+    sched = shared_scheduler(tmp_path / "rate_limit.sqlite3", 100)
+    take = sched.shared.try_take
+
+    def slow_take(requests, tokens):
+        time.sleep(0.05)
+        return take(requests, tokens)
+    sched.shared.try_take = slow_take
+
+    async def main():
+        first = asyncio.create_task(sched.acquire(1))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await asyncio.wait_for(sched.acquire(1), 1.0)
+    asyncio.run(main())
+    assert sched._waiters == [] and sched._wakers == {}
+
+
+def test_reload_keeps_the_scheduler_unless_the_rate_limits_change(monkeypatch):
+    from app.utils.llm import get_scheduler
+    from app.utils.registry import registry
+    monkeypatch.setenv("MEDICHECK_LLM_RPM", "1")
+    registry.reload()
+    sched = get_scheduler()
+    sched.acquire_sync(1)
+    monkeypatch.setenv("MEDICHECK_LLM_MAX_RETRIES", "7")
+    registry.reload()
+    # Same limits: the drained bucket survives the reload instead of granting a fresh burst.
+    assert get_scheduler() is sched and sched.max_retries == 7
+    assert sched.requests.wait_time(1, time.monotonic()) > 0
+    monkeypatch.setenv("MEDICHECK_LLM_RPM", "2")
+    registry.reload()
+    assert get_scheduler() is not sched and get_scheduler().requests.capacity == 2
+
+
+def test_admin_reload_runs_off_the_event_loop(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.utils.registry import registry
+    threads = []
+    reload = registry.reload
+
+    def recorded():
+        threads.append(threading.current_thread())
+        return reload()
+    monkeypatch.setattr(registry, "reload", recorded)
+    with TestClient(app) as client:
+        loop_thread = client.portal.call(threading.current_thread)
+        response = client.post("/api/admin/reload")
+    assert response.status_code == 200
+    assert threads and threads[0] is not loop_thread
@@ -0,0 +1,40 @@
+import asyncio
+from app.services.speculative import acheck_validate_evaluate, check_validate_evaluate
+from app.utils.metrics import metrics
+
+
+def test_local_guardrail_accept_runs_in_sequence(fake_llm, claim):
+    guardrail, validation, policies = check_validate_evaluate(claim)
+    assert guardrail["decision_path"] == "structural_accept"
+    assert validation["is_valid"] and len(policies) == 1
+    assert metrics.get("speculative_tasks_total", stage="validation", outcome="skipped") == 1
+    assert metrics.get("speculative_tasks_total", stage="policy", outcome="skipped") == 1
+    assert metrics.get("speculative_tasks_total", stage="policy", outcome="used") == 0
+    assert metrics.get("guardrail_decisions_total", path="structural_accept") == 1
+
+
+def test_policy_is_speculated_while_the_guardrail_llm_call_runs(configure, fake_llm, claim):
+    configure(guardrail_fast_path=False)
+    fake_llm(latency="fixed:0.05")
+    guardrail, validation, policies = check_validate_evaluate(claim)
+    assert guardrail["decision_path"] == "llm"
+    assert validation["is_valid"] and policies[0]["policy_approved"]
+    assert metrics.get("speculative_tasks_total", stage="policy", outcome="used") == 1
+    assert metrics.get("guardrail_decisions_total", path="llm") == 1
+
+
+def test_async_speculation_and_local_fall_through(configure, fake_llm, claim):
+    guardrail, _, policies = asyncio.run(acheck_validate_evaluate(claim))
+    assert guardrail["decision_path"] == "structural_accept" and policies
+    assert metrics.get("speculative_tasks_total", stage="validation", outcome="skipped") == 1
+    configure(guardrail_fast_path=False)
+    guardrail, _, policies = asyncio.run(acheck_validate_evaluate(claim))
+    assert guardrail["decision_path"] == "llm" and policies
+    assert metrics.get("speculative_tasks_total", stage="policy", outcome="used") == 1
+
+
+def test_structural_reject_starts_nothing(fake_llm):
+    guardrail, validation, policies = check_validate_evaluate({"recipe": "pancakes", "servings": 4})
+    assert guardrail["decision_path"] == "structural_reject"
+    assert validation is None and policies is None
+    assert metrics.get("speculative_tasks_total", stage="validation", outcome="skipped") == 0